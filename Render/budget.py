@@ -0,0 +1,224 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements a triangle budget for rendering projects.
+
+Before export, a cheap pre-pass estimates the number of triangles that the
+mesher will generate for each view. If the estimated total exceeds the
+budget, mesher deflections are scaled up so that the export fits into the
+budget. After export, actual triangle counts are reported in the console.
+
+Estimation model: for a given shape, the triangle count of planar faces does
+not depend on deflection, whereas the triangle count of curved faces is
+roughly inversely proportional to deflection. The shape is sampled once with
+coarse deflections, and the sample is extrapolated with this model.
+"""
+
+import collections
+import threading
+import math
+
+import FreeCAD as App
+import MeshPart
+
+# Coarse deflection multiplier for sampling
+SAMPLING_FACTOR = 8.0
+
+# Deflection scaling bounds
+MAX_DEFLECTION_FACTOR = 100.0
+MAX_ANGULAR_DEFLECTION = math.pi / 2
+
+
+Estimate = collections.namedtuple("Estimate", "name label fixed scalable")
+Estimate.__doc__ = """Triangle estimate for a view.
+
+fixed -- number of triangles independent of deflection (planar faces, meshes)
+scalable -- number of triangles inversely proportional to deflection, at
+    nominal deflection (curved faces)
+"""
+
+
+class TriangleBudget:
+    """A triangle budget for a rendering project.
+
+    The budget is meant to be passed to RendererHandler, which queries it for
+    deflection factors and feeds it back with actual triangle counts.
+    """
+
+    def __init__(self, budget, linear_deflection, angular_deflection):
+        """Initialize budget.
+
+        Args:
+            budget -- maximum number of triangles for the scene (int)
+            linear_deflection -- nominal linear deflection (float)
+            angular_deflection -- nominal angular deflection (float)
+        """
+        self.budget = int(budget)
+        self.linear_deflection = float(linear_deflection)
+        self.angular_deflection = float(angular_deflection)
+        self.estimates = {}
+        self.factor = 1.0
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def estimate(self, views):
+        """Estimate triangle counts for views and compute deflection factor.
+
+        Args:
+            views -- the views to estimate (iterable)
+        """
+        for view in views:
+            if (estimate := self.estimate_view(view)) is not None:
+                self.estimates[estimate.name] = estimate
+
+        fixed = sum(e.fixed for e in self.estimates.values())
+        scalable = sum(e.scalable for e in self.estimates.values())
+
+        if fixed + scalable <= self.budget or not scalable:
+            self.factor = 1.0
+        elif self.budget <= fixed:
+            self.factor = MAX_DEFLECTION_FACTOR
+        else:
+            self.factor = scalable / (self.budget - fixed)
+        self.factor = min(self.factor, MAX_DEFLECTION_FACTOR)
+
+        msg = (
+            f"[Render][Budget] Estimated triangles: {int(fixed + scalable)} "
+            f"(budget: {self.budget}) - "
+            f"Deflection factor: {self.factor:.3g}\n"
+        )
+        App.Console.PrintMessage(msg)
+        if fixed > self.budget:
+            msg = (
+                "[Render][Budget] Budget cannot be met: meshes and planar "
+                f"faces already amount to {int(fixed)} triangles\n"
+            )
+            App.Console.PrintWarning(msg)
+
+    def deflections(self, name):
+        """Get the deflections to use for an object.
+
+        Args:
+            name -- the name of the object (its source FullName)
+
+        Returns:
+            A tuple (linear deflection, angular deflection)
+        """
+        estimate = self.estimates.get(name)
+        factor = self.factor if estimate and estimate.scalable else 1.0
+        return (
+            self.linear_deflection * factor,
+            min(self.angular_deflection * factor, MAX_ANGULAR_DEFLECTION),
+        )
+
+    def count(self, name, triangles):
+        """Record actual triangles for an object (thread-safe).
+
+        Args:
+            name -- the name of the object (its source FullName)
+            triangles -- the number of triangles to add (int)
+        """
+        with self._lock:
+            self._counts[name] += int(triangles)
+
+    def report(self, top=10):
+        """Report actual triangle counts in console.
+
+        Args:
+            top -- the number of heaviest objects to list (int)
+        """
+        total = sum(self._counts.values())
+        msg = (
+            f"[Render][Budget] Actual triangles: {total} "
+            f"(budget: {self.budget})\n"
+        )
+        if total > self.budget:
+            App.Console.PrintWarning(msg)
+        else:
+            App.Console.PrintMessage(msg)
+
+        for name, count in self._counts.most_common(top):
+            estimate = self.estimates.get(name)
+            label = estimate.label if estimate else name
+            App.Console.PrintMessage(
+                f"[Render][Budget]   '{label}': {count}\n"
+            )
+
+    def estimate_view(self, view):
+        """Estimate the number of triangles for a view.
+
+        Returns:
+            An Estimate, or None if the view does not generate triangles
+            (lights, cameras...) or cannot be estimated.
+        """
+        source = view.Source
+        name = str(source.FullName)
+        label = getattr(source, "Label", name)
+
+        # Render objects (lights, cameras...)
+        if hasattr(getattr(source, "Proxy", None), "RENDERING_TYPE"):
+            if source.isDerivedFrom("Mesh::Feature"):
+                # Duck-typed mesh (ground plane...)
+                return Estimate(name, label, source.Mesh.CountFacets, 0)
+            return None
+
+        # Meshes: deflection has no effect (but decimation has)
+        try:
+            if source.isDerivedFrom("Mesh::Feature"):
+                count = source.Mesh.CountFacets
+                if getattr(view, "Decimate", False) and view.DecimationTarget:
+                    count = min(count, view.DecimationTarget)
+                return Estimate(name, label, count, 0)
+        except AttributeError:
+            return None
+
+        # Shapes
+        try:
+            shape = source.Shape.copy()
+        except AttributeError:
+            return None
+        if shape.isNull():
+            return None
+
+        area = curved_area = 0.0
+        for face in shape.Faces:
+            area += face.Area
+            if face.Surface.TypeId != "Part::GeomPlane":
+                curved_area += face.Area
+        if not area:
+            return None
+
+        shape.Placement = App.Base.Placement()
+        sample = MeshPart.meshFromShape(
+            Shape=shape,
+            LinearDeflection=self.linear_deflection * SAMPLING_FACTOR,
+            AngularDeflection=min(
+                self.angular_deflection * SAMPLING_FACTOR,
+                MAX_ANGULAR_DEFLECTION,
+            ),
+            Relative=False,
+        )
+        count = sample.CountFacets
+        curved_ratio = curved_area / area
+        fixed = count * (1.0 - curved_ratio)
+        scalable = count * curved_ratio * SAMPLING_FACTOR
+        return Estimate(name, label, fixed, scalable)
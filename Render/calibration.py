@@ -0,0 +1,296 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""This module implements the calibration of RenderMesh backends.
+
+RenderMesh comes in 3 flavors (backends): plain, numpy and multiprocessing.
+The best backend for a mesh depends on its size and on the machine: on
+small meshes, the start of processes and the conversion into arrays cost
+more than they save, whereas on large meshes, vectorized and parallel
+processing win.
+
+Calibration benchmarks each backend on synthetic meshes of increasing size,
+for each stage of the RenderMesh pipeline (setup, uv map, autosmooth,
+write). Timings are stored in parameters and used by `create_rendermesh`,
+which selects the backend with the lowest estimated cost for the stages a
+mesh goes through.
+
+Calibration is run from the Python console:
+>>> import Render.calibration
+>>> Render.calibration.calibrate()
+"""
+
+import bisect
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+
+import FreeCAD as App
+
+from Render.constants import PARAMS
+
+BACKENDS = ("plain", "numpy", "multiprocessing")
+STAGES = ("setup", "uvmap", "autosmooth", "write")
+
+# Sizes of calibration meshes (approximate number of points)
+CALIBRATION_SIZES = (1000, 10000, 50000, 200000, 1000000)
+
+# Above this time (in seconds), a backend is not benchmarked on larger meshes
+MAX_STAGE_TIME = 20.0
+
+# Parameter to store calibration into
+CALIBRATION_PARAM = "BackendCalibration"
+
+
+class BackendCalibration:
+    """Timings of RenderMesh backends, per stage and mesh size."""
+
+    def __init__(self, timings=None):
+        """Initialize calibration.
+
+        Args:
+            timings -- a dictionary {stage: {backend: [(points, seconds)]}}
+        """
+        self.timings = {
+            stage: {
+                backend: sorted(tuple(t) for t in values)
+                for backend, values in backends.items()
+                if values
+            }
+            for stage, backends in (timings or {}).items()
+        }
+
+    def add(self, stage, backend, count_points, duration):
+        """Add a timing."""
+        values = self.timings.setdefault(stage, {}).setdefault(backend, [])
+        bisect.insort(values, (count_points, duration))
+
+    def estimate(self, stage, backend, count_points):
+        """Estimate the time of a stage for a backend and a mesh size.
+
+        Timings are interpolated in log-log space. Above calibrated sizes,
+        time is extrapolated linearly from the last 2 timings (marginal cost
+        per point); below, the time of the smallest calibrated size is used
+        (fixed costs dominate).
+
+        Returns:
+            The estimated time in seconds, or None if the backend has not been
+            calibrated for the stage.
+        """
+        try:
+            values = self.timings[stage][backend]
+        except KeyError:
+            return None
+        sizes = [v[0] for v in values]
+        index = bisect.bisect_left(sizes, count_points)
+        if index == 0:
+            return values[0][1]
+        if index == len(values):
+            size1, time1 = values[-1]
+            if len(values) == 1:
+                return time1 * count_points / size1
+            size0, time0 = values[-2]
+            slope = max(time1 - time0, 0.0) / (size1 - size0)
+            return time1 + slope * (count_points - size1)
+        (size0, time0), (size1, time1) = values[index - 1], values[index]
+        if size0 <= 0 or time0 <= 0 or time1 <= 0:
+            return time1
+        ratio = math.log(count_points / size0) / math.log(size1 / size0)
+        return math.exp(
+            math.log(time0) + ratio * (math.log(time1) - math.log(time0))
+        )
+
+    def select(self, count_points, stages, backends=BACKENDS):
+        """Select the fastest backend for a mesh.
+
+        Args:
+            count_points -- the number of points of the mesh (int)
+            stages -- the stages the mesh goes through (iterable of str)
+            backends -- the candidate backends (iterable of str)
+
+        Returns:
+            The name of the fastest backend, or None if no candidate has been
+            calibrated for all the stages.
+        """
+        stages = tuple(stages)
+        costs = {}
+        for backend in backends:
+            estimates = [
+                self.estimate(s, backend, count_points) for s in stages
+            ]
+            if None not in estimates:
+                costs[backend] = sum(estimates)
+        return min(costs, key=costs.get) if costs else None
+
+    def crossovers(self, stage):
+        """Compute the crossovers of a stage.
+
+        Returns:
+            A list of (size, backend), meaning 'backend' is the fastest from
+            'size' (number of points) on.
+        """
+        backends = self.timings.get(stage, {})
+        sizes = sorted({v[0] for values in backends.values() for v in values})
+        res = []
+        for size in sizes:
+            best = self.select(size, (stage,), backends)
+            if not res or res[-1][1] != best:
+                res.append((size, best))
+        return res
+
+    def save(self):
+        """Save calibration into parameters."""
+        PARAMS.SetString(CALIBRATION_PARAM, json.dumps(self.timings))
+
+    @classmethod
+    def load(cls):
+        """Load calibration from parameters.
+
+        Returns:
+            The calibration, or None if no valid calibration is stored
+        """
+        try:
+            timings = json.loads(PARAMS.GetString(CALIBRATION_PARAM, ""))
+            return cls(timings) if timings else None
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+
+def calibrate(sizes=CALIBRATION_SIZES, save=True):
+    """Calibrate RenderMesh backends.
+
+    Each available backend is benchmarked on synthetic meshes, for each
+    stage. Crossovers are printed in console.
+
+    Args:
+        sizes -- the sizes of calibration meshes (number of points)
+        save -- if True, save calibration into parameters
+
+    Returns:
+        The calibration (BackendCalibration)
+    """
+    # pylint: disable=import-outside-toplevel
+    from Render.rendermesh import (
+        create_rendermesh,
+        get_available_backends,
+        RenderMeshBase,
+    )
+
+    calibration = BackendCalibration()
+    backends = list(get_available_backends())
+    msg = f"[Render][Calibration] Backends: {', '.join(backends)}\n"
+    App.Console.PrintMessage(msg)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "calibration.obj")
+        for size in sorted(sizes):
+            mesh = make_calibration_mesh(size)
+            count_points = mesh.CountPoints
+            for backend in list(backends):
+                tm0 = time.perf_counter()
+                rmesh = create_rendermesh(
+                    mesh.copy(),
+                    autosmooth=False,
+                    compute_uvmap=False,
+                    name="Calibration",
+                    backend=backend,
+                )
+                tm1 = time.perf_counter()
+                rmesh.compute_uvmap("Cubic")
+                tm2 = time.perf_counter()
+                rmesh.autosmooth(math.radians(30))
+                tm3 = time.perf_counter()
+                rmesh.write_file(
+                    "Calibration", RenderMeshBase.ExportType.OBJ, filename
+                )
+                tm4 = time.perf_counter()
+                rmesh = None
+
+                durations = (tm1 - tm0, tm2 - tm1, tm3 - tm2, tm4 - tm3)
+                for stage, duration in zip(STAGES, durations):
+                    calibration.add(stage, backend, count_points, duration)
+                msg = (
+                    f"[Render][Calibration] {backend}, {count_points} points: "
+                    + ", ".join(
+                        f"{s} {d:.3f}s" for s, d in zip(STAGES, durations)
+                    )
+                    + "\n"
+                )
+                App.Console.PrintMessage(msg)
+
+                if max(durations) > MAX_STAGE_TIME:
+                    backends.remove(backend)
+
+    for stage in STAGES:
+        crossovers = ", ".join(
+            f"{b} from {s} points" for s, b in calibration.crossovers(stage)
+        )
+        App.Console.PrintMessage(
+            f"[Render][Calibration] {stage}: {crossovers}\n"
+        )
+
+    if save:
+        calibration.save()
+    return calibration
+
+
+def make_calibration_mesh(size):
+    """Make a synthetic mesh for calibration.
+
+    The mesh is a wavy square grid, so that uv map and autosmooth have
+    something to compute.
+
+    Args:
+        size -- the approximate number of points of the mesh (int)
+
+    Returns:
+        The mesh (Mesh.Mesh)
+    """
+    # pylint: disable=import-outside-toplevel
+    import Mesh
+
+    steps = max(int(math.sqrt(size)) - 1, 1)
+    length = 100.0
+
+    def point(i, j):
+        x_coord = length * i / steps
+        y_coord = length * j / steps
+        z_coord = 5.0 * math.sin(x_coord / 7.0) * math.cos(y_coord / 11.0)
+        return (x_coord, y_coord, z_coord)
+
+    triangles = itertools.chain.from_iterable(
+        (
+            point(i, j),
+            point(i + 1, j),
+            point(i + 1, j + 1),
+            point(i, j),
+            point(i + 1, j + 1),
+            point(i, j + 1),
+        )
+        for i in range(steps)
+        for j in range(steps)
+    )
+    return Mesh.Mesh(list(triangles))
@@ -235,6 +235,45 @@ class RenderCommand(_DocIsActiveMixin):
         project.Proxy.render()
 
 
+class SceneReportCommand(_DocIsActiveMixin):
+    """GUI command to report the complexity of a Render project."""
+
+    def GetResources(self):  # pylint: disable=no-self-use
+        """Get command's resources (callback)."""
+        return {
+            "Pixmap": os.path.join(ICONDIR, "RenderProject.svg"),
+            "MenuText": QT_TRANSLATE_NOOP(
+                "Render_SceneReport", "Scene report"
+            ),
+            "ToolTip": QT_TRANSLATE_NOOP(
+                "Render_SceneReport",
+                "Report the complexity of a selected project or the "
+                "default project (triangles, instances, textures, "
+                "materials, lights), without rendering it",
+            ),
+        }
+
+    def Activated(self):  # pylint: disable=no-self-use
+        """Respond to Activated event (callback).
+
+        This code is executed when the command is run in FreeCAD.
+        It prints a complexity report of the project.
+        """
+        # Find project (selected one, or first one in document)
+        objs = Gui.Selection.getSelection() + App.ActiveDocument.Objects
+        project = next(
+            (o for o in objs if "Renderer" in o.PropertiesList), None
+        )
+        if project is None:
+            return
+
+        QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
+        try:
+            project.Proxy.scene_report()
+        finally:
+            QApplication.restoreOverrideCursor()
+
+
 class CameraCommand(_DocIsActiveMixin):
     """GUI command to create a Camera object."""
 
@@ -858,6 +897,7 @@ def _init_gui_commands():
         ("Materials", materials_group),
         separator,
         ("Render", RenderCommand()),
+        ("SceneReport", SceneReportCommand()),
         separator,
         ("Settings", SettingsCommand()),
         ("Help", HelpCommand()),
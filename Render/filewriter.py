@@ -0,0 +1,141 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements an asynchronous file writer for mesh export.
+
+Export threads format mesh files in memory and hand the resulting buffers
+over to dedicated writer threads, which flush them to disk. Thus,
+computation and disk writes overlap, which is especially beneficial on slow
+(network) filesystems.
+
+Memory is capped by backpressure: when the size of pending buffers exceeds a
+threshold, producers wait for writers to catch up.
+"""
+
+import queue
+import threading
+
+import FreeCAD as App
+
+# Number of writer threads
+WRITER_THREADS = 2
+
+# Maximum size of pending buffers, in characters
+MAX_PENDING = 256 * 2**20
+
+
+class AsyncFileWriter:
+    """A pool of writer threads, fed by a bounded queue of text buffers.
+
+    The writer can be used as a context manager: on exit, it waits for all
+    pending buffers to be written, reports errors and stops its threads.
+    """
+
+    def __init__(self, threads=WRITER_THREADS, max_pending=MAX_PENDING):
+        """Initialize writer and start writer threads.
+
+        Args:
+            threads -- the number of writer threads (int)
+            max_pending -- the maximum size of pending buffers, in characters
+                (int). A single buffer larger than this size is accepted
+                when nothing else is pending.
+        """
+        self.max_pending = int(max_pending)
+        self.errors = []
+        self._queue = queue.SimpleQueue()
+        self._cond = threading.Condition()
+        self._pending_size = 0
+        self._pending_count = 0
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"render-writer-{i}", daemon=True
+            )
+            for i in range(max(int(threads), 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, path, content, newline=None):
+        """Write a text file asynchronously (thread-safe).
+
+        This method blocks while pending buffers exceed the size cap.
+
+        Args:
+            path -- the path of the file to write (str)
+            content -- the content of the file (str)
+            newline -- the newline translation mode (see 'open')
+        """
+        size = len(content)
+        with self._cond:
+            self._cond.wait_for(
+                lambda: not self._pending_count
+                or self._pending_size + size <= self.max_pending
+            )
+            self._pending_size += size
+            self._pending_count += 1
+        self._queue.put((path, content, newline, size))
+
+    def flush(self):
+        """Wait for all pending buffers to be written.
+
+        Returns:
+            The list of errors since last flush, as (path, exception) tuples
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending_count)
+            errors, self.errors = self.errors, []
+        return errors
+
+    def close(self):
+        """Flush pending buffers, report errors and stop writer threads."""
+        for path, err in self.flush():
+            msg = f"[Render][Writer] Cannot write '{path}': {err}\n"
+            App.Console.PrintError(msg)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        """Enter context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Exit context."""
+        self.close()
+
+    def _run(self):
+        """Write buffers until a None item is received (writer thread)."""
+        while (item := self._queue.get()) is not None:
+            path, content, newline, size = item
+            try:
+                with open(path, "w", encoding="utf-8", newline=newline) as f:
+                    f.write(content)
+            except OSError as err:
+                with self._cond:
+                    self.errors.append((path, err))
+            finally:
+                item = content = None  # Release buffer
+                with self._cond:
+                    self._pending_size -= size
+                    self._pending_count -= 1
+                    self._cond.notify_all()
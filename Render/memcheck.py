@@ -0,0 +1,349 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""This module implements a stage-aware memory profiler for exports.
+
+The profiler is a span recorder (see tracing): while a span (project, view,
+stage...) is open, memory is sampled in a background thread and the peaks
+are attributed to the span. Samples comprise:
+- the resident set size (RSS) of the process, which includes Numpy buffers
+  and shared memory blocks
+- the memory traced by tracemalloc
+- the number of live shared memory segments
+
+Worker processes report their own peaks, and the peaks of their children
+(multiprocessing pools), with their trace events (see workerpool).
+
+Memory profiling is enabled by 'Memcheck' parameter (see utils.set_memcheck).
+Results are output as a table and as JSON.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Sampling interval (in seconds)
+SAMPLE_INTERVAL = 0.01
+
+# Directory of shared memory segments (Posix)
+SHM_DIRECTORY = "/dev/shm"
+SHM_PREFIXES = ("psm_", "wnsm_")
+
+# Number of objects in table
+TABLE_OBJECTS = 10
+
+MB = 1024 * 1024
+
+Sample = collections.namedtuple("Sample", "rss traced shm")
+
+
+class MemoryProfiler:
+    """A memory profiler recording peaks by span (thread-safe)."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        """Initialize profiler.
+
+        Args:
+            interval -- the sampling interval, in seconds (float)
+        """
+        self.interval = float(interval)
+        self.records = []
+        self.workers = {}
+        self.peak = None
+        self._open = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._own_tracemalloc = False
+
+    def start(self):
+        """Start sampling."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+        self._stop.clear()
+        self._sampler = threading.Thread(
+            target=self._run, name="memcheck", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+
+    @contextlib.contextmanager
+    def span(self, name, cat="stage", **args):
+        """Record memory peaks during the execution of a block."""
+        sample = self.sample()
+        record = {
+            "name": str(name),
+            "cat": str(cat),
+            "object": str(args.get("object", name)),
+            "start": sample._asdict(),
+            "peak": sample._asdict(),
+        }
+        tm0 = time.time()
+        with self._lock:
+            self._open[id(record)] = record
+            self.records.append(record)
+        try:
+            yield
+        finally:
+            sample = self.sample()
+            with self._lock:
+                self._open.pop(id(record), None)
+                record["end"] = sample._asdict()
+                record["duration"] = time.time() - tm0
+
+    def add_events(self, events):
+        """Record worker peaks from worker trace events.
+
+        Peaks are lifetime peaks of the worker process (and of its
+        children), as reported by the worker at the end of each job.
+        """
+        with self._lock:
+            for event in events:
+                args = event.get("args", {})
+                if "maxrss" not in args:
+                    continue
+                worker = self.workers.setdefault(
+                    event["pid"], {"maxrss": 0, "children_maxrss": 0}
+                )
+                for key in ("maxrss", "children_maxrss"):
+                    worker[key] = max(worker[key], args.get(key) or 0)
+
+    def sample(self):
+        """Take a memory sample, and update peaks of open spans.
+
+        Returns:
+            The sample (Sample)
+        """
+        traced, _ = (
+            tracemalloc.get_traced_memory()
+            if tracemalloc.is_tracing()
+            else (0, 0)
+        )
+        sample = Sample(get_rss(), traced, count_shared_memory())
+        with self._lock:
+            self.peak = _max_sample(self.peak, sample._asdict())
+            for record in self._open.values():
+                record["peak"] = _max_sample(record["peak"], sample)
+        return sample
+
+    def _run(self):
+        """Sample memory until stopped."""
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    # Report
+
+    def report(self):
+        """Build a report of memory peaks.
+
+        Traced peaks are given relatively to the traced memory at span
+        start (memory allocated by the span, approximately: spans may run
+        concurrently).
+
+        Returns:
+            A JSON-compatible report (dict)
+        """
+        with self._lock:
+            records = [r for r in self.records if "end" in r]
+            workers = dict(self.workers)
+            peak = dict(self.peak or {})
+
+        stages = {}
+        objects = {}
+        for record in records:
+            if record["cat"] in ("stage", "worker"):
+                key, target = record["name"], stages
+            elif record["cat"] == "view":
+                key, target = record["name"], objects
+            else:
+                continue
+            entry = target.setdefault(
+                key,
+                {
+                    "name": key,
+                    "count": 0,
+                    "duration": 0.0,
+                    "peak_rss": 0,
+                    "peak_traced": 0,
+                    "peak_shm": 0,
+                },
+            )
+            entry["count"] += 1
+            entry["duration"] += record["duration"]
+            entry["peak_rss"] = max(entry["peak_rss"], record["peak"]["rss"])
+            entry["peak_traced"] = max(
+                entry["peak_traced"],
+                record["peak"]["traced"] - record["start"]["traced"],
+            )
+            entry["peak_shm"] = max(entry["peak_shm"], record["peak"]["shm"])
+
+        return {
+            "summary": {
+                "peak_rss": peak.get("rss", 0),
+                "peak_traced": peak.get("traced", 0),
+                "peak_shm": peak.get("shm", 0),
+                "process_maxrss": get_maxrss(),
+                "workers_maxrss": max(
+                    (w["maxrss"] for w in workers.values()), default=0
+                ),
+                "workers_children_maxrss": max(
+                    (w["children_maxrss"] for w in workers.values()),
+                    default=0,
+                ),
+            },
+            "stages": sorted(
+                stages.values(), key=lambda e: e["peak_traced"], reverse=True
+            ),
+            "objects": sorted(
+                objects.values(), key=lambda e: e["peak_traced"], reverse=True
+            ),
+            "workers": {str(k): v for k, v in workers.items()},
+            "spans": records,
+        }
+
+    def save(self, path, report=None):
+        """Save report as JSON.
+
+        Args:
+            path -- the path of the report file (str)
+            report -- the report to save (dict, default: current report)
+
+        Returns:
+            The path of the report file (str)
+        """
+        report = report or self.report()
+        with open(path, "w", encoding="utf-8") as fobj:
+            json.dump(report, fobj, indent=1)
+        return path
+
+
+def format_report(report, max_objects=TABLE_OBJECTS):
+    """Format a memory report as a table (str)."""
+    lines = []
+    summary = report["summary"]
+    lines.append("[ Memory check - Summary ]")
+    for key, value in summary.items():
+        value = value if key.endswith("shm") else f"{_mb(value)} MB"
+        lines.append(f"  {key:<24} {value}")
+
+    header = (
+        f"  {'':<32} {'count':>6} {'time (s)':>9} "
+        f"{'RSS (MB)':>9} {'traced (MB)':>12} {'shm':>4}"
+    )
+
+    def _rows(entries):
+        for entry in entries:
+            yield (
+                f"  {entry['name'][:32]:<32} {entry['count']:>6} "
+                f"{entry['duration']:>9.3f} {_mb(entry['peak_rss']):>9} "
+                f"{_mb(entry['peak_traced']):>12} {entry['peak_shm']:>4}"
+            )
+
+    lines.append("[ Memory check - Peaks by stage ]")
+    lines.append(header)
+    lines.extend(_rows(report["stages"]))
+    lines.append(f"[ Memory check - Peaks by object (top {max_objects}) ]")
+    lines.append(header)
+    lines.extend(_rows(report["objects"][:max_objects]))
+    return "\n".join(lines) + "\n"
+
+
+# ===========================================================================
+#                                  Helpers
+# ===========================================================================
+
+
+def get_rss():
+    """Get the current resident set size of the process, in bytes.
+
+    Current RSS is read from /proc (Linux). Elsewhere, peak RSS is returned
+    instead, if available (0 otherwise).
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fobj:
+            pages = int(fobj.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return get_maxrss()
+
+
+def get_maxrss(who=None):
+    """Get the peak resident set size, in bytes (0 if not available).
+
+    Args:
+        who -- resource.RUSAGE_SELF (default) or resource.RUSAGE_CHILDREN
+    """
+    if resource is None:
+        return 0
+    who = resource.RUSAGE_SELF if who is None else who
+    maxrss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def count_shared_memory():
+    """Count live shared memory segments created by Python (Posix).
+
+    Returns:
+        The number of segments (int), 0 if it cannot be known
+    """
+    try:
+        names = os.listdir(SHM_DIRECTORY)
+    except OSError:
+        return 0
+    return sum(1 for n in names if n.startswith(SHM_PREFIXES))
+
+
+def _max_sample(peak, sample):
+    """Get the field-wise maximum of a peak (dict) and a sample."""
+    sample = sample if isinstance(sample, dict) else sample._asdict()
+    if peak is None:
+        return dict(sample)
+    return {k: max(v, sample[k]) for k, v in peak.items()}
+
+
+def _mb(value):
+    """Format a number of bytes in megabytes."""
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return str(value)
+    return f"{value / MB:.1f}"
@@ -32,9 +32,9 @@ import math
 import sys
 import os
 import re
+import json
 from collections import namedtuple
 import concurrent.futures
-import itertools as it
 import time
 import tracemalloc
 import traceback
@@ -45,8 +45,26 @@ import FreeCAD as App
 import FreeCADGui as Gui
 
 from Render.constants import TEMPLATEDIR, PARAMS, FCDVERSION
-from Render.rdrhandler import RendererHandler, RendererNotFoundError
+from Render.rdrhandler import (
+    RendererHandler,
+    RendererNotFoundError,
+    RenderingTypes,
+)
 from Render.rdrexecutor import RendererExecutor, RendererWorker, ExporterWorker
+from Render.budget import TriangleBudget
+from Render.pruning import PRUNING_MODES, prune_views, report_pruned
+from Render.scheduling import ExportScheduler
+from Render.sceneir import SceneIR
+from Render.scenereport import build_scene_report, format_scene_report
+from Render.filewriter import AsyncFileWriter
+from Render.memcheck import MemoryProfiler, format_report
+from Render.tracing import (
+    add_recorder,
+    remove_recorder,
+    span,
+    start_tracing,
+    stop_tracing,
+)
 from Render.utils import (
     translate,
     set_last_cmd,
@@ -76,6 +94,16 @@ class Project(FeatureBase):
             ),
             "",
         ),
+        "AdditionalRenderers": Prop(
+            "App::PropertyStringList",
+            "Base",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Additional raytracing engines to render the project with. "
+                "The scene is meshed once and shared by all renderers",
+            ),
+            [],
+        ),
         "DelayedBuild": Prop(
             "App::PropertyBool",
             "Output",
@@ -188,6 +216,58 @@ class Project(FeatureBase):
             ),
             math.pi / 6,
         ),
+        "TriangleBudget": Prop(
+            "App::PropertyInteger",
+            "Mesher",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Maximum number of triangles for the whole scene "
+                "(0 = unlimited). If the estimated number of triangles "
+                "exceeds this budget, mesher deflections are increased "
+                "accordingly.",
+            ),
+            0,
+        ),
+        "ParallelTessellation": Prop(
+            "App::PropertyBool",
+            "Mesher",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "If true, shapes are tessellated in parallel worker processes "
+                "before export",
+            ),
+            False,
+        ),
+        "PruneSmallObjects": Prop(
+            "App::PropertyBool",
+            "Pruning",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "If true, objects whose projected size in the render camera "
+                "is below the pruning threshold are dropped or replaced by "
+                "their bounding box (see Pruning Mode)",
+            ),
+            False,
+        ),
+        "PruningThreshold": Prop(
+            "App::PropertyFloat",
+            "Pruning",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Projected size (in pixels) under which an object is pruned",
+            ),
+            1.0,
+        ),
+        "PruningMode": Prop(
+            "App::PropertyEnumeration",
+            "Pruning",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "What to do with pruned objects: drop them, or replace them "
+                "with their bounding box",
+            ),
+            PRUNING_MODES,
+        ),
         "TransparencySensitivity": Prop(
             "App::PropertyIntegerConstraint",
             "Render",
@@ -396,7 +476,13 @@ class Project(FeatureBase):
 
         return all_group_objs(self.fpo, include_groups)
 
-    def render(self, wait_for_completion=False, skip_meshing=False):
+    def render(
+        self,
+        wait_for_completion=False,
+        skip_meshing=False,
+        scene_ir=None,
+        renderers=None,
+    ):
         """Render the project, calling an external renderer.
 
         Args:
@@ -405,9 +491,17 @@ class Project(FeatureBase):
             skip_meshing -- flag to skip the meshing step. In this case, the
                 renderer will use existing mesh files. Mainly implemented for
                 Movie usage.
+            scene_ir -- a scene IR (sceneir.SceneIR, or the directory of a
+                saved one) to emit the scene from, instead of exporting
+                objects (see `export_scene_ir`)
+            renderers -- the renderers to render the project with (list of
+                str). Default to project renderer and additional renderers.
+                If several renderers are targeted, the scene is meshed once
+                into a scene IR, which all renderers are rendered from.
 
         Returns:
-            Output file path
+            Output file path, or list of output file paths if several
+            renderers are targeted
         """
         # Create memcheck object (debug)
         snapshot1 = 0.0
@@ -418,6 +512,7 @@ class Project(FeatureBase):
         # Normalize arguments
         wait_for_completion = bool(wait_for_completion)
         skip_meshing = bool(skip_meshing)
+        renderers = self.get_target_renderers(renderers)
 
         # Check project parameters
         if self.fpo.RenderHeight <= 0 or self.fpo.RenderWidth <= 0:
@@ -443,52 +538,204 @@ class Project(FeatureBase):
             )
             App.Console.PrintWarning(msg)
 
+        # Clear report view (if required)
+        if PARAMS.GetBool("ClearReport"):
+            clear_report_view()
+
+        # Start tracing and memory profiling (debug)
+        if trace_flag := PARAMS.GetBool("Trace"):
+            start_tracing()
+        if memcheck_flag:
+            profiler = MemoryProfiler()
+            profiler.start()
+            add_recorder(profiler)
+
+        try:
+            with span(self.fpo.Label, "project", renderers=str(renderers)):
+                if len(renderers) == 1:
+                    # Single renderer
+                    img = self._render_with(
+                        renderers[0],
+                        params,
+                        wait_for_completion,
+                        skip_meshing=skip_meshing,
+                        scene_ir=scene_ir,
+                    )
+                else:
+                    # Multiple renderers: mesh once, then emit for each
+                    # renderer, sharing mesh files when possible
+                    if scene_ir is None:
+                        scene_ir = self.export_scene_ir()
+                    shared_files = {}
+                    img = [
+                        self._render_with(
+                            rdrname,
+                            params,
+                            wait_for_completion,
+                            scene_ir=scene_ir,
+                            shared_files=shared_files,
+                        )
+                        for rdrname in renderers
+                    ]
+        finally:
+            if trace_flag:
+                self._save_trace(stop_tracing())
+            if memcheck_flag:
+                remove_recorder(profiler)
+                profiler.stop()
+                self._save_memcheck(profiler)
+
+        # Memcheck statistics (debug)
+        if memcheck_flag:
+            snapshot2 = tracemalloc.take_snapshot()
+            top_stats = snapshot2.compare_to(snapshot1, "lineno")
+            print("[ Memory check - Top 10 differences ]")
+            for stat in top_stats[:10]:
+                print(stat)
+
+        # And eventually return result path
+        return img
+
+    def _save_trace(self, tracer):
+        """Save an export trace, next to the scene file (debug).
+
+        The trace is written in Chrome trace format, and can be viewed in
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        directory = os.path.normpath(self.fpo.Document.TransientDir)
+        path = os.path.join(directory, f"{self.fpo.Name}_trace.json")
+        try:
+            tracer.save(path)
+        except OSError as err:
+            msg = f"[Render][Project] Cannot write trace: {err}\n"
+            App.Console.PrintWarning(msg)
+            return
+        msg = f"[Render][Project] Trace written to '{path}'\n"
+        App.Console.PrintMessage(msg)
+
+    def _save_memcheck(self, profiler):
+        """Print a memory report, and save it next to the scene file (debug).
+
+        The report gives memory peaks by export stage and by object (see
+        memcheck module).
+        """
+        report = profiler.report()
+        print(format_report(report))
+        directory = os.path.normpath(self.fpo.Document.TransientDir)
+        path = os.path.join(directory, f"{self.fpo.Name}_memory.json")
+        try:
+            profiler.save(path, report)
+        except OSError as err:
+            msg = f"[Render][Project] Cannot write memory report: {err}\n"
+            App.Console.PrintWarning(msg)
+            return
+        msg = f"[Render][Project] Memory report written to '{path}'\n"
+        App.Console.PrintMessage(msg)
+
+    def get_target_renderers(self, renderers=None):
+        """Get the renderers targeted by a rendering.
+
+        Args:
+            renderers -- the renderers requested by the caller (list of str),
+                or None to get project renderer and additional renderers
+
+        Returns:
+            A list of renderer names, without duplicates
+        """
+        if renderers is None:
+            renderers = [self.fpo.Renderer]
+            renderers += list(getattr(self.fpo, "AdditionalRenderers", []))
+        res = []
+        for rdrname in map(str, renderers):
+            if rdrname and rdrname not in res:
+                res.append(rdrname)
+        return res or [self.fpo.Renderer]
+
+    def _render_with(
+        self,
+        rdrname,
+        params,
+        wait_for_completion,
+        skip_meshing=False,
+        scene_ir=None,
+        shared_files=None,
+    ):
+        """Render the project with a given renderer.
+
+        This method is a (private) subroutine of `render` method.
+        Output file and object directory of renderers other than project
+        renderer are suffixed with renderer name.
+
+        Args:
+            rdrname -- the renderer name (str)
+            params -- the rendering parameters (see `_get_rendering_params`)
+            wait_for_completion -- flag to wait for rendering completion
+            skip_meshing -- flag to skip the meshing step
+            scene_ir -- a scene IR to emit the scene from (optional)
+            shared_files -- a dictionary of mesh files shared among renderers
+                (optional, see `RenderMesh.write_file`)
+
+        Returns:
+            Output file path
+        """
+        is_main = rdrname == self.fpo.Renderer
+        suffix = "" if is_main else f"_{rdrname}"
+        if not is_main:
+            root, ext = os.path.splitext(params.output)
+            params = params._replace(output=f"{root}{suffix}{ext}")
+
         # Set export directories
         project_directory = self.fpo.Document.TransientDir
         project_directory = os.path.normpath(project_directory)
-        object_directory = os.path.join(project_directory, self.fpo.Name)
+        object_directory = os.path.join(
+            project_directory, self.fpo.Name + suffix
+        )
         object_directory = os.path.normpath(object_directory)
         if not os.path.exists(object_directory):
             os.mkdir(object_directory)
 
-        # Clear report view (if required)
-        if PARAMS.GetBool("ClearReport"):
-            clear_report_view()
-
         # Get a handle to renderer module
-        try:
-            renderer = RendererHandler(
-                rdrname=self.fpo.Renderer,
-                linear_deflection=self.fpo.LinearDeflection,
-                angular_deflection=self.fpo.AngularDeflection,
-                transparency_boost=self.fpo.TransparencySensitivity,
-                project_directory=project_directory,
-                object_directory=object_directory,
-                skip_meshing=skip_meshing,
-            )
-        except RendererNotFoundError as err:
-            msg = translate("Render", "Renderer not found ('{}') ")
-            msg = msg.format(self.fpo.Renderer)
-            raise RenderingError(msg) from err
+        renderer = self._get_renderer_handler(
+            project_directory,
+            object_directory,
+            rdrname=rdrname,
+            skip_meshing=skip_meshing,
+        )
 
         # Get the rendering template
-        template = self._get_rendering_template()
-
-        # Build a default camera, to be used if no camera is present in the
-        # scene
-        defaultcam = self._get_default_cam(renderer)
-
-        # Get objects rendering strings (including lights, cameras...)
-        objstrings = self._get_objstrings(renderer)
+        template_path = self._get_template_path(rdrname)
+        template = self._get_rendering_template(template_path)
+
+        # Mesh files are written asynchronously, while export goes on. On
+        # exit, writer waits for all files to be written
+        with span(rdrname, "export"), AsyncFileWriter() as file_writer:
+            renderer.file_writer = file_writer
+            if scene_ir is None:
+                # Build a default camera, to be used if no camera is present
+                # in the scene
+                defaultcam = self._get_default_cam(renderer)
+
+                # Get objects rendering strings (including lights, cameras...)
+                objstrings = self._get_objstrings(renderer)
+            else:
+                # Emit default camera and objects strings from scene IR
+                if not isinstance(scene_ir, SceneIR):
+                    scene_ir = SceneIR.load(scene_ir)
+                objstrings, defaultcam = scene_ir.emit(renderer, shared_files)
+                defaultcam = defaultcam or self._get_default_cam(renderer)
+        renderer.file_writer = None
 
         # Instantiate template: merge all strings (cam, objects, ground
         # plane...) into rendering template
-        instantiated = _instantiate_template(template, objstrings, defaultcam)
-
-        # Write instantiated template into a temporary file
-        fpath = self._write_instantiated_template_to_file(
-            instantiated, project_directory
-        )
+        # Then write instantiated template into a temporary file
+        with span("template", renderer=rdrname):
+            instantiated = _instantiate_template(
+                template, objstrings, defaultcam
+            )
+            _, template_ext = os.path.splitext(template_path)
+            fpath = self._write_instantiated_template_to_file(
+                instantiated, project_directory, suffix + template_ext
+            )
 
         # Get the renderer command on the generated temp file, with rendering
         # params
@@ -517,13 +764,6 @@ class Project(FeatureBase):
             # Debug purpose only
             App.Console.PrintWarning("*** DRY RUN ***\n")
             App.Console.PrintMessage(cmd)
-            # Memcheck statistics (debug)
-            if memcheck_flag:
-                snapshot2 = tracemalloc.take_snapshot()
-                top_stats = snapshot2.compare_to(snapshot1, "lineno")
-                print("[ Memory check - Top 10 differences ]")
-                for stat in top_stats[:10]:
-                    print(stat)
             return None
 
         # Execute renderer
@@ -531,27 +771,134 @@ class Project(FeatureBase):
             cmd, img, os.path.dirname(fpath), self.fpo.OpenAfterRender
         )
         rdr_executor = RendererExecutor(rdr_worker)
-        rdr_executor.start()
-        if wait_for_completion:
-            # Useful in console mode...
-            rdr_executor.join()
-
-        # Memcheck statistics (debug)
-        if memcheck_flag:
-            snapshot2 = tracemalloc.take_snapshot()
-            top_stats = snapshot2.compare_to(snapshot1, "lineno")
-            print("[ Memory check - Top 10 differences ]")
-            for stat in top_stats[:10]:
-                print(stat)
+        with span("renderer run", renderer=rdrname):
+            rdr_executor.start()
+            if wait_for_completion:
+                # Useful in console mode...
+                rdr_executor.join()
 
-        # And eventually return result path
         return img
 
-    def _get_rendering_template(self):
-        """Get the rendering template for the project.
+    def scene_report(self, sort="triangles", top=None, save=True):
+        """Report the complexity of the scene, without rendering it.
+
+        Views are walked as for an export, but nothing is meshed nor
+        written: triangle counts are estimated (see budget). The report
+        also counts unique and instanced geometry, and lists textures (with
+        their dimensions and decoded memory), materials and lights.
+        The report is printed in console, as tables.
+
+        Args:
+            sort -- the column to sort objects by (str, see
+                scenereport.SORT_KEYS)
+            top -- the maximum number of objects to print (int, default: all)
+            save -- flag to save the report as JSON, in document transient
+                directory ('<Name>_report.json')
+
+        Returns:
+            The report (dict)
+        """
+        views = self._get_export_views()
+        report = build_scene_report(
+            views, self.fpo.LinearDeflection, self.fpo.AngularDeflection
+        )
+        report["project"] = self.fpo.Label
+        report["renderer"] = self.fpo.Renderer
+        App.Console.PrintMessage(format_scene_report(report, sort, top))
+
+        if save:
+            directory = os.path.normpath(self.fpo.Document.TransientDir)
+            path = os.path.join(directory, f"{self.fpo.Name}_report.json")
+            try:
+                with open(path, "w", encoding="utf-8") as fobj:
+                    json.dump(report, fobj, indent=1)
+            except OSError as err:
+                msg = f"[Render][Report] Cannot write report: {err}\n"
+                App.Console.PrintWarning(msg)
+            else:
+                msg = f"[Render][Report] Report written to '{path}'\n"
+                App.Console.PrintMessage(msg)
+
+        return report
+
+    def export_scene_ir(self, directory=None):
+        """Export the project into a renderer-neutral scene IR.
+
+        Objects are meshed once and stored on disk, with lights, cameras and
+        material references. The IR can then be rendered with any renderer,
+        without re-meshing (see `render`).
+
+        Args:
+            directory -- the directory where to store the IR (str). Default
+                to '<Name>_ir' in document transient directory
+
+        Returns:
+            The scene IR (sceneir.SceneIR)
+        """
+        project_directory = os.path.normpath(self.fpo.Document.TransientDir)
+        if directory is None:
+            directory = os.path.join(project_directory, f"{self.fpo.Name}_ir")
+        scene_ir = SceneIR(directory)
+
+        renderer = self._get_renderer_handler(
+            project_directory,
+            scene_ir.directory,
+            scene_ir=scene_ir,
+            record_only=True,
+        )
+        with span("scene IR", "export"):
+            self._get_default_cam(renderer)
+            self._get_objstrings(renderer, force_build=True)
+
+        path = scene_ir.save()
+        msg = (
+            f"[Render][Project] Scene IR exported to '{path}' "
+            f"({len(scene_ir.meshes)} unique meshes)\n"
+        )
+        App.Console.PrintMessage(msg)
+        return scene_ir
+
+    def _get_renderer_handler(
+        self, project_directory, object_directory, rdrname=None, **kwargs
+    ):
+        """Get a handler to a renderer (default: project renderer).
 
         This method is a (private) subroutine of `render` method.
-        RenderingError is raised if template file is not found.
+        RenderingError is raised if renderer is not found.
+
+        Args:
+            project_directory -- the directory where the project is exported
+            object_directory -- the directory where the objects are exported
+            rdrname -- the renderer name (str, optional)
+            kwargs -- additional keyword arguments for RendererHandler
+        """
+        rdrname = rdrname or self.fpo.Renderer
+        try:
+            renderer = RendererHandler(
+                rdrname=rdrname,
+                linear_deflection=self.fpo.LinearDeflection,
+                angular_deflection=self.fpo.AngularDeflection,
+                transparency_boost=self.fpo.TransparencySensitivity,
+                project_directory=project_directory,
+                object_directory=object_directory,
+                **kwargs,
+            )
+        except RendererNotFoundError as err:
+            msg = translate("Render", "Renderer not found ('{}') ")
+            msg = msg.format(rdrname)
+            raise RenderingError(msg) from err
+        return renderer
+
+    def _get_template_path(self, rdrname=None):
+        """Get the path of the rendering template for a renderer.
+
+        For project renderer, this is the project template. For other
+        renderers, this is the template of the same variant (for instance
+        'studio_light'), or the standard template of the renderer if there is
+        no such variant.
+
+        This method is a (private) subroutine of `render` method.
+        RenderingError is raised if no template is found.
         """
         # Compute template_path from project's Template parameter.
         # This parameter gives a relative path to template.
@@ -563,6 +910,36 @@ class Project(FeatureBase):
             # Current template path (relative path)
             template_path = os.path.join(TEMPLATEDIR, self.fpo.Template)
 
+        if not rdrname or rdrname == self.fpo.Renderer:
+            return template_path
+
+        # Other renderer: look for a template variant
+        basename, _ = os.path.splitext(os.path.basename(template_path))
+        variant = re.sub(r"^[^_]*_", "", basename)
+        templates = {
+            os.path.splitext(f)[0]: f for f in os.listdir(TEMPLATEDIR)
+        }
+        for candidate in (variant, "standard"):
+            try:
+                template = templates[f"{rdrname.lower()}_{candidate}"]
+            except KeyError:
+                continue
+            return os.path.join(TEMPLATEDIR, template)
+        msg = translate("Render", "No template found for renderer '{}'")
+        raise RenderingError(msg.format(rdrname))
+
+    def _get_rendering_template(self, template_path=None):
+        """Get the rendering template for the project.
+
+        This method is a (private) subroutine of `render` method.
+        RenderingError is raised if template file is not found.
+
+        Args:
+            template_path -- the path of the template (default: project
+                template, see `_get_template_path`)
+        """
+        template_path = template_path or self._get_template_path()
+
         # Open file and get content
         try:
             with open(template_path, "r", encoding="utf8") as template_file:
@@ -574,12 +951,55 @@ class Project(FeatureBase):
 
         return template
 
-    def _get_objstrings(self, renderer):
+    def _get_objstrings(self, renderer, force_build=False):
         """Get rendering strings for all objects in project.
 
         This method is a (private) subroutine of `render` method.
         Besides standard FCD objects (parts, shapes...), objects encompass
         lights and cameras.
+        If `force_build` is set, strings are computed even if DelayedBuild is
+        false.
+        """
+        views = self._get_export_views()
+
+        # If DelayedBuild is false, we rely on views' ViewResult precomputed
+        # values.
+        if not self.fpo.DelayedBuild and not force_build:
+            return [v.ViewResult for v in views]
+
+        # Otherwise, we have to compute strings
+        # Triangle budget
+        if (budget := getattr(self.fpo, "TriangleBudget", 0)) > 0:
+            renderer.triangle_budget = TriangleBudget(
+                budget,
+                renderer.linear_deflection,
+                renderer.angular_deflection,
+            )
+            renderer.triangle_budget.estimate(views)
+
+        # Parallel tessellation
+        tessellate = getattr(self.fpo, "ParallelTessellation", False)
+        if tessellate and not renderer.skip_meshing:
+            renderer.pretessellate(views)
+
+        objstrings = _get_objstrings_helper(renderer, views)
+
+        if renderer.tessellation is not None:
+            renderer.tessellation.clear()
+            renderer.tessellation = None
+
+        if renderer.triangle_budget is not None:
+            renderer.triangle_budget.report()
+
+        return objstrings
+
+    def _get_export_views(self):
+        """Get the views to export.
+
+        This method is a (private) subroutine of `_get_objstrings` and
+        `scene_report` methods. Hidden views are skipped (if App.Gui is up),
+        small objects are pruned (if required) and a ground plane is added
+        (if required).
         """
         # Gather the views to render
         # If App.Gui is up, we take View's Visibility property into account
@@ -589,26 +1009,39 @@ class Project(FeatureBase):
             else self.all_views()
         )
 
+        # Prune small objects if required
+        if getattr(self.fpo, "PruneSmallObjects", False):
+            mode = self.fpo.PruningMode
+            views, pruned = prune_views(
+                views,
+                self._get_render_camsource(views),
+                (self.fpo.RenderWidth, self.fpo.RenderHeight),
+                self.fpo.PruningThreshold,
+                mode,
+            )
+            report_pruned(pruned, mode)
+
         # Add a ground plane if required
         if getattr(self.fpo, "GroundPlane", False):
             views.append(create_groundplane_view(self))
 
-        # If DelayedBuild is false, we rely on views' ViewResult precomputed
-        # values.
-        if not self.fpo.DelayedBuild:
-            return [v.ViewResult for v in views]
-
-        # Otherwise, we have to compute strings
-        return _get_objstrings_helper(renderer, views)
+        return views
 
-    def _write_instantiated_template_to_file(self, template, directory):
+    def _write_instantiated_template_to_file(
+        self, template, directory, suffix=None
+    ):
         """Write an instantiated template to a temporary file.
 
         This method is a (private) subroutine of `render` method.
 
+        Args:
+            suffix -- the suffix of the file name, including extension
+                (default: project template extension)
+
         Returns path to temp file.
         """
-        _, suffix = os.path.splitext(self.fpo.Template)
+        if suffix is None:
+            _, suffix = os.path.splitext(self.fpo.Template)
         fpath = os.path.join(directory, self.fpo.Name + suffix)
         with open(fpath, "w", encoding="utf8") as fobj:
             fobj.write(template)
@@ -666,13 +1099,20 @@ class Project(FeatureBase):
         """Build a default camera for rendering.
 
         This function is a (private) subroutine of `render` method.
+        See `_get_default_camsource`.
+        """
+        camsource = self._get_default_camsource()
+        return renderer.get_camsource_string(camsource, self.fpo)
+
+    def _get_default_camsource(self):
+        """Get the default camera for rendering, in view.Source format.
+
         If GUI is up, the default camera is built from the ActiveView camera, ie
         the camera from which objects are seen in FreeCAD viewport. Otherwise
         (console mode), the camera is built from a hardcoded value, hosted in
         DEFAULT_CAMERA_STRING constant.
         """
-        project = self.fpo
-        docname = project.Document.Name
+        docname = self.fpo.Document.Name
         if App.GuiUp:
             App.setActiveDocument(docname)
             camstr = Gui.ActiveDocument.ActiveView.getCamera()
@@ -682,7 +1122,22 @@ class Project(FeatureBase):
             camsource = get_cam_from_coin_string(camstr)
         except ValueError:
             camsource = get_cam_from_coin_string(DEFAULT_CAMERA_STRING)
-        return renderer.get_camsource_string(camsource, project)
+        return camsource
+
+    def _get_render_camsource(self, views):
+        """Get the camera the scene will be rendered from.
+
+        This is the first camera among views, if any, or the default camera
+        otherwise.
+        """
+        for view in views:
+            try:
+                rendering_type = view.Source.Proxy.RENDERING_TYPE
+            except AttributeError:
+                continue
+            if rendering_type == RenderingTypes.CAMERA:
+                return view.Source
+        return self._get_default_camsource()
 
 
 def _instantiate_template(template, objstrings, defaultcam):
@@ -748,6 +1203,10 @@ class ViewProviderProject(ViewProviderBase):
             QT_TRANSLATE_NOOP("Render", "Change template"),
             "change_template",
         ),
+        CtxMenuItem(
+            QT_TRANSLATE_NOOP("Render", "Scene report"),
+            "scene_report",
+        ),
     ]
 
     def __init__(self, vobj):
@@ -803,6 +1262,17 @@ class ViewProviderProject(ViewProviderBase):
         except RenderingError as err:
             App.Console.PrintError(err.message + "\n")
 
+    def scene_report(self):
+        """Report scene complexity.
+
+        This method calls proxy's 'scene_report' method.
+        """
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.fpo.Proxy.scene_report()
+        finally:
+            QApplication.restoreOverrideCursor()
+
     def change_template(self):
         """Change the template of the project."""
         fpo = self.fpo
@@ -854,8 +1324,9 @@ def _get_objstrings_helper(renderer, views):
     This helper is convenient for debugging purpose (easier to reload).
     """
     get_rdr_string = renderer.get_rendering_string
+    jobs = ExportScheduler(views, renderer.triangle_budget)
     exporter_worker = ExporterWorker(
-        _get_objstrings_worker, (get_rdr_string, views)
+        _get_objstrings_worker, (get_rdr_string, jobs)
     )
     rdr_executor = RendererExecutor(exporter_worker)
     rdr_executor.start()
@@ -867,26 +1338,11 @@ def _get_objstrings_helper(renderer, views):
     return objstrings
 
 
-def grouper(iterable, number):
-    "Collect data into fixed-length chunks or blocks"
-    # grouper('ABCDEFG', 3, 'x') --> ABC DEF G"
-    args = [iter(iterable)] * number
-    return it.zip_longest(*args, fillvalue=None)
-
-
-def partition(pred, iterable):
-    "Use a predicate to partition entries into false entries and true entries"
-    # partition(is_odd, range(10)) --> 0 2 4 6 8   and  1 3 5 7 9
-    tee1, tee2 = it.tee(iterable)
-    return it.filterfalse(pred, tee1), filter(pred, tee2)
-
+def _get_objstrings_worker(get_rdr_string, jobs, multithreaded=True):
+    """Get strings from renderer (worker).
 
-MIN_CHUNK_SIZE = 100
-MAX_CHUNK_SIZE = 1000
-
-
-def _get_objstrings_worker(get_rdr_string, views, multithreaded=True):
-    """Get strings from renderer (worker)."""
+    Jobs are submitted in scheduler order (heaviest first).
+    """
     try:
         if App.GuiUp:
             QApplication.setOverrideCursor(Qt.WaitCursor)
@@ -898,43 +1354,25 @@ def _get_objstrings_worker(get_rdr_string, views, multithreaded=True):
 
         max_workers = min(32, os.cpu_count() + 4)
 
-        # Objects will be processed in chunks
-        # Heavy objects will be "packed individually" (1 chunk per object)
-        # For light objects, we'll compute a chunk size
-        heavy, light = partition(
-            lambda x: not hasattr(x.Source, "Terrain"), views
-        )
-
-        heavy = list(heavy)
-        light = list(light)
-
-        chunk_size = len(light) // (max_workers * 2)
-        chunk_size = max(chunk_size, MIN_CHUNK_SIZE)
-        chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
-        chunk_size = 1
-
-        chunks = list(it.chain(grouper(heavy, 1), grouper(light, chunk_size)))
-
         msg = (
-            f"[Render][Objstrings] {len(chunks)} chunks: "
-            f"{len(heavy)} heavy - {len(chunks) - len(heavy)} light "
-            f"(size: {chunk_size})\n"
+            f"[Render][Objstrings] {len(jobs)} objects - "
+            f"estimated cost: {jobs.estimated_cost:.3f}s\n"
         )
         App.Console.PrintMessage(msg)
 
-        def worker(chunk):
-            return [get_rdr_string(v) for v in chunk if v is not None]
+        def worker(job):
+            return ExportScheduler.timed(job, get_rdr_string)
 
         # Process views
+        # Each view is a task: idle workers pull the next heaviest view from
+        # the executor queue
         if multithreaded:
             with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
-                submits = (pool.submit(worker, chunk) for chunk in chunks)
+                submits = [pool.submit(worker, job) for job in jobs]
                 futures = concurrent.futures.as_completed(submits)
-                objstrings = list(
-                    it.chain.from_iterable(f.result() for f in futures)
-                )
+                objstrings = [f.result() for f in futures]
         else:
-            objstrings = list(map(get_rdr_string, views))
+            objstrings = list(map(worker, jobs))
 
         App.Console.PrintMessage(
             "[Render][Objstrings] ENDING OBJECTS EXPORT - TIME: "
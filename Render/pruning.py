@@ -0,0 +1,202 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements small-object pruning, based on screen size.
+
+Views whose projected bounding box in the render camera is smaller than a
+pixel threshold are either dropped or replaced by a bounding box proxy (a
+ducktyping view, like the ground plane).
+
+The projected size is computed from the bounding sphere of the object, which
+makes it a conservative estimate. Objects behind the camera are kept:
+pruning is complementary to frustum culling.
+"""
+
+from types import SimpleNamespace
+from math import radians, tan, asin
+import collections
+
+import FreeCAD as App
+import Mesh
+
+from Render.rdrhandler import RenderingTypes
+from Render.utils import WHITE
+
+PRUNING_MODES = ("Drop", "BoundingBox")
+
+PrunedView = collections.namedtuple("PrunedView", "label size")
+
+
+def get_bound_box(source):
+    """Get the bounding box of a view source (Shape or Mesh).
+
+    Returns:
+        A bounding box, or None if source has no Shape nor Mesh.
+    """
+    for attr_name in ("Shape", "Mesh"):
+        try:
+            return getattr(source, attr_name).BoundBox
+        except AttributeError:
+            pass
+    return None
+
+
+def projected_size(bbox, camsource, resolution):
+    """Compute the projected size, in pixels, of a bounding box.
+
+    Args:
+        bbox -- the bounding box to project (App.BoundBox)
+        camsource -- the camera (in view.Source format)
+        resolution -- the rendering resolution (width, height), in pixels
+
+    Returns:
+        The projected size (float), or None if the size cannot be computed
+        (invalid box, camera inside the box, box behind the camera...)
+    """
+    if not bbox.isValid():
+        return None
+    radius = bbox.DiagonalLength / 2
+    height = resolution[1]
+    placement = camsource.Placement
+
+    if camsource.Projection == "Orthographic":
+        return 2 * radius / float(camsource.Height) * height
+
+    # Perspective
+    center = bbox.Center
+    direction = placement.Rotation.multVec(App.Vector(0, 0, -1))
+    relative = center - placement.Base
+    distance = relative.Length
+    if distance <= radius or relative.dot(direction) <= 0:
+        return None
+    half_fov = radians(float(camsource.HeightAngle)) / 2
+    return height * tan(asin(radius / distance)) / tan(half_fov)
+
+
+def prune_views(views, camsource, resolution, threshold, mode="Drop"):
+    """Prune views whose projected size is below a threshold.
+
+    Only objects are pruned: lights and cameras are always kept.
+
+    Args:
+        views -- the views to prune (list)
+        camsource -- the render camera (in view.Source format)
+        resolution -- the rendering resolution (width, height), in pixels
+        threshold -- the size threshold, in pixels (float)
+        mode -- "Drop" to remove pruned views, "BoundingBox" to replace them
+            with a bounding box proxy
+
+    Returns:
+        The list of remaining views (including proxies)
+        The list of pruned views (as PrunedView)
+    """
+    assert mode in PRUNING_MODES, f"Invalid pruning mode '{mode}'"
+    kept, pruned = [], []
+    for view in views:
+        source = view.Source
+        try:
+            rendering_type = source.Proxy.RENDERING_TYPE
+        except AttributeError:
+            rendering_type = RenderingTypes.OBJECT
+        if rendering_type != RenderingTypes.OBJECT:
+            kept.append(view)
+            continue
+
+        bbox = get_bound_box(source)
+        size = projected_size(bbox, camsource, resolution) if bbox else None
+        if size is None or size >= threshold:
+            kept.append(view)
+            continue
+
+        pruned.append(PrunedView(source.Label, size))
+        if mode == "BoundingBox":
+            kept.append(create_bbox_proxy_view(view, bbox))
+
+    return kept, pruned
+
+
+def report_pruned(pruned, mode):
+    """Report pruned views in console.
+
+    Args:
+        pruned -- the pruned views (list of PrunedView)
+        mode -- the pruning mode
+    """
+    msg = f"[Render][Pruning] {len(pruned)} view(s) pruned (mode: {mode})\n"
+    App.Console.PrintMessage(msg)
+    for label, size in sorted(pruned, key=lambda x: x.size):
+        App.Console.PrintMessage(
+            f"[Render][Pruning]   '{label}': {size:.2f} px\n"
+        )
+
+
+def create_bbox_proxy_view(view, bbox):
+    """Create a (ducktyping) view on a bounding box proxy of a view."""
+    result = SimpleNamespace()
+    result.Source = _BoundingBoxProxy(view.Source, bbox)
+    result.AutoSmooth = False
+    result.AutoSmoothAngle = 0.0
+    result.Material = getattr(view, "Material", None)
+    return result
+
+
+class _BoundingBoxProxy:
+    """A ducktyping object that will be rendered as a box."""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, source, bbox):
+        """Initialize.
+
+        Args:
+            source -- the object to replace
+            bbox -- the bounding box of the object (App.BoundBox)
+        """
+        # pylint: disable=invalid-name
+        self.Name = f"{source.Name}__proxy__"
+        self.FullName = f"{source.FullName}__proxy__"
+        self.Label = f"{source.Label} (proxy)"
+
+        self.Mesh = Mesh.createBox(
+            max(bbox.XLength, 1e-6),
+            max(bbox.YLength, 1e-6),
+            max(bbox.ZLength, 1e-6),
+        )
+        self.Mesh.translate(*bbox.Center)
+        self.Document = source.Document
+        self.Placement = App.Placement()
+
+        vobj = getattr(source, "ViewObject", None)
+        self.ViewObject = SimpleNamespace()
+        self.ViewObject.Visibility = True
+        self.ViewObject.ShapeColor = getattr(
+            vobj, "ShapeColor", WHITE.to_srgb()
+        )
+        self.ViewObject.Transparency = getattr(vobj, "Transparency", 0)
+
+        self.Proxy = SimpleNamespace()
+        self.Proxy.RENDERING_TYPE = RenderingTypes.OBJECT
+
+    # pylint: disable=invalid-name
+    @staticmethod
+    def isDerivedFrom(classname):
+        """Mimic a Mesh::Feature."""
+        return classname == "Mesh::Feature"
@@ -43,6 +43,7 @@ input colors in linear colorspace. A conversion is made.
 
 import functools
 import enum
+import threading
 from importlib import import_module
 from types import SimpleNamespace
 import time
@@ -52,10 +53,21 @@ import MeshPart
 import Mesh
 
 import Render.rendermesh
-from Render.utils import translate, debug, message, warn, getproxyattr, RGB
+from Render.utils import (
+    translate,
+    debug,
+    message,
+    warn,
+    getproxyattr,
+    find_python,
+    RGB,
+)
 from Render.constants import PARAMS
 from Render import renderables
 from Render import rendermaterial
+from Render.sceneir import DEFAULT_CAMERA_GROUP, get_neutral_prefixes
+from Render.tessellation import ParallelTessellation
+from Render.tracing import span
 
 
 # ===========================================================================
@@ -118,6 +130,18 @@ class RendererHandler:
             object_directory -- the directory where the objects are to be
                 exported
             skip_meshing -- a flag to skip the meshing step
+            triangle_budget -- a triangle budget (budget.TriangleBudget),
+                providing deflections per object and collecting triangle
+                counts (optional)
+            scene_ir -- a scene intermediate representation (sceneir.SceneIR)
+                to record the scene into (optional)
+            record_only -- a flag to only record the scene into scene_ir,
+                without calling the renderer module
+            tessellation -- a parallel tessellation
+                (tessellation.ParallelTessellation) to get meshes from
+                (optional, see `pretessellate`)
+            file_writer -- an asynchronous writer for mesh files
+                (filewriter.AsyncFileWriter, optional)
         """
         self.renderer_name = str(rdrname)
         self.linear_deflection = float(kwargs.get("linear_deflection", 0.1))
@@ -128,6 +152,12 @@ class RendererHandler:
         self.project_directory = kwargs.get("project_directory")
         self.object_directory = kwargs.get("object_directory")
         self.skip_meshing = bool(kwargs.get("skip_meshing", False))
+        self.triangle_budget = kwargs.get("triangle_budget")
+        self.scene_ir = kwargs.get("scene_ir")
+        self.record_only = bool(kwargs.get("record_only", False))
+        self.tessellation = kwargs.get("tessellation")
+        self.file_writer = kwargs.get("file_writer")
+        self._context = threading.local()
 
         try:
             module_name = f"Render.renderers.{rdrname}"
@@ -284,35 +314,43 @@ class RendererHandler:
     def _get_renderer_specifics(self, view):
         """Get specific parameters of the renderer for a given view."""
         rdrname = self.renderer_name
+        return {
+            p[len(rdrname) :]: v
+            for p, v in self._get_specifics(view, rdrname).items()
+        }
 
-        # Source properties
-        src = view.Source
-        try:
-            properties = src.PropertiesList
-        except AttributeError:
-            res = {}
-        else:
-            res = {
-                p[len(rdrname) :]: src.getPropertyByName(p)
-                for p in properties
-                if p.startswith(rdrname)
-            }
+    @staticmethod
+    def _get_specifics(view, prefixes):
+        """Get specific parameters for a given view (unstripped names).
 
-        # View properties
-        try:
-            properties = view.PropertiesList
-        except AttributeError:
-            pass
-        else:
+        Args:
+            view -- the view to get the parameters from
+            prefixes -- the renderer name(s) to look for (str or tuple)
+        """
+        res = {}
+        for obj in (view.Source, view):  # View properties take precedence
+            try:
+                properties = obj.PropertiesList
+            except AttributeError:
+                continue
             res.update(
                 {
-                    p[len(rdrname) :]: view.getPropertyByName(p)
+                    p: obj.getPropertyByName(p)
                     for p in properties
-                    if p.startswith(rdrname)
+                    if p.startswith(prefixes)
                 }
             )
         return res
 
+    def _strip_specifics(self, specifics):
+        """Select and strip renderer specifics among all renderers ones."""
+        rdrname = self.renderer_name
+        return {
+            p[len(rdrname) :]: v
+            for p, v in specifics.items()
+            if p.startswith(rdrname)
+        }
+
     def _get_general_data(self):
         """Get general data for keyword arguments."""
         return {
@@ -336,6 +374,8 @@ class RendererHandler:
         source = view.Source
         name = str(source.FullName)
         msg = translate("Render", "Exporting")
+        self._context.group = name
+        self._context.view = view
 
         # Render Workbench objects
         try:
@@ -374,12 +414,48 @@ class RendererHandler:
             return ""
         return result
 
+    def pretessellate(self, views):
+        """Tessellate the shapes of views in worker processes.
+
+        This method runs a recording pass on object views (in current
+        thread), then tessellates the recorded shapes in parallel processes.
+        Afterwards, `get_rendering_string` uses the pre-tessellated meshes.
+
+        Parameters:
+        views -- the views to tessellate
+        """
+        if not (python := find_python()):
+            msg = (
+                "[Render][Tessellation] Python executable not found - "
+                "Skipping parallel tessellation\n"
+            )
+            App.Console.PrintWarning(msg)
+            return
+        self.tessellation = ParallelTessellation(python, self.object_directory)
+
+        # Recording pass
+        for view in views:
+            source = view.Source
+            if hasattr(getattr(source, "Proxy", None), "RENDERING_TYPE"):
+                continue
+            if getproxyattr(source, "type", None) == "PointLight":
+                continue
+            name = str(source.FullName)
+            try:
+                RendererHandler._render_object(self, name, view)
+            # pylint: disable=broad-exception-caught
+            except Exception as err:
+                debug("Tessellation", name, f"Not recorded ({err})")
+
+        with span("parallel tessellation", count=len(views)):
+            self.tessellation.run()
+
     def get_camsource_string(self, camsource, project):
         """Get a rendering string from a camera in 'view.Source' format."""
-        return self._render_camera(
-            "Default_Camera",
-            SimpleNamespace(Source=camsource, InListRecursive=[project]),
-        )
+        view = SimpleNamespace(Source=camsource, InListRecursive=[project])
+        self._context.group = DEFAULT_CAMERA_GROUP
+        self._context.view = view
+        return self._render_camera("Default_Camera", view)
 
     def _render_object(self, name, view):
         """Get a rendering string for a generic FreeCAD object.
@@ -400,6 +476,29 @@ class RendererHandler:
         except AttributeError:
             autosmooth_angle = 0
 
+        # Decimation
+        if getattr(view, "Decimate", False):
+            try:
+                crease_angle = view.DecimationCreaseAngle.getValueAs("rad")
+            except AttributeError:
+                crease_angle = 0
+            decimation = Render.rendermesh.RenderMeshDecimation(
+                int(view.DecimationTarget),
+                float(view.DecimationMaxError.Value),
+                float(crease_angle),
+            )
+        else:
+            decimation = None
+
+        # Deflections (may be adjusted by triangle budget)
+        budget = self.triangle_budget
+        if budget is not None:
+            linear_deflection, angular_deflection = budget.deflections(name)
+        else:
+            linear_deflection = self.linear_deflection
+            angular_deflection = self.angular_deflection
+        view_name = name
+
         # Mesher
         def mesher(
             shape,
@@ -441,6 +540,26 @@ class RendererHandler:
                 )
                 return rendermesh
 
+            # Parallel tessellation recording pass?
+            tessellation = self.tessellation
+            if tessellation is not None and tessellation.recording:
+                # We just snapshot the shape, and return an empty mesh
+                if not is_already_a_mesh:
+                    tessellation.record(
+                        name, shape, linear_deflection, angular_deflection
+                    )
+                mesh = Mesh.Mesh()
+                mesh.Placement = shape.Placement
+                rendermesh = Render.rendermesh.create_rendermesh(
+                    mesh,
+                    project_directory=self.project_directory,
+                    export_directory=self.object_directory,
+                    relative_path=True,
+                    skip_meshing=True,
+                    name=fullname,
+                )
+                return rendermesh
+
             # Log
             debug("Object", fullname, "Begin meshing")
             tm0 = time.time()
@@ -449,17 +568,20 @@ class RendererHandler:
             if is_already_a_mesh:
                 mesh = shape.Mesh.copy()
             else:
-                # Generate mesh
+                # Generate mesh (unless already tessellated in parallel)
                 # Nota: the shape placement is stored in the mesh placement...
-                shape = shape.copy()
                 shape_plc = shape.Placement
-                shape.Placement = App.Base.Placement()
-                mesh = MeshPart.meshFromShape(
-                    Shape=shape,
-                    LinearDeflection=self.linear_deflection,
-                    AngularDeflection=self.angular_deflection,
-                    Relative=False,
-                )
+                mesh = tessellation.get(name) if tessellation else None
+                if mesh is None:
+                    shape = shape.copy()
+                    shape.Placement = App.Base.Placement()
+                    with span("tessellate", object=fullname):
+                        mesh = MeshPart.meshFromShape(
+                            Shape=shape,
+                            LinearDeflection=linear_deflection,
+                            AngularDeflection=angular_deflection,
+                            Relative=False,
+                        )
                 mesh.Placement = shape_plc
             if debug_flag:
                 tm1 = time.time() - tm0
@@ -476,7 +598,10 @@ class RendererHandler:
                 relative_path=True,
                 skip_meshing=skip_meshing,
                 name=fullname,
+                decimation=decimation,
             )
+            if budget is not None:
+                budget.count(view_name, mesh.count_facets)
 
             duration = time.time() - tm0
             msg = f"End meshing ({duration}s)"
@@ -497,7 +622,8 @@ class RendererHandler:
         kwargs.update(general_data)
         debug("Object", label, "Processing")
 
-        # Build a list of renderables from the object
+        # Build renderables from the object (lazily: meshing happens as
+        # renderables are iterated)
         material = view.Material
         tpboost = self.transparency_boost
 
@@ -511,9 +637,11 @@ class RendererHandler:
         )
         rends = renderables.check_renderables(rends)
 
-        # Rescale to meters
-        for rend in rends:
-            rend.mesh.convert_distances(SCALE, self.skip_meshing)
+        # Parallel tessellation recording pass: just record shapes
+        if self.tessellation is not None and self.tessellation.recording:
+            for _ in rends:
+                pass
+            return ""
 
         # Call renderer on renderables, concatenate and return
         write_mesh = functools.partial(
@@ -526,28 +654,47 @@ class RendererHandler:
         get_mat = rendermaterial.get_rendering_material
         rdrname = self.renderer_name
 
+        if self.scene_ir is not None:
+            neutral = self._get_specifics(view, get_neutral_prefixes())
+
+        # Each renderable is processed and released before the next one is
+        # meshed, so that only one mesh at a time is held in memory
         res = []
         for renderable in rends:
-            material = get_mat(
-                renderable.name,
-                renderable.material,
-                rdrname,
-                renderable.defcolor,
-            )
-            try:
-                objstring = write_mesh(
-                    renderable.name,
-                    renderable.mesh,
-                    material,
-                )
-            except Render.rendermesh.SkipMeshingError as err:
-                msg = (
-                    f"[Render][Objstring] '{label}': File not found "
-                    f"while attempting to reuse meshing ('{err.filename}').\n"
-                )
-                App.Console.PrintWarning(msg)
-            else:
-                res.append(objstring)
+            with span(renderable.name, "renderable"):
+                # Rescale to meters
+                renderable.mesh.convert_distances(SCALE, self.skip_meshing)
+
+                # Record into scene IR
+                if self.scene_ir is not None:
+                    self.scene_ir.add_renderable(name, renderable, neutral)
+                    if self.record_only:
+                        renderable.mesh.release()
+                        continue
+
+                with span("material"):
+                    material = get_mat(
+                        renderable.name,
+                        renderable.material,
+                        rdrname,
+                        renderable.defcolor,
+                    )
+                try:
+                    objstring = write_mesh(
+                        renderable.name,
+                        renderable.mesh,
+                        material,
+                    )
+                except Render.rendermesh.SkipMeshingError as err:
+                    msg = (
+                        f"[Render][Objstring] '{label}': File not found "
+                        "while attempting to reuse meshing "
+                        f"('{err.filename}').\n"
+                    )
+                    App.Console.PrintWarning(msg)
+                else:
+                    res.append(objstring)
+                renderable.mesh.release()
 
         return "".join(res)
 
@@ -803,9 +950,59 @@ class RendererHandler:
 
         Returns: a rendering string, obtained from the renderer module
         """
+        if self.scene_ir is not None and method != "write_mesh":
+            context = self._context
+            self.scene_ir.add_call(
+                context.group,
+                method,
+                args,
+                self._get_specifics(context.view, get_neutral_prefixes()),
+            )
+            if self.record_only:
+                return ""
+
+        if method == "write_mesh" and self.file_writer is not None:
+            # Mesh files are to be written by the file writer
+            args[1].file_writer = self.file_writer
+
         renderer_method = getattr(self.renderer_module, method)
         return renderer_method(*args, **kwargs)
 
+    def emit_call(self, method, args, specifics):
+        """Call a render method of the renderer module, from a scene IR.
+
+        Parameters:
+        -----------
+        method -- the method to call (as a string)
+        args -- the arguments to pass to the method
+        specifics -- the specifics for all renderers (dict)
+
+        Returns: a rendering string, obtained from the renderer module
+        """
+        kwargs = self._strip_specifics(specifics)
+        kwargs.update(self._get_general_data())
+        return self._call_renderer(method, *args, **kwargs)
+
+    def emit_renderable(self, name, mesh, material, defcolor, specifics):
+        """Get a rendering string for a mesh, from a scene IR.
+
+        Parameters:
+        -----------
+        name -- the name of the mesh (str)
+        mesh -- the mesh (RenderMesh, in meters)
+        material -- the FreeCAD material (or None)
+        defcolor -- the default color (RGB)
+        specifics -- the specifics for all renderers (dict)
+
+        Returns: a rendering string, obtained from the renderer module
+        """
+        rdrmaterial = rendermaterial.get_rendering_material(
+            name, material, self.renderer_name, defcolor
+        )
+        return self.emit_call(
+            "write_mesh", (name, mesh, rdrmaterial), specifics
+        )
+
 
 # ===========================================================================
 #                          Renderer Handler Exceptions
@@ -98,10 +98,13 @@ def get_renderables(obj, name, upper_material, mesher, **kwargs):
 
     A renderable is a tuple (name, mesh, material). There can be
     several renderables for one object, for instance if the object is a
-    compound of subobjects, so the result of this function is a **list**
-    of renderables.
+    compound of subobjects, so the result of this function is an
+    **iterator** of renderables.
+    Renderables are produced lazily: shapes are meshed as the iterator is
+    consumed, so that each mesh can be released before the next one is
+    computed.
     If this function does not know how to extract renderables from the
-    given object, a TypeError is raised.
+    given object, a RenderableError is raised (on iteration).
 
     Parameters:
         obj -- the FreeCAD object from which to extract the renderables
@@ -118,8 +121,8 @@ def get_renderables(obj, name, upper_material, mesher, **kwargs):
         uvprojection -- a string giving the type of uv projection (cubic,
             spherical...). See View object and rdrhandler for valid values.
 
-    Returns:
-        A list of renderables
+    Yields:
+        Renderables
     """
     obj_is_applink = obj.isDerivedFrom("App::Link")
     obj_is_partfeature = obj.isDerivedFrom("Part::Feature")
@@ -254,7 +257,7 @@ def get_renderables(obj, name, upper_material, mesher, **kwargs):
             raise RenderableError(msg)
         debug("Object", label, "Not renderable")
 
-    return renderables
+    yield from renderables
 
 
 class RenderableError(Exception):
@@ -266,14 +269,13 @@ class RenderableError(Exception):
 
 
 def check_renderables(renderables):
-    """Assert compliance of a list of renderables.
+    """Assert compliance of renderables.
 
-    Filter malformed meshes and return the list of "good" ones.
+    Filter malformed meshes and yield the "good" ones (lazily).
     """
-    if not renderables:
-        raise RenderableError(translate("Render", "Nothing to render"))
-    result = []
+    empty = True
     for renderable in renderables:
+        empty = False
         mesh = renderable.mesh
         if not mesh.skip_meshing:
             if not mesh:
@@ -290,8 +292,9 @@ def check_renderables(renderables):
                     translate("Render", "Mesh topology is empty"),
                 )
                 continue
-        result.append(renderable)
-    return result
+        yield renderable
+    if empty:
+        raise RenderableError(translate("Render", "Nothing to render"))
 
 
 # ===========================================================================
@@ -444,9 +447,6 @@ def _get_rends_from_assembly3(obj, _, material, mesher, **kwargs):
         base_rends = get_renderables(
             element, element.Name, material, mesher, **kwargs
         )
-        if not base_rends:
-            # Element is not renderable...
-            continue
 
         # Apply object placement
         for base_rend in base_rends:
@@ -478,10 +478,9 @@ def _get_rends_from_elementlist(obj, name, material, mesher, **kwargs):
     material -- the material for the container object
     mesher -- a callable object which converts a shape into a mesh
 
-    Returns:
-    A list of renderables for the array object
+    Yields:
+    Renderables for the array object
     """
-    renderables = []
     base_plc = obj.Placement
     elements = itertools.compress(obj.ElementList, obj.VisibilityList)
 
@@ -510,10 +509,7 @@ def _get_rends_from_elementlist(obj, name, material, mesher, **kwargs):
             new_mat = _get_material(base_rend, material)
             new_name = base_rend.name
             new_color = base_rend.defcolor
-            new_rend = Renderable(new_name, new_mesh, new_mat, new_color)
-            renderables.append(new_rend)
-
-    return renderables
+            yield Renderable(new_name, new_mesh, new_mat, new_color)
 
 
 def _get_rends_from_plainapplink(obj, name, material, mesher, **kwargs):
@@ -680,9 +676,9 @@ def _get_rends_from_window(obj, name, material, mesher, **kwargs):
             mats = [material] * len(subnames)
             needs_uvmap = [False] * len(subnames)
 
-        # Subobjects meshes
+        # Subobjects meshes (lazy)
         uvprojection = kwargs.get("uvprojection")
-        meshes = [
+        meshes = (
             mesher(
                 shape=s,
                 compute_uvmap=n,
@@ -693,10 +689,10 @@ def _get_rends_from_window(obj, name, material, mesher, **kwargs):
             for s, n, n2, l in zip(
                 obj.Shape.childShapes(), needs_uvmap, names, labels
             )
-        ]
+        )
 
         # Build renderables (WindowParts-based)
-        return [Renderable(*r) for r in zip(names, meshes, mats, colors)]
+        return (Renderable(*r) for r in zip(names, meshes, mats, colors))
 
     # Type-based
     # Components are given by obj.Base (which should be an App::Part)
@@ -766,9 +762,9 @@ def _get_rends_from_wall(obj, name, material, mesher, **kwargs):
         materials = material.Materials
         needs_uvmap = [_needs_uvmap(m) for m in materials]
 
-        # Subobjects meshes
+        # Subobjects meshes (lazy)
         uvprojection = kwargs.get("uvprojection")
-        meshes = [
+        meshes = (
             mesher(
                 shape=s,
                 compute_uvmap=n,
@@ -777,7 +773,7 @@ def _get_rends_from_wall(obj, name, material, mesher, **kwargs):
                 label=l,
             )
             for s, n, n2, l in zip(shapes, needs_uvmap, names, labels)
-        ]
+        )
 
         # Subobjects colors
         tp_boost = kwargs.get("transparency_boost", 0)
@@ -787,7 +783,7 @@ def _get_rends_from_wall(obj, name, material, mesher, **kwargs):
         ]
 
         # Build renderables
-        rends = [Renderable(*r) for r in zip(names, meshes, materials, colors)]
+        rends = (Renderable(*r) for r in zip(names, meshes, materials, colors))
 
     # Process Components if any
     components = {
@@ -809,24 +805,29 @@ def _get_rends_from_wall(obj, name, material, mesher, **kwargs):
 
         origin = obj.Placement
 
-        component_rends = []
-        for order, subobj in enumerate(components):
-            subname = f"{name}#{subobj.Name}_{order}"
-            if getattr(
-                subobj, "Visibility", True
-            ):  # Add subobj only if visible
-                kwargs["ignore_unknown"] = (
-                    True  # Force ignore unknown materials
-                )
-                component_rends += get_renderables(
-                    subobj, subname, material, mesher, **kwargs
-                )
-
-        component_rends = [
-            _adjust(r, origin, material) for r in component_rends
+        visible_components = [
+            (order, subobj)
+            for order, subobj in enumerate(components)
+            if getattr(subobj, "Visibility", True)  # Only if visible
         ]
+        if visible_components:
+            kwargs["ignore_unknown"] = True  # Force ignore unknown materials
+        component_rends = (
+            rend
+            for order, subobj in visible_components
+            for rend in get_renderables(
+                subobj,
+                f"{name}#{subobj.Name}_{order}",
+                material,
+                mesher,
+                **kwargs,
+            )
+        )
+        component_rends = (
+            _adjust(r, origin, material) for r in component_rends
+        )
 
-        rends += component_rends
+        rends = itertools.chain(rends, component_rends)
 
     return rends
 
@@ -855,18 +856,17 @@ def _get_rends_from_part(obj, name, material, mesher, **kwargs):
 
     origin = obj.Placement
 
-    rends = []
-    for subobj in obj.Group:
-        subname = f"{name}#{subobj.Name}"
-        if getattr(subobj, "Visibility", True):  # Add subobj only if visible
-            kwargs["ignore_unknown"] = True  # Force ignore unknown materials
-            rends += get_renderables(
-                subobj, subname, material, mesher, **kwargs
-            )
-
-    rends = [_adjust(r, origin, material) for r in rends]
+    kwargs["ignore_unknown"] = True  # Force ignore unknown materials
+    rends = (
+        rend
+        for subobj in obj.Group
+        if getattr(subobj, "Visibility", True)  # Add subobj only if visible
+        for rend in get_renderables(
+            subobj, f"{name}#{subobj.Name}", material, mesher, **kwargs
+        )
+    )
 
-    return rends
+    return (_adjust(r, origin, material) for r in rends)
 
 
 def _get_rends_from_partfeature(obj, name, material, mesher, **kwargs):
@@ -924,7 +924,7 @@ def _get_rends_from_partfeature(obj, name, material, mesher, **kwargs):
         nfaces = len(faces)
         names = [f"{name}_face{i}" for i in range(nfaces)]
         labels = [f"{obj.Label}_face{i}" for i in range(nfaces)]
-        meshes = [
+        meshes = (
             mesher(
                 shape=f,
                 compute_uvmap=_needs_uvmap(material),
@@ -933,12 +933,12 @@ def _get_rends_from_partfeature(obj, name, material, mesher, **kwargs):
                 label=l,
             )
             for f, n, l in zip(faces, names, labels)
-        ]
+        )
         materials = [material] * nfaces
         colors = map(RGB.from_fcd_rgba, colors)
-        renderables = [
+        renderables = (
             Renderable(*i) for i in zip(names, meshes, materials, colors)
-        ]
+        )
 
     return renderables
 
@@ -48,12 +48,16 @@ import Mesh
 from Render.rendermesh_mixins import (
     RenderMeshMultiprocessingMixin,
     RenderMeshNumpyMixin,
+    memmap_enabled,
     multiprocessing_enabled,
+    multiprocessing_available,
     numpy_enabled,
 )
+from Render.calibration import BackendCalibration
 from Render.constants import PARAMS, MAX_FILENAME_LEN
 from Render.rendermesh_mp import vector3d
-from Render.utils import debug
+from Render.tracing import span
+from Render.utils import debug, warn
 
 
 RenderMeshDirs = collections.namedtuple(
@@ -61,6 +65,12 @@ RenderMeshDirs = collections.namedtuple(
     ("project_directory", "export_directory", "relative_path"),
 )
 
+RenderMeshDecimation = collections.namedtuple(
+    "RenderMeshDecimation",
+    ("target", "max_error", "crease_angle"),
+    defaults=(0.0,),
+)
+
 
 # ===========================================================================
 #                             RenderMesh factory
@@ -78,24 +88,47 @@ def create_rendermesh(
     relative_path=True,
     skip_meshing=False,
     name="",
+    decimation=None,
+    backend=None,
 ):
     """Create a RenderMesh object, adapted to context.
 
     According to context, the returned RenderMesh may have the following
-    capabilities:
+    capabilities (backends):
     - multiprocessing
     - numpy use (in single process)
     - plain (no numpy, no multiprocessing)
 
     Capabilities are added as mixins.
+
+    If 'backend' is None, the backend is selected from preferences, or from
+    backend calibration if auto-tuning is enabled (see Render.calibration).
     """
+    # Select backend
+    if backend is None:
+        stages = ["setup", "write"]
+        if compute_uvmap:
+            stages.append("uvmap")
+        if autosmooth:
+            stages.append("autosmooth")
+        backend = _select_backend(mesh, stages, name)
+    debug("Object", name, f"RenderMesh backend: {backend}")
+    if memmap_enabled() and backend != "numpy":
+        msg = (
+            f"Memory-mapped storage is not supported by '{backend}' "
+            "backend - Ignoring"
+        )
+        warn("Object", name, msg)
+
     # Construct class
-    if multiprocessing_enabled(mesh):
+    if backend == "multiprocessing":
         base = (RenderMeshMultiprocessingMixin, RenderMeshBase)
-    elif numpy_enabled():
+    elif backend == "numpy":
         base = (RenderMeshNumpyMixin, RenderMeshBase)
-    else:
+    elif backend == "plain":
         base = (RenderMeshBase,)
+    else:
+        raise ValueError(f"Unknown RenderMesh backend '{backend}'")
 
     RenderMesh = type("RenderMesh", base, {})
 
@@ -115,11 +148,94 @@ def create_rendermesh(
         uvmap_projection,
         skip_meshing,
         dirs,
+        decimation,
     )
 
     return instance
 
 
+def get_available_backends():
+    """Get the RenderMesh backends available in current context.
+
+    Backends disabled in preferences are not available.
+    """
+    res = ["plain"]
+    if numpy_enabled():
+        res.append("numpy")
+    if PARAMS.GetBool("EnableMultiprocessing") and multiprocessing_available():
+        res.append("multiprocessing")
+    return res
+
+
+def _select_backend(mesh, stages, name=""):
+    """Select a RenderMesh backend for a mesh.
+
+    Args:
+        mesh -- the mesh (Mesh.Mesh)
+        stages -- the stages the mesh goes through (list of str)
+        name -- the name of the mesh, for logging (str)
+    """
+    if PARAMS.GetBool("AutoTuneBackend"):
+        calibration = BackendCalibration.load()
+        if calibration is not None:
+            backend = calibration.select(
+                mesh.CountPoints, stages, get_available_backends()
+            )
+            if backend is not None:
+                return backend
+        msg = "Backend auto-tuning requires calibration - Using preferences"
+        debug("Object", name, msg)
+
+    if multiprocessing_enabled(mesh):
+        return "multiprocessing"
+    if numpy_enabled():
+        return "numpy"
+    return "plain"
+
+
+def create_rendermesh_from_arrays(
+    points,
+    facets,
+    uvmap=None,
+    vnormals=None,
+    placement=App.Placement(),
+    scale=1.0,
+    project_directory=None,
+    export_directory=None,
+    relative_path=True,
+    name="",
+):
+    """Create a RenderMesh object from precomputed arrays.
+
+    No meshing nor mesh computation (uv map, autosmooth...) is performed:
+    arrays are used as is. This requires Numpy.
+
+    Args:
+        points -- the points of the mesh (numpy array, shape (n, 3))
+        facets -- the facets of the mesh (numpy array, shape (m, 3))
+        uvmap -- the uv map (numpy complex array, or None)
+        vnormals -- the vertex normals (numpy array, shape (n, 3), or None)
+        placement -- the placement of the mesh (App.Placement)
+        scale -- the scale of the mesh (float)
+    """
+    if not numpy_enabled():
+        raise RuntimeError("Creating a RenderMesh from arrays requires Numpy")
+
+    RenderMesh = type("RenderMesh", (RenderMeshNumpyMixin, RenderMeshBase), {})
+
+    export_directory = _check_directory(export_directory)
+    project_directory = _check_directory(project_directory)
+    relative_path = bool(relative_path)
+    dirs = RenderMeshDirs(project_directory, export_directory, relative_path)
+
+    return RenderMesh.from_arrays(
+        (points, facets, uvmap, vnormals),
+        _Transformation(placement, scale),
+        name,
+        dirs,
+    )
+
+
 # ===========================================================================
 #                               RenderMeshBase
 # ===========================================================================
@@ -135,6 +251,16 @@ class RenderMeshBase:
     - an improved vertex normals computation, for autosmoothing
     """
 
+    # Files shared among renderers (see write_file)
+    shared_files = None
+    content_key = None
+
+    # Asynchronous writer for mesh files (filewriter.AsyncFileWriter)
+    file_writer = None
+
+    # Stream mesh files directly, bypassing the file writer (large meshes)
+    stream_files = False
+
     def __init__(
         self,
         mesh,
@@ -145,6 +271,7 @@ class RenderMeshBase:
         uvmap_projection,
         skip_meshing,
         dirs,
+        decimation=None,
     ):
         """Initialize RenderMesh.
 
@@ -160,6 +287,8 @@ class RenderMeshBase:
             project_directory -- directory where the rendering project lays
             relative_path -- flag to control whether returned path is relative
                 or absolute to project_directory
+            decimation -- decimation parameters (RenderMeshDecimation), or
+                None for no decimation
         """
         # Directories
         self.dirs = dirs
@@ -193,23 +322,67 @@ class RenderMeshBase:
         # Then we store the topology in internal structures
         self._points = self._facets = self._normals = self._areas = None
         self._tangents = self._tangent_signs = None
-        self._setup_internals()
+        with span("setup", object=self.name, facets=mesh.CountFacets):
+            self._setup_internals()
+            self._compact()
 
         # Sanity check
         if not self.count_facets:
             return
 
+        # Decimation (before uvmap, so that seams are computed on the
+        # decimated mesh)
+        if decimation and (
+            0 < decimation.target < self.count_facets or decimation.max_error
+        ):
+            with span("decimate", object=self.name):
+                self.decimate(
+                    decimation.target,
+                    decimation.max_error,
+                    decimation.crease_angle,
+                )
+                self._compact()
+
         # Uvmap
         if compute_uvmap:
             msg = f"Uv map '{uvmap_projection}'"
             debug("Object", self.name, msg)
-            self.compute_uvmap(uvmap_projection)
-            assert self.has_uvmap()
+            with span("uvmap", object=self.name, projection=uvmap_projection):
+                self.compute_uvmap(uvmap_projection)
+                assert self.has_uvmap()
+                self._compact()
 
         # Autosmooth
         if autosmooth:
             debug("Object", self.name, "Autosmooth")
-            self.autosmooth(split_angle)
+            with span("autosmooth", object=self.name):
+                self.autosmooth(split_angle)
+                self._compact()
+
+    @classmethod
+    def from_arrays(cls, arrays, transformation, name, dirs):
+        """Create a RenderMesh from arrays, without Mesh.Mesh object.
+
+        Args:
+            arrays -- a tuple (points, facets, uvmap, vnormals)
+            transformation -- the transformation of the mesh (_Transformation)
+            name -- the name of the mesh (str)
+            dirs -- the directories (RenderMeshDirs)
+        """
+        # pylint: disable=protected-access, unused-private-member
+        instance = cls.__new__(cls)
+        instance.dirs = dirs
+        instance.__transformation = transformation
+        instance.name = name
+        instance.skip_meshing = False
+        points, facets, uvmap, vnormals = arrays
+        instance._points = points
+        instance._facets = facets
+        instance._uvmap = uvmap
+        instance._vnormals = vnormals
+        instance._normals = instance._areas = None
+        instance._tangents = instance._tangent_signs = None
+        return instance
 
     def _setup_internals(self):
         """Initialize internal variables.
@@ -222,14 +395,21 @@ class RenderMeshBase:
         self._normals = [tuple(f.Normal) for f in self._originalmesh.Facets]
         self._areas = [f.Area for f in self._originalmesh.Facets]
 
+    def _compact(self):
+        """Convert internal variables into compact types.
+
+        Called after each stage, when compact storage is enabled
+        (to be overriden by mixins)
+        """
+
     def __del__(self):
         """Finalize RenderMesh.
 
         In particular, we clear and del the original Mesh.Mesh object (copy),
         to avoid memory leaks.
         """
-        # Clean original mesh
-        if hasattr(self, "_originalmesh"):
+        # Clean original mesh (unless already released)
+        if getattr(self, "_originalmesh", None) is not None:
             self._originalmesh.clear()
             self._originalmesh = None
 
@@ -245,6 +425,21 @@ class RenderMeshBase:
     #                               Copy                                     #
     ##########################################################################
 
+    def release(self):
+        """Release mesh data.
+
+        To be called once the mesh has been written, so that its memory can
+        be reclaimed before next meshes are computed. The mesh is not usable
+        afterwards.
+        Data shared with copies (see 'copy') are not cleared, just
+        dereferenced: they are freed when the last copy is released.
+        """
+        self._originalmesh = None
+        self._points = self._facets = None
+        self._normals = self._areas = None
+        self._uvmap = self._vnormals = None
+        self._tangents = self._tangent_signs = None
+
     def copy(self):
         """Creates a copy of this mesh."""
         # Caveat: this is a shallow copy!
@@ -255,6 +450,26 @@ class RenderMeshBase:
         new_mesh.__transformation = copy.copy(self.transformation)
         return new_mesh
 
+    ##########################################################################
+    #                               Decimation                               #
+    ##########################################################################
+
+    def decimate(self, target, max_error=0.0, crease_angle=0.0):
+        """Decimate mesh (quadric-error edge collapse).
+
+        Decimation is only implemented with Numpy (see mixins): plain version
+        leaves the mesh unchanged.
+
+        Args:
+            target -- target number of facets (int, 0 for no target)
+            max_error -- maximum geometric error, as a root mean square
+                distance (float, 0 for unbounded)
+            crease_angle -- angle above which an edge is a crease, to be
+                preserved (float, in radians, 0 for no crease detection)
+        """
+        # pylint: disable=unused-argument
+        warn("Object", self.name, "Decimation requires Numpy - Skipping")
+
     ##########################################################################
     #                               Rescaling                                #
     ##########################################################################
@@ -422,6 +637,10 @@ class RenderMeshBase:
 
         Returns:
             The name of file that the function wrote.
+
+        If the mesh has a content key and a dictionary of shared files (multi-
+        renderer export), a file previously written with the same content and
+        arguments is reused rather than written again.
         """
         # Log message
         debug("Object", self.name, "Write mesh file")
@@ -429,6 +648,23 @@ class RenderMeshBase:
         # Normalize arguments
         filetype = RenderMeshBase.ExportType(filetype)
 
+        # Shared file?
+        shared_key = None
+        if self.shared_files is not None and self.content_key:
+            shared_key = (
+                self.content_key,
+                filetype,
+                name,
+                filename,
+                tuple(uv_translate),
+                uv_rotate,
+                uv_scale,
+                tuple(sorted(kwargs.items())),
+            )
+            if (shared := self.shared_files.get(shared_key)) is not None:
+                debug("Object", self.name, "Reuse shared mesh file")
+                return shared
+
         # Compute target file
         if filename is None:
             export_directory = (
@@ -465,30 +701,35 @@ class RenderMeshBase:
             return res
 
         # Switch to specialized write function
-        if filetype == RenderMeshBase.ExportType.OBJ:
-            mtlfile = kwargs.get("mtlfile")
-            mtlname = kwargs.get("mtlname")
-            mtlcontent = kwargs.get("mtlcontent")
-            self._write_objfile(
-                name,
-                filename,
-                mtlfile,
-                mtlname,
-                mtlcontent,
-                uv_translate,
-                uv_rotate,
-                uv_scale,
-            )
-        elif filetype == RenderMeshBase.ExportType.PLY:
-            self._write_plyfile(
-                name, filename, uv_translate, uv_rotate, uv_scale
-            )
-        elif filetype == RenderMeshBase.ExportType.CYCLES:
-            self._write_cyclesfile(name, filename)
-        elif filetype == RenderMeshBase.ExportType.POVRAY:
-            self._write_povfile(name, filename)
-        else:
-            raise ValueError(f"Unknown mesh file type '{filetype}'")
+        with span("write", object=self.name, format=filetype.name):
+            if filetype == RenderMeshBase.ExportType.OBJ:
+                mtlfile = kwargs.get("mtlfile")
+                mtlname = kwargs.get("mtlname")
+                mtlcontent = kwargs.get("mtlcontent")
+                self._write_objfile(
+                    name,
+                    filename,
+                    mtlfile,
+                    mtlname,
+                    mtlcontent,
+                    uv_translate,
+                    uv_rotate,
+                    uv_scale,
+                )
+            elif filetype == RenderMeshBase.ExportType.PLY:
+                self._write_plyfile(
+                    name, filename, uv_translate, uv_rotate, uv_scale
+                )
+            elif filetype == RenderMeshBase.ExportType.CYCLES:
+                self._write_cyclesfile(name, filename)
+            elif filetype == RenderMeshBase.ExportType.POVRAY:
+                self._write_povfile(name, filename)
+            else:
+                raise ValueError(f"Unknown mesh file type '{filetype}'")
+
+        # Share file
+        if shared_key is not None:
+            self.shared_files[shared_key] = res
 
         # Return
         return res
@@ -628,8 +869,7 @@ class RenderMeshBase:
 
         res = it.chain(header, mtl, verts, uvs, norms, objname, faces)
 
-        with open(objfile, "w", encoding="utf-8") as f:
-            f.writelines(res)
+        self._write_text(objfile, res)
 
     @staticmethod
     def _write_mtl(name, mtlcontent, mtlfile=None):
@@ -731,8 +971,7 @@ class RenderMeshBase:
 
         # Concat and write
         res = it.chain(header, verts, faces)
-        with open(plyfile, "w", encoding="utf-8", newline="\n") as f:
-            f.writelines(res)
+        self._write_text(plyfile, res, newline="\n")
 
     def _write_cyclesfile(
         self,
@@ -779,7 +1018,8 @@ class RenderMeshBase:
             uv_statement = ""
 
         if self.has_vnormals() and self.has_uvmap():
-            self.compute_tspaces()
+            with span("tspaces", object=self.name):
+                self.compute_tspaces()
 
             tangents = self.tangents
             tans = [_write_point(tangents[i]) for f in self.facets for i in f]
@@ -806,8 +1046,7 @@ class RenderMeshBase:
 """
 
         # Write
-        with open(cyclesfile, "w", encoding="utf-8") as f:
-            f.write(snippet_obj)
+        self._write_text(cyclesfile, [snippet_obj])
 
     def _write_povfile(
         self,
@@ -880,8 +1119,25 @@ class RenderMeshBase:
 """
 
         # Write
-        with open(povfile, "w", encoding="utf-8") as f:
-            f.write(snippet)
+        self._write_text(povfile, [snippet])
+
+    def _write_text(self, filename, lines, newline=None):
+        """Write text lines into a file.
+
+        If the mesh has a file writer, the lines are joined into a buffer,
+        which is handed over to the writer. Otherwise, or if the mesh is to be
+        streamed, they are written (streamed) directly.
+
+        Args:
+            filename -- Name of the file (str)
+            lines -- the lines to write (iterable of str)
+            newline -- the newline translation mode (see 'open')
+        """
+        if self.file_writer is not None and not self.stream_files:
+            self.file_writer.write(filename, "".join(lines), newline)
+            return
+        with open(filename, "w", encoding="utf-8", newline=newline) as f:
+            f.writelines(lines)
 
     ##########################################################################
     #                               UV manipulations                         #
@@ -941,6 +1197,17 @@ class RenderMeshBase:
         cog = App.Vector(sum1) / sum2
         return cog
 
+    def _uvmap_origin(self):
+        """Get the origin of spherical and cubic uv maps.
+
+        The origin is taken from the original mesh, in double precision, so
+        that all implementations compute the same uv map.
+        """
+        try:
+            return self._originalmesh.CenterOfGravity
+        except AttributeError:
+            return self.center_of_gravity()
+
     def compute_uvmap(self, projection):
         """Compute UV map for this mesh."""
         # Warning:
@@ -1040,10 +1307,7 @@ class RenderMeshBase:
         # Rebuild a complete mesh from submeshes, with uvmap
         mesh = Mesh.Mesh()
         uvmap = []
-        try:
-            origin = self._originalmesh.CenterOfGravity
-        except AttributeError:
-            origin = self.center_of_gravity()
+        origin = self._uvmap_origin()
 
         # Regular facets
         regular_mesh = Mesh.Mesh(regular)
@@ -1098,10 +1362,7 @@ class RenderMeshBase:
         # Rebuid a complete mesh from face submeshes, with uvmap
         uvmap = []
         mesh = Mesh.Mesh()
-        try:
-            cog = self._originalmesh.CenterOfGravity
-        except AttributeError:
-            cog = self.center_of_gravity()
+        cog = self._uvmap_origin()
         for cubeface, facets in enumerate(face_facets):
             facemesh = Mesh.Mesh(facets)
             # Compute uvmap of the submesh
@@ -1540,6 +1801,10 @@ class _Transformation:
         transfo_cols = list(zip(*transfo_rows))
         return transfo_cols
 
+    def get_placement(self):
+        """Get placement component (unscaled)."""
+        return App.Placement(self.__placement)
+
     def get_translation(self):
         """Get translation component."""
         scale = self.__scale
@@ -25,17 +25,18 @@
 Capabilities are added by overloading base class methods.
 """
 
-import runpy
 import multiprocessing as mp
-from multiprocessing import connection, shared_memory
+import ctypes
 import shutil
 import os
 import time
 import itertools
-import operator
-import functools
+import struct
+import io
 from math import radians, cos
 import copy
+import tempfile
+import weakref
 
 try:
     import numpy as np
@@ -44,7 +45,10 @@ except ModuleNotFoundError:
 
 
 from Render.constants import PKGDIR, PARAMS
-from Render.utils import warn, debug, grouper
+from Render.utils import warn, debug
+from Render.tracing import span
+from Render.workerpool import get_worker_pool
+from Render.rendermesh_mp import sharedmem
 
 try:
     mp.set_start_method("spawn")
@@ -71,21 +75,37 @@ class RenderMeshMultiprocessingMixin:
         To be overidden by mixins if necessary.
         """
         mesh = self._originalmesh
-        points, facets = mesh.Topology
-        facets2 = mesh.Facets
-        count_points = mesh.CountPoints
-        count_facets = mesh.CountFacets
 
-        if PARAMS.GetBool("Debug"):
-            print(f"{count_points} points, {count_facets} facets")
+        if numpy_enabled():
+            points, facets = _read_topology_np(mesh, self.name)
+            facets, normals, areas = _compute_normals_areas_np(points, facets)
+            if PARAMS.GetBool("Debug"):
+                print(f"{len(points)} points, {len(facets)} facets")
+            self._points = SharedArray("f", len(points), 3, points)
+            self._facets = SharedArray(
+                _index_typecode(len(points)), len(facets), 3, facets
+            )
+            self._normals = SharedArray("d", len(normals), 3, normals)
+            self._areas = sharedmem.create_array("f", len(areas))
+            np.ctypeslib.as_array(self._areas)[:] = areas
+        else:
+            points, facets = mesh.Topology
+            facets2 = mesh.Facets
+            count_points = mesh.CountPoints
+            count_facets = mesh.CountFacets
 
-        self._points = SharedArray("f", count_points, 3, points)
-        self._facets = SharedArray("l", count_facets, 3, facets)
-        self._normals = SharedArray(
-            "f", count_facets, 3, [f.Normal for f in facets2]
-        )
-        self._areas = mp.RawArray("f", count_facets)
-        self._areas[:] = [f.Area for f in facets2]
+            if PARAMS.GetBool("Debug"):
+                print(f"{count_points} points, {count_facets} facets")
+
+            self._points = SharedArray("f", count_points, 3, points)
+            self._facets = SharedArray(
+                _index_typecode(count_points), count_facets, 3, facets
+            )
+            self._normals = SharedArray(
+                "d", count_facets, 3, (f.Normal for f in facets2)
+            )
+            self._areas = sharedmem.create_array("f", count_facets)
+            self._areas[:] = [f.Area for f in facets2]
 
         self._uvmap = SharedArray("f", 0, 2)
 
@@ -114,7 +134,8 @@ class RenderMeshMultiprocessingMixin:
     @facets.setter
     def facets(self, value):
         """Set facets."""
-        self._facets = SharedArray("l", len(value), 3, value)
+        typecode = _index_typecode(self.count_points)
+        self._facets = SharedArray(typecode, len(value), 3, value)
 
     @property
     def count_facets(self):
@@ -129,7 +150,7 @@ class RenderMeshMultiprocessingMixin:
     @normals.setter
     def normals(self, value):
         """Set facet normals."""
-        self._normals = SharedArray("f", len(value), 3, value)
+        self._normals = SharedArray("d", len(value), 3, value)
 
     @property
     def areas(self):
@@ -139,7 +160,7 @@ class RenderMeshMultiprocessingMixin:
     @areas.setter
     def areas(self, value):
         """Set facet areas."""
-        self._areas = mp.RawArray("f", len(value))
+        self._areas = sharedmem.create_array("f", len(value))
         self._areas[:] = value
 
     @property
@@ -162,6 +183,28 @@ class RenderMeshMultiprocessingMixin:
         """Set vertex normals."""
         self._vnormals = SharedArray("f", len(value), 3, value)
 
+    def decimate(self, target, max_error=0.0, crease_angle=0.0):
+        """Decimate mesh - multiprocessing version.
+
+        Decimation is run in the main process, on numpy views of the shared
+        arrays (see RenderMeshNumpyMixin.decimate).
+        """
+        if not numpy_enabled():
+            super().decimate(target, max_error, crease_angle)
+            return
+
+        debug("Object", self.name, "Decimate (np)")
+        points = np.ctypeslib.as_array(self._points.array).reshape(-1, 3)
+        facets = np.ctypeslib.as_array(self._facets.array).reshape(-1, 3)
+        points, facets = _decimate_qem(
+            points, facets, target, max_error, crease_angle
+        )
+        facets, normals, areas = _compute_normals_areas_np(points, facets)
+        self.points = points
+        self.facets = facets
+        self.normals = normals
+        self.areas = areas
+
     def _compute_uvmap_cube(self):
         """Compute UV map for cubic case - multiprocessing version.
 
@@ -170,33 +213,66 @@ class RenderMeshMultiprocessingMixin:
         instance)
         """
         debug("Object", self.name, "Compute uvmap (mp)")
+        init_globals = {
+            "NORMALS": self._normals.array,
+            "ORIGIN": tuple(self._uvmap_origin()),
+        }
+        self._compute_uvmap_mp("uvmap_cube.py", 6, init_globals)
+
+    def _compute_uvmap_cylinder(self):
+        """Compute UV map for cylindric case - multiprocessing version.
+
+        Cylinder axis is supposed to be z.
+        """
+        debug("Object", self.name, "Compute uvmap cylinder (mp)")
+        self._compute_uvmap_mp("uvmap_cylinder.py", 3)
+
+    def _compute_uvmap_sphere(self):
+        """Compute UV map for spherical case - multiprocessing version."""
+        debug("Object", self.name, "Compute uvmap sphere (mp)")
+        init_globals = {"ORIGIN": tuple(self._uvmap_origin())}
+        self._compute_uvmap_mp("uvmap_sphere.py", 2, init_globals)
+
+    def _compute_uvmap_mp(self, script, color_count, init_globals=None):
+        """Compute UV map with a multiprocessing script.
 
+        Facets are "colored" by the script, and points shared by facets of
+        different colors are duplicated. Facet order is kept.
+
+        Args:
+            script -- the name of the script, in rendermesh_mp (str)
+            color_count -- the number of facet colors (int)
+            init_globals -- additional script globals (dict)
+        """
         # Init variables
-        path = os.path.join(PKGDIR, "rendermesh_mp", "uvmap_cube.py")
+        path = os.path.join(PKGDIR, "rendermesh_mp", script)
 
         # Init output buffers
-        color_count = 6
         points_per_facet = 3
         maxpoints = self.count_facets * color_count * points_per_facet
 
-        points_buf = mp.RawArray("f", maxpoints * 3)
-        facets_buf = mp.RawArray("l", self.count_facets * 3)
-        uvmap_buf = mp.RawArray("f", maxpoints * 2)
+        points_buf = sharedmem.create_array("f", maxpoints * 3)
+        # pylint: disable=protected-access
+        facets_typecode = self._facets.array._type_._type_
+        facets_buf = sharedmem.create_array(
+            facets_typecode, self.count_facets * 3
+        )
+        uvmap_buf = sharedmem.create_array("f", maxpoints * 2)
         point_count = mp.RawValue("l")
 
         # Init script globals
-        init_globals = {
-            "PYTHON": self.python,
-            "POINTS": self._points.array,
-            "FACETS": self._facets.array,
-            "NORMALS": self._normals.array,
-            "AREAS": self._areas,
-            "SHOWTIME": PARAMS.GetBool("Debug"),
-            "OUT_POINTS": points_buf,
-            "OUT_FACETS": facets_buf,
-            "OUT_UVMAP": uvmap_buf,
-            "OUT_POINT_COUNT": point_count,
-        }
+        init_globals = dict(init_globals or {})
+        init_globals.update(
+            {
+                "POINTS": self._points.array,
+                "FACETS": self._facets.array,
+                "SHOWTIME": PARAMS.GetBool("Debug"),
+                "OUT_POINTS": points_buf,
+                "OUT_FACETS": facets_buf,
+                "OUT_UVMAP": uvmap_buf,
+                "OUT_POINT_COUNT": point_count,
+            }
+        )
 
         # Run script
         self._run_path_in_process(path, init_globals)
@@ -204,9 +280,10 @@ class RenderMeshMultiprocessingMixin:
         # Get outputs
         point_count = point_count.value
 
-        self._points.array = points_buf[: point_count * 3]
+        self._points.array = _shrink(points_buf, point_count * 3)
         self._facets.array = facets_buf
-        self.uvmap = list(grouper(uvmap_buf[: point_count * 2], 2))
+        self._uvmap = SharedArray("f", 0, 2)
+        self._uvmap.array = _shrink(uvmap_buf, point_count * 2)
 
         points_buf = None
         facets_buf = None
@@ -238,7 +315,6 @@ class RenderMeshMultiprocessingMixin:
             "AREAS": self._areas,
             "UVMAP": self._uvmap.array,
             "SPLIT_ANGLE": mp.RawValue("f", split_angle),
-            "PYTHON": self.python,
             "SHOWTIME": PARAMS.GetBool("Debug"),
         }
 
@@ -246,8 +322,11 @@ class RenderMeshMultiprocessingMixin:
             print("init connected", time.time() - tm0)
 
         # Run script (return points, facets, vnormals, uvmap)
+        # Facets are returned with their own typecode (see compact mode)
+        # pylint: disable=protected-access
+        facets_typecode = self._facets.array._type_._type_
         result = self._run_path_in_process(
-            path, init_globals, return_types="flff"
+            path, init_globals, return_types=f"f{facets_typecode}ff"
         )
         if result:
             (
@@ -272,6 +351,39 @@ class RenderMeshMultiprocessingMixin:
                 self.has_uvmap(),
             )
 
+    def compute_tspaces(self):
+        """Compute tangent spaces.
+
+        Multiprocessing version.
+        """
+        debug("Object", self.name, "Compute tangent spaces (mp)")
+
+        # Init variables
+        path = os.path.join(PKGDIR, "rendermesh_mp", "tspaces.py")
+
+        # Init output buffers
+        tangents_buf = sharedmem.create_array("f", self.count_points * 3)
+        tangent_signs_buf = sharedmem.create_array("f", self.count_points)
+
+        # Init script globals
+        init_globals = {
+            "POINTS": self._points.array,
+            "FACETS": self._facets.array,
+            "UVMAP": self._uvmap.array,
+            "VNORMALS": self._vnormals.array,
+            "SHOWTIME": PARAMS.GetBool("Debug"),
+            "OUT_TANGENTS": tangents_buf,
+            "OUT_TANGENT_SIGNS": tangent_signs_buf,
+        }
+
+        # Run script
+        self._run_path_in_process(path, init_globals)
+
+        # Get outputs
+        self._tangents = SharedArray("f", 0, 3)
+        self._tangents.array = tangents_buf
+        self._tangent_signs = tangent_signs_buf
+
     def _write_objfile_helper(
         self,
         name,
@@ -311,7 +423,6 @@ class RenderMeshMultiprocessingMixin:
             "OBJNAME": name,
             "MTLNAME": mtlname,
             "SHOWTIME": debug_flag,
-            "PYTHON": self.python,
         }
 
         # Run script
@@ -322,52 +433,37 @@ class RenderMeshMultiprocessingMixin:
             print(f"end writing obj file ({tm1})")
 
     def _run_path_in_process(self, path, init_globals, return_types=None):
-        """Run a path in a dedicated process.
+        """Run a multiprocessing script in a worker process.
+
+        The script is run by a long-lived worker of the session pool (see
+        Render.workerpool), which solves the lack of thread safety of
+        'runpy.run_path' and saves the start of a process for each job.
+        Please note 'self.python' must have been set. The job is awaited
+        as long as it makes progress (see Render.workerpool).
 
-        This method is able to launch a multiprocess script, like
-        runpy.run_path. However it solves the lack of thread safety of
-        'runpy.run_path', by embedding run_path in a dedicated process.
-        Please note 'self.python' must have been set. After
-        being started, the process is awaited (joined).
+        If the script sends shared memory blocks (name, size), they are
+        mapped as arrays with 'return_types' (no copy), and returned. The
+        blocks are then owned by this process.
         """
-        # Synchro objects
+        arrays = None
 
-        main_conn, sub_conn = connection.Pipe()
+        def on_result(msg):
+            nonlocal arrays
+            arrays = [
+                sharedmem.attach_array(
+                    name, t, size // struct.calcsize(t), owner=True
+                )
+                for (name, size), t in zip(msg, return_types)
+            ]
 
-        args = (path,)
-        init_globals["CONNECTION"] = sub_conn
         init_globals["ENABLE_NUMPY"] = not PARAMS.GetBool("DisableNumpy")
-        kwargs = {"init_globals": init_globals, "run_name": "__main__"}
 
-        mp.set_executable(self.python)
-
-        process = mp.Process(
-            target=runpy.run_path, args=args, kwargs=kwargs, name="render"
-        )
-        process.start()
-        sentinel = process.sentinel
-        result = connection.wait([main_conn, sentinel], 60)
-        # Retrieve outputs (into arrays)
-        arrays = None
-        if result and sentinel not in result:
-            msg = main_conn.recv()
-            shms = [
-                (shared_memory.SharedMemory(name), size) for name, size in msg
-            ]
-            buffers = [shm.buf[0:size] for shm, size in shms]
-            arrays = [
-                mp.RawArray(t, b.cast(t))
-                for b, t in zip(buffers, return_types)
-            ]
-            buffers = None  # Otherwise we cannot close shared memory...
-            for shm, _ in shms:
-                shm.close()
-            main_conn.send("terminate")
-        elif return_types is not None:
+        pool = get_worker_pool(self.python)
+        with span(os.path.basename(path), "worker", object=self.name):
+            success = pool.run(path, init_globals, self.name, on_result)
+        if success and arrays is None and return_types is not None:
             warn("Object", self.name, "No return from mp module")
 
-        process.join()
-
         return arrays
 
 
@@ -375,19 +471,40 @@ class SharedArray:
     """An 2-dimensions array to be shared across multiple processes."""
 
     def __init__(self, typecode, length, width, initializer=None):
-        self._rawarray = mp.RawArray(typecode, length * width)
+        self._rawarray = sharedmem.create_array(typecode, length * width)
         self._width = width
-        if initializer:
-            try:
-                self._rawarray[:] = list(
-                    itertools.chain.from_iterable(initializer)
-                )
-            except TypeError:
-                self._rawarray[:] = list(
-                    itertools.chain.from_iterable(
-                        (c.real, c.imag) for c in initializer
-                    )
+        if initializer is not None and length:
+            self._fill(initializer)
+
+    def _fill(self, initializer):
+        """Fill underlying array, without intermediate lists.
+
+        Data are written directly into the raw buffer: by a single copy
+        for Numpy arrays, and row by row for other iterables.
+
+        Args:
+            initializer -- a Numpy array, or an iterable of rows. Rows are
+                sequences of 'width' numbers (tuples, Vectors...), or complex
+                numbers if width is 2.
+        """
+        if "np" in globals() and isinstance(initializer, np.ndarray):
+            target = np.ctypeslib.as_array(self._rawarray)
+            target.shape = (-1, self._width)
+            if np.iscomplexobj(initializer):
+                initializer = np.stack(
+                    (initializer.real, initializer.imag), axis=-1
                 )
+            initializer = initializer.reshape(target.shape)
+            np.copyto(target, initializer, casting="unsafe")
+            return
+
+        # pylint: disable=protected-access
+        row_format = f"{self._width}{self._rawarray._type_._type_}"
+        row_size = struct.calcsize(row_format)
+        with memoryview(self._rawarray).cast("B") as buffer:
+            offsets = range(0, len(buffer), row_size)
+            for offset, row in zip(offsets, _real_rows(initializer)):
+                struct.pack_into(row_format, buffer, offset, *row)
 
     def __iter__(self):
         iters = [iter(self._rawarray)] * self.width
@@ -444,7 +561,7 @@ class RenderMeshNumpyMixin:
         if PARAMS.GetBool("Debug"):
             tm0 = time.time()
         mesh = self._originalmesh
-        points, facets = mesh.Topology
+        points, facets = _read_topology_np(mesh, self.name)
         count_facets = len(facets)
         count_points = len(points)
 
@@ -454,41 +571,12 @@ class RenderMeshNumpyMixin:
 
         if PARAMS.GetBool("Debug"):
             print(f"{count_points} points, {count_facets} facets")
-
-        points = np.fromiter(
-            (x for p in points for x in p),
-            dtype=np.float64,
-            count=count_points * 3,
-        )
-        points = points.reshape((-1, 3))
-        facets = np.fromiter(
-            (x for f in facets for x in f),
-            dtype=np.int64,
-            count=count_facets * 3,
-        )
-        facets = facets.reshape((-1, 3))
-
-        if PARAMS.GetBool("Debug"):
             tm1 = time.time() - tm0
             print(f"Setup points & facets {tm1}")
 
         # `mesh.Facets` is far too slow, so we recompute areas and normals
         # by ourselves.
-        # We first compute vector products
-        vec1 = points[facets[..., 1]] - points[facets[..., 0]]
-        vec2 = points[facets[..., 2]] - points[facets[..., 0]]
-        cross = np.cross(vec1, vec2)
-        cross_norms = np.linalg.norm(cross, axis=1)
-
-        # We filter out triangles with null area (degenerated...)
-        notnull = np.where(cross_norms != 0.0)
-        facets = facets[notnull]
-        cross = cross[notnull]
-        cross_norms = cross_norms[notnull]
-
-        # And we compute normals
-        areas = cross_norms / 2
-        normals = cross / np.expand_dims(cross_norms, axis=1)
+        facets, normals, areas = _compute_normals_areas_np(points, facets)
 
         # Finally we assign to properties
         self._points = points
@@ -511,28 +599,174 @@ class RenderMeshNumpyMixin:
         """Check if object has a vertex normals."""
         return self._vnormals is not None
 
-    # TODO uvmap cylinder and sphere
+    def _compact(self):
+        """Convert arrays into compact storage.
+
+        If compact storage is enabled, geometry is converted into single
+        precision, indices into 32-bit integers (if the number of points
+        allows) and uv map into single precision complex numbers. Facet
+        normals are kept in double precision: they decide the cube face of
+        facets in cubic uv map, and rounding would break ties differently
+        from the other versions.
+
+        If memory mapping is enabled, arrays are moved into memory-mapped
+        files, in export directory, and mesh files are streamed. Arrays are
+        mapped at the end of each stage: stages themselves (setup, uv map,
+        autosmooth) still compute in memory.
+        """
+        compact, mapped = compact_enabled(), memmap_enabled()
+        if not (compact or mapped):
+            return
+        if self.count_points <= MAX_INT32_POINTS:
+            index_type = np.int32
+        else:
+            index_type = np.int64
+        dtypes = (
+            ("_points", np.float32),
+            ("_facets", index_type),
+            ("_normals", np.float64),
+            ("_areas", np.float32),
+            ("_uvmap", np.complex64),
+            ("_vnormals", np.float32),
+            ("_tangents", np.float32),
+            ("_tangent_signs", np.float32),
+        )
+        for name, dtype in dtypes:
+            value = getattr(self, name, None)
+            if not isinstance(value, np.ndarray):
+                continue
+            if compact:
+                value = value.astype(dtype, copy=False)
+            if mapped and not isinstance(value, np.memmap):
+                value = _map_array(value, self._memmap_directory())
+            setattr(self, name, value)
+        if mapped:
+            self.stream_files = True
+
+    def _memmap_directory(self):
+        """Get the directory for memory-mapped files."""
+        return self.dirs.export_directory or tempfile.gettempdir()
+
+    def decimate(self, target, max_error=0.0, crease_angle=0.0):
+        """Decimate mesh - numpy version.
+
+        See _decimate_qem for more details.
+
+        Args:
+            target -- target number of facets (int, 0 for no target)
+            max_error -- maximum geometric error, as a root mean square
+                distance (float, 0 for unbounded)
+            crease_angle -- angle above which an edge is a crease, to be
+                preserved (float, in radians, 0 for no crease detection)
+        """
+        debug("Object", self.name, "Decimate (np)")
+        count_facets = self.count_facets
+        points, facets = _decimate_qem(
+            self._points, self._facets, target, max_error, crease_angle
+        )
+        facets, normals, areas = _compute_normals_areas_np(points, facets)
+        self._points = points
+        self._facets = facets
+        self._normals = normals
+        self._areas = areas
+        msg = f"Decimated {count_facets} -> {self.count_facets} facets"
+        debug("Object", self.name, msg)
 
     def _compute_uvmap_cylinder(self):
-        """Compute UV map for cylindric case.
+        """Compute UV map for cylindric case - numpy version.
 
         Cylinder axis is supposed to be z.
         """
-        super()._compute_uvmap_cylinder()
-        self._points = np.asarray(self._points)
-        self._facets = np.asarray(self._facets)
-        self._normals = np.asarray(self._normals)
-        self._areas = np.asarray(self._areas)
-        self._uvmap = np.asarray(self._uvmap)
+        debug("Object", self.name, "Compute uvmap cylinder (np)")
+        time0 = time.time()
+
+        points = self._points
+        facets = self._facets
+        triangles = np.take(points, facets, axis=0)
+
+        # Classify facets: regular (0), on seam (1), z-normal (2)
+        vec1 = self._safe_normalize_np(triangles[:, 1] - triangles[:, 0])
+        vec2 = self._safe_normalize_np(triangles[:, 2] - triangles[:, 0])
+        tolerance = 1e-5
+        znormal = np.logical_and(
+            np.abs(vec1[:, 2]) <= tolerance, np.abs(vec2[:, 2]) <= tolerance
+        )
+        seam = _facets_overlap_seam_np(triangles)
+        facet_classes = np.where(znormal, 2, np.where(seam, 1, 0))
+
+        # Split points between classes
+        indices, new_facets, point_classes = _split_points_np(
+            facets, facet_classes, 3
+        )
+        new_points = points[indices]
+
+        # Compute uvmap
+        # Regular and seam points: (angle * average radius, z)
+        # Z-normal points: (x, y)
+        x_coords, y_coords, z_coords = new_points.T
+        phis = _atan2_np(x_coords, y_coords, point_classes == 1)
+        radii = np.hypot(x_coords, y_coords)
+        counts = np.bincount(point_classes, minlength=3)
+        avg_radii = np.bincount(point_classes, radii, minlength=3)
+        avg_radii /= np.maximum(counts, 1)
+        is_znormal = point_classes == 2
+        uvs = np.where(
+            is_znormal,
+            x_coords + 1j * y_coords,
+            phis * avg_radii[point_classes] + 1j * z_coords,
+        )
+        uvs /= 1000  # Scale
+
+        # Update attributes
+        self._facets = new_facets
+        self._points = new_points
+        self._uvmap = uvs
+
+        if PARAMS.GetBool("Debug"):
+            print("numpy", time.time() - time0)
 
     def _compute_uvmap_sphere(self):
-        """Compute UV map for spherical case."""
-        super()._compute_uvmap_sphere()
-        self._points = np.asarray(self._points)
-        self._facets = np.asarray(self._facets)
-        self._normals = np.asarray(self._normals)
-        self._areas = np.asarray(self._areas)
-        self._uvmap = np.asarray(self._uvmap)
+        """Compute UV map for spherical case - numpy version."""
+        debug("Object", self.name, "Compute uvmap sphere (np)")
+        time0 = time.time()
+
+        points = self._points
+        facets = self._facets
+        triangles = np.take(points, facets, axis=0)
+
+        # Classify facets: regular (0), on seam (1)
+        facet_classes = _facets_overlap_seam_np(triangles).astype(np.int64)
+
+        # Origin (see _uvmap_origin)
+        origin = np.array(tuple(self._uvmap_origin()), dtype=np.float64)
+
+        # Split points between classes
+        indices, new_facets, point_classes = _split_points_np(
+            facets, facet_classes, 2
+        )
+        new_points = points[indices]
+
+        # Compute uvmap
+        vectors = new_points - origin
+        lengths = np.linalg.norm(vectors, axis=1)
+        phis = _atan2_np(vectors[:, 0], vectors[:, 1], point_classes == 1)
+        sines = np.divide(
+            vectors[:, 2],
+            lengths,
+            out=np.zeros_like(lengths),
+            where=lengths != 0.0,
+        )
+        thetas = np.arcsin(sines.clip(-1.0, 1.0))
+        uvs = (0.5 + phis / (2 * np.pi)) + 1j * (0.5 + thetas / np.pi)
+        uvs *= lengths / 1000.0 * np.pi
+
+        # Update attributes
+        self._facets = new_facets
+        self._points = new_points
+        self._uvmap = uvs
+
+        if PARAMS.GetBool("Debug"):
+            print("numpy", time.time() - time0)
 
     def _compute_uvmap_cube(self):
         """Compute UV map for cubic case - numpy version."""
@@ -547,7 +781,6 @@ class RenderMeshNumpyMixin:
         facets = self._facets
         assert facets.shape[1] == 3
         points = self._points
-        areas = self._areas
         triangles = np.take(points, facets, axis=0)
 
         # Compute facet colors
@@ -562,11 +795,8 @@ class RenderMeshNumpyMixin:
         facet_colors = first_term * 2 + second_term
         facet_colors = facet_colors.ravel()
 
-        # Compute center of gravity (triangle cogs weighted by triangle areas)
-        weighted_triangle_cogs = (
-            np.add.reduce(triangles, 1) * areas[:, np.newaxis] / 3
-        )
-        cog = np.sum(weighted_triangle_cogs, axis=0) / np.sum(areas)
+        # Origin (see _uvmap_origin)
+        cog = np.array(tuple(self._uvmap_origin()), dtype=np.float64)
 
         # Update point list
         # Unfold facet points, joining with facet colors
@@ -652,10 +882,11 @@ class RenderMeshNumpyMixin:
             print("compute vnormals Numpy")
 
         # Prepare parameters
-        points = np.array(self._points, dtype="f4")
-        normals = np.array(self._normals, dtype="f4")
-        areas = np.array(self._areas, dtype="f4")
-        facets = np.array(self._facets, dtype="i4")
+        # (angle weighting is computed in double precision)
+        points = np.asarray(self._points, dtype=np.float64)
+        normals = np.asarray(self._normals, dtype=np.float64)
+        areas = np.asarray(self._areas, dtype=np.float64)
+        facets = np.asarray(self._facets)
         triangles = np.take(points, facets, axis=0)
         indices = facets.ravel(order="F")
 
@@ -811,16 +1042,16 @@ class RenderMeshNumpyMixin:
     def _connected_components(self, split_angle=radians(30)):
         """Get all connected components of facets in the mesh.
 
-        Numpy version: this method uses a union-find algorithm, with path
-        compression
+        Numpy version: this method uses an array-based min-label
+        propagation, with pointer jumping. Each component is tagged with
+        the smallest index of its facets.
 
         Args:
             split_angle -- the angle that breaks adjacency
 
         Returns:
-            a list of tags. Each tag gives the component of the corresponding
-                facet
-            the number of components
+            an array of tags (int64), one per facet. Each tag gives the
+                component of the corresponding facet
         """
         debug("Object", self.name, "Compute connected components (np)")
 
@@ -835,63 +1066,9 @@ class RenderMeshNumpyMixin:
             print("Adjacent facets", time.time() - tm0)
 
         nfacets = len(self.facets)
-        # Numpy array is slightly slower than list, but it releases GIL...
-        fathers = np.full((nfacets,), -1, dtype=np.int64)
-        # fathers = [-1] * nfacets
-
-        def getfather(child, _):
-            return fathers[child]
-
-        takewhile = itertools.takewhile
-        positive = functools.partial(operator.le, 0)
-        accumulate_father = functools.partial(
-            itertools.accumulate, itertools.repeat(0), getfather
-        )
-        setter = functools.partial(operator.setitem, fathers)
-        getter = functools.partial(operator.getitem, fathers)
-
-        def find_path(element):
-            *path, root = takewhile(
-                positive, accumulate_father(initial=element)
-            )
-            return path, root
-
-        def find_and_compress(child):
-            # Find
-            path, root = find_path(child)
-
-            # Compress (with side-effect)
-            _ = [setter(x, root) for x in path]
-            # setter(path, root)
-
-            return root
-
-        def union(root1, root2):
-            if root1 == root2:
-                return
-
-            father1, father2 = getter(root1), getter(root2)
-            sumfather = father1 + father2
-
-            if father1 > father2:
-                setter(root2, sumfather)
-                setter(root1, root2)
-            else:
-                setter(root1, sumfather)
-                setter(root2, root1)
-
-        def union_find(elem1, elem2):
-            union(find_and_compress(elem1), find_and_compress(elem2))
-
+        tags = np.arange(nfacets, dtype=np.int64)
         if len(edges):
-            vunion_find = np.vectorize(union_find)
-            vunion_find(edges[..., 0], edges[..., 1])
-
-        if nfacets:
-            vfind_and_compress = np.vectorize(find_and_compress)
-            tags = vfind_and_compress(np.arange(nfacets))
-        else:
-            tags = np.empty(shape=[0], dtype=np.int64)
+            tags = _min_label_propagation(tags, edges[..., 0], edges[..., 1])
 
         if debug_flag:
             print("tags", time.time() - tm0)
@@ -947,6 +1124,14 @@ class RenderMeshNumpyMixin:
         """
         # Make a private copy of points (otherwise, in copied structures
         # like array, points are shared and scale is applied N times)
+        if isinstance(self._points, np.memmap):
+            # Memory-mapped: scale chunk by chunk, into a new file
+            self._points = _map_array(
+                self._points,
+                self._memmap_directory(),
+                lambda chunk: chunk * ratio,
+            )
+            return
         self._points = copy.deepcopy(self._points)
         self._points *= ratio
 
@@ -965,10 +1150,11 @@ class RenderMeshNumpyMixin:
         # “Computing Tangent Space Basis Vectors for an Arbitrary Mesh”.
         # Terathon Software 3D Graphics Library, 2001.
         # http://www.terathon.com/code/tangent.html
+        # (computed in double precision)
         facets = self._facets
-        points = self._points
-        uvmap = self._uvmap
-        normals = self._vnormals
+        points = self._points.astype(np.float64, copy=False)
+        uvmap = self._uvmap.astype(np.complex128, copy=False)
+        normals = self._vnormals.astype(np.float64, copy=False)
 
         v1, v2, v3 = (
             points[facets[..., 0]],
@@ -1057,6 +1243,7 @@ class RenderMeshNumpyMixin:
 
         self._tangents = tangents
         self._tangent_signs = tangent_signs
+        self._compact()
 
         if debug_flag:
             tm1 = time.time()
@@ -1073,11 +1260,37 @@ def multiprocessing_enabled(mesh):
     conditions = (
         PARAMS.GetBool("EnableMultiprocessing"),
         mesh.CountPoints >= PARAMS.GetInt("MultiprocessingThreshold"),
-        _find_python(),
+        multiprocessing_available(),
     )
     return all(conditions)
 
 
+def multiprocessing_available():
+    """Check if multiprocessing can be used (a Python executable is found)."""
+    return bool(_find_python())
+
+
+def compact_enabled():
+    """Check if compact storage (single precision) is enabled."""
+    return PARAMS.GetBool("CompactMeshes")
+
+
+def memmap_enabled():
+    """Check if memory-mapped storage is enabled."""
+    return PARAMS.GetBool("MemoryMappedMeshes")
+
+
+# Maximum number of points for 32-bit indices
+MAX_INT32_POINTS = 2**31 - 1
+
+
+def _index_typecode(count_points):
+    """Get the typecode of facet indices, for multiprocessing arrays."""
+    if compact_enabled() and count_points <= MAX_INT32_POINTS:
+        return "i"
+    return "l"
+
+
 def numpy_enabled():
     """Check if multiprocessing can be enabled."""
     conditions = (
@@ -1087,6 +1300,27 @@ def numpy_enabled():
     return all(conditions)
 
 
+def _real_rows(rows):
+    """Iterate over rows, splitting complex numbers into (real, imag)."""
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        return iter(())
+    rows = itertools.chain((first,), rows)
+    if isinstance(first, complex):
+        return ((c.real, c.imag) for c in rows)
+    return rows
+
+
+def _shrink(array, length):
+    """Copy the first 'length' items of a shared array to a new one."""
+    # pylint: disable=protected-access
+    res = sharedmem.create_array(array._type_._type_, length)
+    ctypes.memmove(res, array, ctypes.sizeof(res))
+    return res
+
+
 def _find_python():
     """Find Python executable."""
 
@@ -1097,3 +1331,588 @@ def _find_python():
     if not PARAMS.GetBool("Debug"):
         return which("pythonw") or which("python")
     return which("python")
+
+
+# ===========================================================================
+#                               Numpy helpers
+# ===========================================================================
+
+
+def _min_label_propagation(labels, left, right):
+    """Compute connected components by min-label propagation (numpy).
+
+    Each label is a pointer to a parent element, and labels only decrease,
+    so that pointers never form cycles. At each round, the root of each edge
+    end is hooked to the smallest root of the edge, then pointers are jumped
+    until each element points to a root. Rounds stop when no edge joins two
+    distinct roots.
+
+    Args:
+        labels -- initial labels (np.arange of the number of elements)
+        left -- left ends of edges (array of element indices)
+        right -- right ends of edges (array of element indices)
+
+    Returns:
+        the labels, as the smallest element index in each component
+    """
+    while True:
+        left_roots, right_roots = labels[left], labels[right]
+        joining = left_roots != right_roots
+        if not np.any(joining):
+            return labels
+        left_roots = left_roots[joining]
+        right_roots = right_roots[joining]
+        mins = np.minimum(left_roots, right_roots)
+
+        # Hook
+        np.minimum.at(labels, left_roots, mins)
+        np.minimum.at(labels, right_roots, mins)
+
+        # Jump
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def _facets_overlap_seam_np(triangles):
+    """Test whether facets overlap the seam (numpy).
+
+    See rendermesh._facet_overlap_seam.
+
+    Args:
+        triangles -- the triangles of the facets (array, shape (n, 3, 3))
+
+    Returns:
+        an array of booleans
+    """
+    phis = np.arctan2(triangles[..., 0], triangles[..., 1])
+    minphi, maxphi = phis.min(axis=1), phis.max(axis=1)
+    return (
+        (minphi * maxphi < 0) & (minphi <= -np.pi / 2) & (maxphi >= np.pi / 2)
+    )
+
+
+def _atan2_np(x_coords, y_coords, positive):
+    """Compute atan2(x, y), wrapped to positive values where required.
+
+    See rendermesh._pos_atan2 (seam treatment).
+    """
+    phis = np.arctan2(x_coords, y_coords)
+    return np.where(positive & (phis < 0), phis + 2 * np.pi, phis)
+
+
+def _split_points_np(facets, facet_classes, class_count):
+    """Split points shared by facets of different classes (numpy).
+
+    Each point is duplicated for each class of facets it belongs to.
+
+    Args:
+        facets -- the facets (array of point indices, shape (n, 3))
+        facet_classes -- the class of each facet (array of int)
+        class_count -- the number of classes (int)
+
+    Returns:
+        the index of each new point in the initial points (array)
+        the new facets (array of new point indices)
+        the class of each new point (array)
+    """
+    keys = facets.astype(np.int64) * class_count
+    keys += facet_classes[:, np.newaxis]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys // class_count, inverse.reshape(-1, 3), keys % class_count
+
+
+# PLY types, for topology reading
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+
+
+def _read_topology_np(mesh, name=""):
+    """Read the points and facets of a mesh into arrays (numpy).
+
+    The mesh is serialized into an in-memory binary PLY stream, which is
+    parsed with `np.frombuffer`: this avoids the creation of a Python
+    object per point and per facet (`mesh.Topology`).
+    If serialization is not available, `mesh.Topology` is used instead.
+
+    Args:
+        mesh -- the mesh to read (Mesh.Mesh)
+        name -- the name of the object, for logging (str)
+
+    Returns:
+        points -- the mesh points (numpy array (n, 3), float64)
+        facets -- the mesh facets (numpy array (m, 3), int64)
+    """
+    try:
+        stream = io.BytesIO()
+        mesh.write(Stream=stream, Format="PLY")
+        return _parse_ply_np(stream.getbuffer())
+    # pylint: disable=broad-exception-caught
+    except Exception as err:
+        msg = f"Cannot read binary topology ({err}) - Fallback"
+        debug("Object", name, msg)
+
+    points, facets = mesh.Topology
+    points = np.fromiter(
+        itertools.chain.from_iterable(points),
+        dtype=np.float64,
+        count=len(points) * 3,
+    )
+    facets = np.fromiter(
+        itertools.chain.from_iterable(facets),
+        dtype=np.int64,
+        count=len(facets) * 3,
+    )
+    return points.reshape((-1, 3)), facets.reshape((-1, 3))
+
+
+def _parse_ply_np(data):
+    """Parse a binary PLY triangle mesh (numpy).
+
+    Only vertex (x, y, z...) and face (vertex_index list) elements are
+    supported.
+
+    Args:
+        data -- the PLY data (bytes-like object)
+
+    Returns:
+        points -- the mesh points (numpy array (n, 3), float64)
+        facets -- the mesh facets (numpy array (m, 3), int64)
+    """
+    data = memoryview(data).cast("B")
+    header_end = bytes(data[:4096]).find(b"end_header")
+    if header_end < 0:
+        raise ValueError("PLY: header not found")
+    body_start = bytes(data[header_end : header_end + 16]).index(b"\n")
+    body_start += header_end + 1
+    header = bytes(data[:header_end]).decode("ascii").splitlines()
+
+    # Parse header
+    byteorder = None
+    elements = []  # (name, count, fields)
+    for line in header:
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "format":
+            byteorder = {
+                "binary_little_endian": "<",
+                "binary_big_endian": ">",
+            }.get(words[1])
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property":
+            elements[-1][2].append(words[1:])
+    if byteorder is None:
+        raise ValueError("PLY: unsupported format")
+
+    def ply_type(name):
+        return byteorder + PLY_TYPES[name]
+
+    # Read elements
+    points = facets = None
+    offset = body_start
+    for name, count, fields in elements:
+        if name == "vertex":
+            dtype = np.dtype([(f[-1], ply_type(f[0])) for f in fields])
+            vertices = np.frombuffer(data, dtype, count, offset)
+            points = np.column_stack(
+                (vertices["x"], vertices["y"], vertices["z"])
+            ).astype(np.float64)
+        elif name == "face" and len(fields) == 1 and fields[0][0] == "list":
+            _, count_type, index_type, _ = fields[0]
+            dtype = np.dtype(
+                [("n", ply_type(count_type)), ("v", ply_type(index_type), 3)]
+            )
+            faces = np.frombuffer(data, dtype, count, offset)
+            if np.any(faces["n"] != 3):
+                raise ValueError("PLY: non-triangular faces")
+            facets = faces["v"].astype(np.int64)
+        else:
+            raise ValueError(f"PLY: unsupported element '{name}'")
+        offset += dtype.itemsize * count
+
+    if points is None or facets is None:
+        raise ValueError("PLY: missing elements")
+    return points, facets
+
+
+# Number of rows per chunk, for memory-mapped arrays
+MEMMAP_CHUNK_SIZE = 2**20
+
+
+def _map_array(array, directory, func=None):
+    """Copy an array into a memory-mapped file (numpy).
+
+    The copy is made chunk by chunk, so that the array is never fully loaded
+    into memory if it is itself memory-mapped. The file is removed when the
+    returned array is freed.
+
+    Args:
+        array -- the array to copy (numpy array)
+        directory -- the directory for the file (str)
+        func -- a function to apply to each chunk (optional)
+
+    Returns:
+        The memory-mapped array (np.memmap)
+    """
+    if not array.size:
+        return array
+    f_handle, path = tempfile.mkstemp(
+        suffix=".dat", prefix="rendermesh_", dir=directory
+    )
+    os.close(f_handle)
+    mapped = np.memmap(path, dtype=array.dtype, mode="w+", shape=array.shape)
+    weakref.finalize(mapped, _remove_file, path)
+    for start in range(0, len(array), MEMMAP_CHUNK_SIZE):
+        chunk = array[start : start + MEMMAP_CHUNK_SIZE]
+        mapped[start : start + MEMMAP_CHUNK_SIZE] = (
+            func(chunk) if func else chunk
+        )
+    mapped.flush()
+    return mapped
+
+
+def _remove_file(path):
+    """Remove a file, if possible."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _compute_normals_areas_np(points, facets):
+    """Compute facet normals and areas (numpy).
+
+    Facets with null area (degenerated) are filtered out.
+
+    Args:
+        points -- the mesh points (numpy array (n, 3))
+        facets -- the mesh facets (numpy array (m, 3))
+
+    Returns:
+        facets -- the non-degenerated facets
+        normals -- the facet normals
+        areas -- the facet areas
+    """
+    # We first compute vector products
+    vec1 = points[facets[..., 1]] - points[facets[..., 0]]
+    vec2 = points[facets[..., 2]] - points[facets[..., 0]]
+    cross = np.cross(vec1, vec2)
+    cross_norms = np.linalg.norm(cross, axis=1)
+
+    # We filter out triangles with null area (degenerated...)
+    notnull = np.where(cross_norms != 0.0)
+    facets = facets[notnull]
+    cross = cross[notnull]
+    cross_norms = cross_norms[notnull]
+
+    # And we compute normals
+    areas = cross_norms / 2
+    normals = cross / np.expand_dims(cross_norms, axis=1)
+
+    return facets, normals, areas
+
+
+# Maximum number of independent set rounds per decimation pass
+DECIMATION_ROUNDS = 8
+
+# Minimal cosinus between facet normals before and after a collapse
+DECIMATION_MIN_COS = 0.2
+
+# Number of consecutive passes without collapse before decimation stops
+DECIMATION_IDLE_PASSES = 3
+
+# Seed for decimation tie breaking (results must be reproducible)
+DECIMATION_SEED = 0
+
+# Weight of crease constraint planes in decimation quadrics
+DECIMATION_CREASE_WEIGHT = 100.0
+
+
+def _edge_hashes(facets, count_points):
+    """Compute the hashes of the edges of facets, facet by facet.
+
+    The hash of edge (i, j) is min(i, j) * count_points + max(i, j).
+    Edges of facet k are at indices 3k, 3k+1, 3k+2.
+    """
+    rolled = np.roll(facets, -1, axis=1)
+    low = np.minimum(facets, rolled).ravel()
+    high = np.maximum(facets, rolled).ravel()
+    return low * count_points + high
+
+
+def _decimate_qem(points, facets, target, max_error, crease_angle):
+    """Decimate a mesh by quadric-error edge collapse (numpy).
+
+    The algorithm is Garland & Heckbert's one, adapted to vectorization:
+    instead of collapsing edges one by one from a priority queue, each pass
+    computes the costs of all edges and collapses, in one shot, an
+    independent set of cheapest edges (no two selected edges have
+    neighbouring endpoints, so that their collapses do not interfere).
+    Ties between edges of equal cost (flat areas) are broken randomly, so
+    that the set stays dense. Collapses violating the link condition
+    (non-manifold result) or flipping facets are rejected, and decimation
+    stops when passes no longer collapse anything.
+
+    Vertices lying on boundaries or on non-manifold edges are locked: they
+    can absorb other vertices but never move, so that borders (including uv
+    seams of split meshes) are preserved. Creases (edges whose dihedral
+    angle exceeds crease_angle) are not locked, but penalized: constraint
+    planes, perpendicular to their facets along the crease, are added to
+    the quadrics of their vertices (Garland & Heckbert), so that creases
+    may be simplified along their lines but resist moving away from them.
+
+    Args:
+        points -- the mesh points (array-like (n, 3))
+        facets -- the mesh facets (array-like (m, 3))
+        target -- target number of facets (int, 0 for no target)
+        max_error -- maximum geometric error, as a distance (float, 0 for
+            unbounded): root mean square distance from a collapsed vertex
+            to the planes of the facets it replaces
+        crease_angle -- angle above which an edge is a crease (float, in
+            radians, 0 for no crease detection)
+
+    Returns:
+        points -- the decimated points (numpy array (n', 3))
+        facets -- the decimated facets (numpy array (m', 3))
+    """
+    # pylint: disable=too-many-locals, too-many-statements
+    points = np.array(points, dtype=np.float64)
+    facets = np.array(facets, dtype=np.int64)
+    count_points = len(points)
+    target = max(int(target), 0)
+
+    # Facet planes
+    facets, normals, _ = _compute_normals_areas_np(points, facets)
+    planes = np.column_stack(
+        (normals, -(normals * points[facets[..., 0]]).sum(axis=1))
+    )
+
+    # Locked vertices (boundaries, non-manifold edges)
+    hashes = _edge_hashes(facets, count_points)
+    order = np.argsort(hashes, kind="stable")
+    hashes = hashes[order]
+    starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+    counts = np.diff(np.r_[starts, len(hashes)])
+    sharp = counts != 2
+    manifold = np.flatnonzero(counts == 2)
+    facets1 = order[starts[manifold]] // 3
+    facets2 = order[starts[manifold] + 1] // 3
+    sharp_hashes = hashes[starts[sharp]]
+    locked = np.zeros(count_points, dtype=bool)
+    locked[sharp_hashes // count_points] = True
+    locked[sharp_hashes % count_points] = True
+
+    # Vertex quadrics (sum of fundamental quadrics of adjacent facets)
+    fquadrics = planes[:, :, np.newaxis] * planes[:, np.newaxis, :]
+    fquadrics = np.repeat(fquadrics.reshape(-1, 16), 3, axis=0)
+    quadrics = np.column_stack(
+        [
+            np.bincount(facets.ravel(), fquadrics[..., k], count_points)
+            for k in range(16)
+        ]
+    ).reshape(-1, 4, 4)
+    plane_counts = np.bincount(facets.ravel(), None, count_points)
+
+    # Crease constraint planes (one per crease edge and adjacent facet)
+    if crease_angle:
+        dots = (normals[facets1] * normals[facets2]).sum(axis=1)
+        crease = dots < cos(crease_angle)
+        crease_hashes = np.tile(hashes[starts[manifold[crease]]], 2)
+        crease_facets = np.concatenate((facets1[crease], facets2[crease]))
+        first = crease_hashes // count_points
+        second = crease_hashes % count_points
+        cnormals = np.cross(
+            points[second] - points[first], normals[crease_facets]
+        )
+        norms = np.linalg.norm(cnormals, axis=1, keepdims=True)
+        cnormals = np.divide(
+            cnormals, norms, out=np.zeros_like(cnormals), where=norms != 0.0
+        )
+        cplanes = np.column_stack(
+            (cnormals, -(cnormals * points[first]).sum(axis=1))
+        )
+        cquadrics = cplanes[:, :, np.newaxis] * cplanes[:, np.newaxis, :]
+        cquadrics = cquadrics.reshape(-1, 16) * DECIMATION_CREASE_WEIGHT
+        quadrics += np.column_stack(
+            [
+                np.bincount(first, cquadrics[..., k], count_points)
+                + np.bincount(second, cquadrics[..., k], count_points)
+                for k in range(16)
+            ]
+        ).reshape(-1, 4, 4)
+
+    def not_degenerated(facets):
+        return (
+            (facets[..., 0] != facets[..., 1])
+            & (facets[..., 1] != facets[..., 2])
+            & (facets[..., 2] != facets[..., 0])
+        )
+
+    rng = np.random.default_rng(DECIMATION_SEED)
+    rejected = np.empty((0,), dtype=np.int64)
+    idle_passes = 0
+    while len(facets) > target and idle_passes < DECIMATION_IDLE_PASSES:
+        # Edges: first point is removed, second point is kept
+        hashes = np.unique(_edge_hashes(facets, count_points))
+        edges = np.column_stack(
+            (hashes // count_points, hashes % count_points)
+        )
+        swap = locked[edges[..., 0]]
+        edges[swap] = edges[swap][..., ::-1]
+        candidates = ~locked[edges[..., 0]] & ~np.isin(hashes, rejected)
+        src = edges[candidates, 0]
+        dst = edges[candidates, 1]
+        chashes = hashes[candidates]
+        if not len(src):
+            break
+
+        # Costs, for 3 candidate positions: src, dst, middle
+        # (a locked dst must not move)
+        quads = quadrics[src] + quadrics[dst]
+        positions = np.stack(
+            (points[src], points[dst], (points[src] + points[dst]) / 2),
+            axis=1,
+        )
+        homogeneous = np.concatenate(
+            (positions, np.ones(positions.shape[:2] + (1,))), axis=2
+        )
+        costs = np.einsum("nki,nij,nkj->nk", homogeneous, quads, homogeneous)
+        costs[locked[dst], 0] = np.inf
+        costs[locked[dst], 2] = np.inf
+        best = np.argmin(costs, axis=1)
+        indices = np.arange(len(best))
+        cost = costs[indices, best]
+        newpos = positions[indices, best]
+        if max_error:
+            # Quadric cost is a sum of squared distances to the planes
+            counts = plane_counts[src] + plane_counts[dst]
+            errors = np.sqrt(np.maximum(cost, 0.0) / counts)
+            valid = np.flatnonzero(errors <= max_error)
+        else:
+            valid = np.arange(len(cost))
+        if not len(valid):
+            break
+        src, dst, chashes = src[valid], dst[valid], chashes[valid]
+        cost, newpos = cost[valid], newpos[valid]
+
+        # Independent set of cheapest edges: an edge is selected if it is
+        # the cheapest one in the 2-ring of its endpoints, among eligible
+        # edges. Several rounds are made to densify the set.
+        # Ties are broken randomly: ranking them by index would select a
+        # handful of edges per pass on flat areas (all costs null)
+        rank = np.empty(len(cost), dtype=np.int64)
+        rank[np.lexsort((rng.random(len(cost)), cost))] = np.arange(len(cost))
+        touched = np.zeros(count_points, dtype=bool)
+        eligible = np.ones(len(cost), dtype=bool)
+        selected = []
+        for _ in range(DECIMATION_ROUNDS):
+            eligible_rank = np.where(eligible, rank, len(cost))
+            min1 = np.full(count_points, len(cost), dtype=np.int64)
+            np.minimum.at(min1, src, eligible_rank)
+            np.minimum.at(min1, dst, eligible_rank)
+            min2 = min1.copy()
+            np.minimum.at(min2, edges[..., 0], min1[edges[..., 1]])
+            np.minimum.at(min2, edges[..., 1], min1[edges[..., 0]])
+            new = np.flatnonzero(
+                eligible & (rank == min2[src]) & (rank == min2[dst])
+            )
+            if not len(new):
+                break
+            selected.append(new)
+            touched[src[new]] = True
+            touched[dst[new]] = True
+            near = touched[edges[..., 0]] | touched[edges[..., 1]]
+            touched[edges[near].ravel()] = True
+            eligible &= ~(touched[src] | touched[dst])
+        selected = np.concatenate(selected)
+
+        # Do not collapse more than needed (1 collapse removes 2 facets)
+        needed = (len(facets) - target + 1) // 2
+        if len(selected) > needed:
+            order = np.argsort(cost[selected], kind="stable")
+            selected = selected[order[:needed]]
+        src, dst = src[selected], dst[selected]
+        chashes, newpos = chashes[selected], newpos[selected]
+        count = len(src)
+        collapse = np.full(count_points, -1, dtype=np.int64)
+        collapse[src] = np.arange(count)
+        collapse[dst] = np.arange(count)
+
+        # Link condition: endpoints must have exactly 2 common neighbours
+        ids = np.concatenate(
+            (collapse[edges[..., 0]], collapse[edges[..., 1]])
+        )
+        neighbours = np.concatenate((edges[..., 1], edges[..., 0]))
+        keys = ids[ids >= 0] * count_points + neighbours[ids >= 0]
+        keys, key_counts = np.unique(keys, return_counts=True)
+        common = np.bincount(
+            keys[key_counts == 2] // count_points, None, count
+        )
+        reject = common != 2
+
+        # Flip check
+        remap = np.arange(count_points)
+        remap[src] = dst
+        newpoints = points.copy()
+        newpoints[dst] = newpos
+        facet_collapse = collapse[facets].max(axis=1)
+        affected = np.flatnonzero(facet_collapse >= 0)
+        old = facets[affected]
+        new = remap[old]
+        alive = not_degenerated(new)
+        old, new, affected = old[alive], new[alive], affected[alive]
+        old_triangles, new_triangles = points[old], newpoints[new]
+        old_normals = np.cross(
+            old_triangles[:, 1] - old_triangles[:, 0],
+            old_triangles[:, 2] - old_triangles[:, 0],
+        )
+        new_normals = np.cross(
+            new_triangles[:, 1] - new_triangles[:, 0],
+            new_triangles[:, 2] - new_triangles[:, 0],
+        )
+        dots = (old_normals * new_normals).sum(axis=1)
+        limits = (
+            np.linalg.norm(old_normals, axis=1)
+            * np.linalg.norm(new_normals, axis=1)
+            * DECIMATION_MIN_COS
+        )
+        reject[facet_collapse[affected[dots <= limits]]] = True
+
+        # Collapse
+        rejected = np.concatenate((rejected, chashes[reject]))
+        src, dst, newpos = src[~reject], dst[~reject], newpos[~reject]
+        if not len(src):
+            idle_passes += 1
+            continue
+        idle_passes = 0
+        remap = np.arange(count_points)
+        remap[src] = dst
+        points[dst] = newpos
+        quadrics[dst] += quadrics[src]
+        plane_counts[dst] += plane_counts[src]
+        facets = remap[facets]
+        facets = facets[not_degenerated(facets)]
+
+    # Remove unused points
+    used, facets = np.unique(facets, return_inverse=True)
+    return points[used], facets.reshape(-1, 3)
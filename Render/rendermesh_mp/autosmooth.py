@@ -60,7 +60,16 @@ NSHM = 0  # Counter on shared_memory objects, for naming purpose
 
 l3struct = struct.Struct("lll")
 l3unpack_from = l3struct.unpack_from
-l3iter_unpack = l3struct.iter_unpack
+
+
+def facets_iter_unpack(facets):
+    """Iterate over the facets of a shared array, as index triplets.
+
+    Facet indices may be 32 or 64-bit (compact mode), so the array's own
+    typecode is used.
+    """
+    # pylint: disable=protected-access
+    return struct.Struct(3 * facets._type_._type_).iter_unpack(facets)
 
 
 def create_shm(obj, empty=False):
@@ -679,7 +688,7 @@ def init(shared):
         global UNPACKED_FACETS
 
         count_points = len(SHARED_POINTS) // 3
-        UNPACKED_FACETS = list(l3iter_unpack(SHARED_FACETS))
+        UNPACKED_FACETS = list(facets_iter_unpack(SHARED_FACETS))
         # For each point, compute facets that contain this point as a vertex
         FACETS_PER_POINT = [[] for _ in range(count_points)]
 
@@ -699,7 +708,7 @@ def init(shared):
 
 
 def main(
-    python,
+    tasks,
     points,
     facets,
     normals,
@@ -762,11 +771,12 @@ def main(
         if any(result):
             print("Not null result")
 
-    def close_shm(shm):
+    def close_shm(shm, unlink=True):
         """Close shm (if shm has been created)."""
         if shm:
             shm.close()
-            shm.unlink()
+            if unlink:
+                shm.unlink()
 
     # Set working directory
     save_dir = os.getcwd()
@@ -776,45 +786,47 @@ def main(
     save_stdin = sys.stdin
     sys.stdin = sys.__stdin__
 
-    # Set executable
-    ctx = mp.get_context("spawn")
-    ctx.set_executable(python)
-
     # Logging
     logger = mp.log_to_stderr()
     logger.setLevel(logging.WARNING)
 
     chunk_size = 20000
-    nproc = os.cpu_count()
+    nproc = tasks.nproc
 
     count_facets = len(facets) // 3
 
     use_numpy = USE_NUMPY and enable_numpy
+    handed_over = False
 
     try:
+        # Facets are updated in a copy (inputs are kept intact)
+        # pylint: disable=protected-access
+        facets_copy = tasks.raw_array(facets._type_._type_, len(facets))
+        memoryview(facets_copy).cast("B")[:] = memoryview(facets).cast("B")
         shared = {
             "points": points,
-            "facets": facets,
+            "facets": facets_copy,
             "normals": normals,
             "areas": areas,
             "split_angle": split_angle,
             # max 3 adjacents/facet
-            "adjacency": ctx.RawArray("l", count_facets * 3),
-            "adjacency2": ctx.RawArray("l", count_facets * 3 * 2),  # 2nd pass
-            "tags": ctx.RawArray("l", count_facets),
-            "current_tag": ctx.Value("l", 0),
-            "current_adj": ctx.Value("l", 0),
+            "adjacency": tasks.raw_array("l", count_facets * 3),
+            # 2nd pass
+            "adjacency2": tasks.raw_array("l", count_facets * 3 * 2),
+            "tags": tasks.raw_array("l", count_facets),
+            "current_tag": tasks.value("l", 0),
+            "current_adj": tasks.value("l", 0),
             "enable_numpy": enable_numpy,
-            "points_shm_name": ctx.RawArray("b", 256),
-            "points_shm_size": ctx.RawValue("l", 0),
-            "vnormals_shm_name": ctx.RawArray("b", 256),
-            "vnormals_shm_size": ctx.RawValue("l", 0),
+            "points_shm_name": tasks.raw_array("b", 256),
+            "points_shm_size": tasks.raw_value("l", 0),
+            "vnormals_shm_name": tasks.raw_array("b", 256),
+            "vnormals_shm_size": tasks.raw_value("l", 0),
         }
         if use_numpy:
-            shared["hashes"] = ctx.RawArray("q", count_facets * 3)
-            shared["hashes_indices"] = ctx.RawArray("q", count_facets * 3)
-            shared["pairs_shm_name"] = ctx.RawArray("b", 256)
-        del points, facets, normals, areas
+            shared["hashes"] = tasks.raw_array("q", count_facets * 3)
+            shared["hashes_indices"] = tasks.raw_array("q", count_facets * 3)
+            shared["pairs_shm_name"] = tasks.raw_array("b", 256)
+        del points, facets, facets_copy, normals, areas
         facets_shm = points_shm = vnormals_shm = uvmap_shm = None
         tick("prepare shared")
 
@@ -826,8 +838,8 @@ def main(
         def shm_set_size(key, size):
             shared[key].value = size
 
-        with ctx.Pool(nproc, init, (shared,)) as pool:
-            tick("start pool")
+        with tasks.session(init, shared) as pool:
+            tick("start session")
 
             # Compute adjacency
             if use_numpy:
@@ -955,7 +967,7 @@ def main(
             # Recompute Points & Facets
 
             # Recompute points
-            iter_facets = l3iter_unpack(shared["facets"])
+            iter_facets = facets_iter_unpack(shared["facets"])
             newpoints = {
                 (point_index, tag): None
                 for facet, tag in zip(iter_facets, tags)
@@ -991,9 +1003,10 @@ def main(
             tick("rebuild uvmap")
 
             # Update point indices in facets
+            iter_facets = facets_iter_unpack(shared["facets"])
             facet_list = [
                 newpoints[point_index, tag]
-                for facet, tag in zip(l3iter_unpack(shared["facets"]), tags)
+                for facet, tag in zip(iter_facets, tags)
                 for point_index in facet
             ]
             shared["facets"][:] = facet_list
@@ -1043,8 +1056,8 @@ def main(
             vnorms = None  # Otherwise, hanging pointer to the shared mem...
             tick("reduce weighted normals")
 
-            # Normalize
-            chunks = make_chunks(chunk_size, len(shared["points"]) // 3)
+            # Normalize (new points, including split ones)
+            chunks = make_chunks(chunk_size, len(newpoints))
             func = normalize_np if use_numpy else normalize
             run_unordered(pool, func, chunks)
             tick("normalize")
@@ -1062,6 +1075,7 @@ def main(
                 output.append((uvmap_shm.name, uvmap_shm.size))
             connection.send(output)
             connection.recv()
+            handed_over = True  # Output blocks are owned by main process
             output = None
             tick("exchange data")
 
@@ -1074,7 +1088,7 @@ def main(
         raise exc
     finally:
         for shm in (facets_shm, points_shm, vnormals_shm, uvmap_shm):
-            close_shm(shm)
+            close_shm(shm, unlink=not handed_over)
         tick("close output buffers")
         os.chdir(save_dir)
         sys.stdin = save_stdin
@@ -1085,7 +1099,7 @@ def main(
 if __name__ == "__main__":
     # pylint: disable=used-before-assignment
     main(
-        PYTHON,
+        TASKS,
         POINTS,
         FACETS,
         NORMALS,
@@ -1098,7 +1112,7 @@ if __name__ == "__main__":
     )
 
     # Clean (remove references to foreign objects)
-    PYTHON = None
+    TASKS = None
     POINTS = None
     FACETS = None
     NORMALS = None
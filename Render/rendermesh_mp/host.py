@@ -0,0 +1,246 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""Script for a long-lived worker, running multiprocessing scripts on request.
+
+This script is run in a dedicated process by Render.workerpool. It waits for
+jobs (a script path and its globals) on its connection, runs them and
+reports back. Arrays are received as the names of shared memory blocks, and
+are mapped without copy: scripts read their inputs and write their outputs
+directly in the blocks of the main process.
+
+Scripts run their chunks on the task pool of the worker (global TASKS, see
+taskpool.py), which is kept from one job to the next, and stopped after
+IDLE_TIMEOUT seconds without job.
+
+Messages sent to the main process:
+("heartbeat", elapsed, progress) -- periodically, while a job is running;
+    progress is the number of chunks done by the task pool so far
+("result", object) -- when the script sends something on its connection
+("done", error, values, events) -- when the job is over; events are
+    trace events of the job (see Render.tracing), in Chrome trace format
+"""
+
+import os
+import sys
+import gc
+import runpy
+import signal
+import threading
+import time
+import traceback
+import ctypes
+import multiprocessing as mp
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(__file__))
+# pylint: disable=wrong-import-position
+import sharedmem
+from taskpool import TaskPool
+
+# Delay before stopping task pool processes, when the worker is idle
+IDLE_TIMEOUT = 60.0
+
+
+class ScriptConnection:
+    """A connection for scripts, tagging sent objects as results."""
+
+    def __init__(self, conn, lock):
+        """Initialize connection."""
+        self._conn = conn
+        self._lock = lock
+
+    def send(self, obj):
+        """Send an object to the main process."""
+        with self._lock:
+            self._conn.send(("result", obj))
+
+    def recv(self):
+        """Receive an object from the main process."""
+        return self._conn.recv()
+
+
+def unpack(job_globals):
+    """Rebuild script globals from job globals.
+
+    Shared memory blocks are mapped as arrays, values are put into shared
+    values (so that scripts can share them with their task pool).
+    """
+    res = {}
+    for key, value in job_globals.items():
+        if isinstance(value, dict) and "__shm__" in value:
+            res[key] = sharedmem.attach_array(
+                value["__shm__"], value["typecode"], value["length"]
+            )
+        elif isinstance(value, dict) and "__value__" in value:
+            res[key] = sharedmem.create_value(
+                value["__value__"], value["value"]
+            )
+        else:
+            res[key] = value
+    return res
+
+
+def trace_event(name, start, end, **args):
+    """Build a trace event for current thread (see Render.tracing)."""
+    return {
+        "name": name,
+        "cat": "worker",
+        "ph": "X",
+        "ts": start * 1e6,
+        "dur": max(end - start, 0.0) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": args,
+    }
+
+
+def peak_memory(tasks):
+    """Get peak RSS of this process and of its task pool, in bytes.
+
+    Peaks are lifetime peaks, or None if not available.
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    scale = 1 if sys.platform == "darwin" else 1024
+    children = max(
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        tasks.children_maxrss,
+    )
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        children * scale,
+    )
+
+
+def heartbeat(conn, lock, stop, interval, tasks):
+    """Send heartbeats until 'stop' is set."""
+    tm0 = time.time()
+    while not stop.wait(interval):
+        with lock:
+            conn.send(("heartbeat", time.time() - tm0, tasks.progress))
+
+
+def run_job(conn, lock, path, job_globals, tasks):
+    """Run a job.
+
+    Returns:
+        Its error (or None), output values and trace events
+    """
+    events = []
+    script = os.path.basename(path)
+    tm0 = time.time()
+    try:
+        init_globals = unpack(job_globals)
+        init_globals["CONNECTION"] = ScriptConnection(conn, lock)
+        init_globals["TASKS"] = tasks
+        tm1 = time.time()
+        events.append(trace_event("transfer in", tm0, tm1, script=script))
+        runpy.run_path(path, init_globals=init_globals, run_name="__main__")
+        tm2 = time.time()
+        maxrss, children_maxrss = peak_memory(tasks)
+        events.append(
+            trace_event(
+                "run",
+                tm1,
+                tm2,
+                script=script,
+                maxrss=maxrss,
+                children_maxrss=children_maxrss,
+            )
+        )
+
+        # Arrays have been written in place: just send values back
+        values = {
+            k: v.value
+            for k, v in init_globals.items()
+            # pylint: disable=protected-access
+            if isinstance(v, ctypes._SimpleCData)
+        }
+        events.append(trace_event("transfer out", tm2, time.time()))
+    except Exception:  # pylint: disable=broad-exception-caught
+        return traceback.format_exc(), {}, events
+    finally:
+        # Unmap shared memory
+        init_globals = None
+        gc.collect()
+    events.append(trace_event(script, tm0, time.time()))
+    return None, values, events
+
+
+def terminate(*_):
+    """Terminate the worker, with its task pool processes."""
+    for child in mp.active_children():
+        child.kill()
+    os._exit(1)  # pylint: disable=protected-access
+
+
+def serve(conn, interval):
+    """Serve jobs until the main process requests termination."""
+    lock = threading.Lock()
+    tasks = TaskPool(sys.executable)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, terminate)
+    while True:
+        try:
+            if not conn.poll(IDLE_TIMEOUT):
+                tasks.close()
+            job = conn.recv()
+        except EOFError:
+            # Main process is gone
+            break
+        if job is None:
+            break
+
+        path, job_globals = job
+        stop = threading.Event()
+        beat = threading.Thread(
+            target=heartbeat,
+            args=(conn, lock, stop, interval, tasks),
+            daemon=True,
+        )
+        beat.start()
+        try:
+            error, values, events = run_job(
+                conn, lock, path, job_globals, tasks
+            )
+        finally:
+            stop.set()
+            beat.join()
+
+        with lock:
+            conn.send(("done", error, values, events))
+    tasks.close()
+
+
+# Main
+if __name__ == "__main__":
+    # pylint: disable=used-before-assignment
+    serve(CONNECTION, HEARTBEAT_INTERVAL)
+
+    # Clean
+    CONNECTION = None
@@ -0,0 +1,138 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""Arrays and values in named shared memory blocks.
+
+Unlike RawArrays, which can only be shared by inheritance, these objects can
+be handed to any process by the name of their block (see 'block_name'), and
+mapped there without copy. They are plain ctypes objects.
+
+A block is closed when its object is garbage-collected; if the object owns
+the block, the block is unlinked too.
+
+This module is imported by the main process (as Render.rendermesh_mp.
+sharedmem) and by worker processes (as sharedmem).
+"""
+
+import ctypes
+import os
+import weakref
+from multiprocessing import shared_memory
+from multiprocessing.sharedctypes import typecode_to_type
+
+
+def attach(name):
+    """Attach to an existing shared memory block.
+
+    The block is owned (and unlinked) by another object, so it must not be
+    tracked by this process.
+    """
+    try:
+        # pylint: disable=unexpected-keyword-arg
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: the resource tracker is shared with the main
+        # process, which unregisters the block when unlinking it
+        return shared_memory.SharedMemory(name=name)
+
+
+def create_array(typecode, length):
+    """Create an array in a new shared memory block, owned by the array."""
+    ctype = typecode_to_type[typecode]
+    size = max(ctypes.sizeof(ctype) * length, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return _map(shm, ctype * length, owner=True)
+
+
+def attach_array(name, typecode, length, owner=False):
+    """Map an array on an existing shared memory block.
+
+    Args:
+        name -- the name of the block (str)
+        typecode -- the typecode of the array items (str)
+        length -- the number of items, not beyond block size (int)
+        owner -- if True, the block is unlinked with the array (bool)
+    """
+    block = shared_memory.SharedMemory(name=name) if owner else attach(name)
+    return _map(block, typecode_to_type[typecode] * length, owner)
+
+
+def create_value(typecode, value=0):
+    """Create a value in a new shared memory block, owned by the value."""
+    ctype = typecode_to_type[typecode]
+    shm = shared_memory.SharedMemory(create=True, size=ctypes.sizeof(ctype))
+    res = _map(shm, ctype, owner=True)
+    res.value = value
+    return res
+
+
+def attach_value(name, typecode):
+    """Map a value on an existing shared memory block."""
+    return _map(attach(name), typecode_to_type[typecode], owner=False)
+
+
+def truncate(array, length):
+    """Get a view on the first 'length' items of a shared array.
+
+    The view shares the block of the array (no copy) and keeps the array
+    alive.
+    """
+    # pylint: disable=protected-access
+    view = (array._type_ * length).from_address(ctypes.addressof(array))
+    view.shm_name = array.shm_name
+    view.shm_base = array
+    return view
+
+
+def block_name(obj):
+    """Get the name of the block of a shared object, or None."""
+    return getattr(obj, "shm_name", None)
+
+
+def _map(shm, ctype, owner):
+    """Map a ctypes object on a shared memory block."""
+    # Get the address of the block: the probe must not outlive this
+    # function, otherwise the block could not be closed
+    probe = ctypes.c_char.from_buffer(shm.buf)
+    address = ctypes.addressof(probe)
+    del probe
+    obj = ctype.from_address(address)
+    obj.shm_name = shm.name
+    weakref.finalize(obj, _release, shm, owner)
+
+    # The mapping is enough to keep the block alive: close the descriptor,
+    # so that many blocks can be mapped (POSIX)
+    # pylint: disable=protected-access
+    if getattr(shm, "_fd", -1) >= 0:
+        os.close(shm._fd)
+        shm._fd = -1
+    return obj
+
+
+def _release(shm, owner):
+    """Close (and unlink, if owned) a shared memory block."""
+    shm.close()
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
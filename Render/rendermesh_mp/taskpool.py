@@ -0,0 +1,349 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""A persistent pool of processes, for the chunks of multiprocessing scripts.
+
+Each worker (see host.py) owns a task pool, which it hands to the scripts it
+runs (global TASKS): scripts submit their chunks to this pool, rather than
+starting a pool of their own for each job. The pool processes are started on
+first use, and stopped when the worker has been idle for a while.
+
+A script opens a session with its pool initializer and its 'shared' dict:
+    with TASKS.session(init, shared) as pool:
+        for result in pool.imap_unordered(func, chunks):
+            ...
+'init' and 'func' must be module-level functions of the script, which is
+loaded once per job in each pool process. Shared arrays and values are
+handed to pool processes by name, so they must be allocated with
+'raw_array', 'raw_value' and 'value' (or come from the main process); other
+objects in 'shared' are pickled, once per job.
+
+The pool counts the chunks done ('progress'), so that the worker can report
+progress to the main process.
+"""
+
+import collections
+import contextlib
+import ctypes
+import gc
+import importlib.util
+import itertools
+import os
+import pickle
+import sys
+import threading
+import multiprocessing as mp
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import sharedmem
+
+# Number of locks available for synchronized values (locks are inherited
+# by pool processes, so they are created once for all)
+LOCK_COUNT = 16
+
+# Timeout for the release of a job by pool processes (seconds)
+RELEASE_TIMEOUT = 10.0
+
+Job = collections.namedtuple("Job", "key path init spec")
+
+
+class SyncValue:
+    """A value in shared memory, with a lock (see multiprocessing.Value)."""
+
+    def __init__(self, raw, lock, lock_index):
+        """Initialize value.
+
+        Args:
+            raw -- the underlying value (ctypes object in shared memory)
+            lock -- the lock
+            lock_index -- the index of the lock in the pool locks (int)
+        """
+        self.raw = raw
+        self.lock_index = lock_index
+        self._lock = lock
+
+    @property
+    def value(self):
+        """Get value."""
+        return self.raw.value
+
+    @value.setter
+    def value(self, value):
+        """Set value."""
+        self.raw.value = value
+
+    def get_lock(self):
+        """Get the lock of the value."""
+        return self._lock
+
+    def __enter__(self):
+        return self._lock.__enter__()
+
+    def __exit__(self, *args):
+        return self._lock.__exit__(*args)
+
+
+class TaskPool:
+    """A persistent pool of processes, for script chunks."""
+
+    def __init__(self, python, nproc=None):
+        """Initialize pool.
+
+        Pool processes are started on first session.
+
+        Args:
+            python -- the Python executable to run processes with (str)
+            nproc -- the number of processes (int, default: cpu count)
+        """
+        self.python = python
+        self.nproc = nproc or os.cpu_count() or 1
+        self.progress = 0
+        self.children_maxrss = 0  # In ru_maxrss units
+        self._ctx = mp.get_context("spawn")
+        self._locks = [self._ctx.Lock() for _ in range(LOCK_COUNT)]
+        self._lock_indices = itertools.cycle(range(LOCK_COUNT))
+        self._keys = itertools.count()
+        self._pool = None
+        self._barrier = None
+
+    # Allocation
+
+    @staticmethod
+    def raw_array(typecode, length):
+        """Allocate a shared array (see multiprocessing.RawArray)."""
+        return sharedmem.create_array(typecode, length)
+
+    @staticmethod
+    def raw_value(typecode, value=0):
+        """Allocate a shared value (see multiprocessing.RawValue)."""
+        return sharedmem.create_value(typecode, value)
+
+    def value(self, typecode, value=0):
+        """Allocate a shared value with a lock (see multiprocessing.Value)."""
+        index = next(self._lock_indices)
+        raw = sharedmem.create_value(typecode, value)
+        return SyncValue(raw, self._locks[index], index)
+
+    # Run
+
+    @contextlib.contextmanager
+    def session(self, init, shared):
+        """Open a session for a script.
+
+        The session yields an object with 'imap' and 'imap_unordered'
+        methods (see multiprocessing.Pool). When the session is closed, pool
+        processes release the script and its data.
+
+        Args:
+            init -- the pool initializer of the script, called with 'shared'
+                in each pool process (function)
+            shared -- the data of the script (dict)
+        """
+        pool = self._get_pool()
+        spec = {key: _describe(key, value) for key, value in shared.items()}
+        spec = pickle.dumps(spec)
+        spec_block = sharedmem.create_array("B", len(spec))
+        memoryview(spec_block).cast("B")[:] = spec
+        job = Job(
+            next(self._keys),
+            init.__code__.co_filename,
+            init.__name__,
+            (sharedmem.block_name(spec_block), len(spec)),
+        )
+        self.progress += 1
+        try:
+            yield Session(self, pool, job)
+        finally:
+            rss = pool.map(_end_session, range(self.nproc), chunksize=1)
+            self.children_maxrss = max(self.children_maxrss, *rss)
+            self._barrier.reset()
+            self.progress += 1
+
+    def close(self):
+        """Stop pool processes, if any (they are restarted on demand)."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def _get_pool(self):
+        """Get the pool, starting its processes if needed."""
+        if self._pool is None:
+            self._ctx.set_executable(self.python)
+            self._barrier = self._ctx.Barrier(self.nproc)
+            self._pool = self._ctx.Pool(
+                self.nproc, _init_process, (self._locks, self._barrier)
+            )
+        return self._pool
+
+
+class Session:
+    """A script session on a task pool (see TaskPool.session)."""
+
+    def __init__(self, taskpool, pool, job):
+        """Initialize session."""
+        self._taskpool = taskpool
+        self._pool = pool
+        self._job = job
+
+    def imap(self, func, iterable, chunksize=1):
+        """Run 'func' on chunks, yielding results in order."""
+        results = self._pool.imap(
+            _run_task, self._tasks(func, iterable), chunksize
+        )
+        return self._count(results)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        """Run 'func' on chunks, yielding results as they come."""
+        results = self._pool.imap_unordered(
+            _run_task, self._tasks(func, iterable), chunksize
+        )
+        return self._count(results)
+
+    def _tasks(self, func, iterable):
+        """Build tasks for chunks (functions are sent by name)."""
+        return ((self._job, func.__name__, chunk) for chunk in iterable)
+
+    def _count(self, results):
+        """Count results as progress."""
+        for result in results:
+            self._taskpool.progress += 1
+            yield result
+
+
+def _describe(key, value):
+    """Describe a shared object for pool processes."""
+    if isinstance(value, SyncValue):
+        name = sharedmem.block_name(value.raw)
+        # pylint: disable=protected-access
+        return ("value", name, value.raw._type_, value.lock_index)
+    name = sharedmem.block_name(value)
+    # pylint: disable=protected-access
+    if name is not None and isinstance(value, ctypes.Array):
+        return ("array", name, value._type_._type_, len(value))
+    if name is not None:
+        return ("raw_value", name, value._type_)
+    if isinstance(value, (ctypes.Array, ctypes._SimpleCData)):
+        msg = f"'{key}' is not in shared memory (see TaskPool.raw_array)"
+        raise TypeError(msg)
+    return ("object", value)
+
+
+# ===========================================================================
+#                              Pool processes
+# ===========================================================================
+
+LOCKS = None
+BARRIER = None
+CURRENT_JOB = None  # (key, module)
+
+
+def _init_process(locks, barrier):
+    """Initialize a pool process."""
+    # pylint: disable=global-statement
+    global LOCKS, BARRIER
+    LOCKS = locks
+    BARRIER = barrier
+
+
+def _materialize(desc):
+    """Rebuild a shared object from its description (see _describe)."""
+    kind, *args = desc
+    if kind == "array":
+        return sharedmem.attach_array(*args)
+    if kind == "raw_value":
+        return sharedmem.attach_value(*args)
+    if kind == "value":
+        name, typecode, lock_index = args
+        raw = sharedmem.attach_value(name, typecode)
+        return SyncValue(raw, LOCKS[lock_index], lock_index)
+    return args[0]
+
+
+def _load_job(job):
+    """Load the script of a job and initialize it (once per job)."""
+    # pylint: disable=global-statement
+    global CURRENT_JOB
+    if CURRENT_JOB is not None and CURRENT_JOB[0] == job.key:
+        return CURRENT_JOB[1]
+    _release_job()
+
+    # Load script (scripts extend sys.path when loaded: restore it)
+    path = sys.path[:]
+    name = f"rdr_job_{job.key}"
+    spec = importlib.util.spec_from_file_location(name, job.path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path[:] = path
+
+    # Initialize script
+    spec_name, spec_size = job.spec
+    spec_block = sharedmem.attach_array(spec_name, "B", spec_size)
+    spec = pickle.loads(memoryview(spec_block).cast("B"))
+    shared = {key: _materialize(desc) for key, desc in spec.items()}
+    getattr(module, job.init)(shared)
+
+    CURRENT_JOB = (job.key, module)
+    return module
+
+
+def _run_task(task):
+    """Run a chunk of a job."""
+    job, func_name, chunk = task
+    return getattr(_load_job(job), func_name)(chunk)
+
+
+def _release_job():
+    """Release the current job, if any.
+
+    The script and its data are dropped, and shared memory is unmapped.
+    """
+    # pylint: disable=global-statement
+    global CURRENT_JOB
+    CURRENT_JOB = None
+    gc.enable()  # Scripts may disable it
+    gc.collect()
+
+
+def _end_session(_):
+    """Release the current job at the end of a session.
+
+    The pool processes wait for each other, so that each one gets a release
+    task.
+
+    Returns:
+        The peak RSS of the process (ru_maxrss), or 0 if not available
+    """
+    _release_job()
+    try:
+        BARRIER.wait(RELEASE_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,60 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""Script for shape tessellation in multiprocessing mode.
+
+The shape is received as a BREP string. The mesh is written to a file
+(FreeCAD binary mesh format), and the script sends back the number of points
+and facets, and the tessellation duration.
+"""
+
+import time
+
+# pylint: disable=import-error
+import Part
+import MeshPart
+
+
+def main(brep, linear_deflection, angular_deflection, outfile, connection):
+    """Tessellate a shape and write the mesh to a file."""
+    tm0 = time.time()
+    shape = Part.Shape()
+    shape.importBrepFromString(brep)
+    mesh = MeshPart.meshFromShape(
+        Shape=shape,
+        LinearDeflection=linear_deflection,
+        AngularDeflection=angular_deflection,
+        Relative=False,
+    )
+    mesh.write(outfile)
+    connection.send((mesh.CountPoints, mesh.CountFacets, time.time() - tm0))
+    connection.recv()
+
+
+# Main
+if __name__ == "__main__":
+    # pylint: disable=used-before-assignment
+    main(BREP, LINEAR_DEFLECTION, ANGULAR_DEFLECTION, OUTFILE, CONNECTION)
+
+    # Clean (remove references to foreign objects)
+    BREP = None
+    CONNECTION = None
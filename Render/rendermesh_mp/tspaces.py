@@ -0,0 +1,406 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2022 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""Script for tangent space computation in multiprocessing mode.
+
+Lengyel, Eric. “Computing Tangent Space Basis Vectors for an Arbitrary Mesh”.
+Terathon Software 3D Graphics Library, 2001.
+http://www.terathon.com/code/tangent.html
+
+The computation is made in 3 steps:
+- per-facet directions (sdir, tdir), by chunks of facets
+- reduction of directions per vertex, by vector component
+- Gram-Schmidt orthogonalization and handedness, by chunks of vertices
+"""
+
+import sys
+import os
+import traceback
+
+try:
+    import numpy as np
+
+    USE_NUMPY = True
+except ModuleNotFoundError:
+    USE_NUMPY = False
+
+sys.path.insert(0, os.path.dirname(__file__))
+# pylint: disable=wrong-import-position
+from vector3d import sub, dot, cross, safe_normalize
+
+# *****************************************************************************
+
+
+def getpoint(idx):
+    """Get a point from its index in the shared memory."""
+    idx *= 3
+    return SHARED_POINTS[idx], SHARED_POINTS[idx + 1], SHARED_POINTS[idx + 2]
+
+
+def getfacet(idx):
+    """Get a facet from its index in the shared memory."""
+    idx *= 3
+    return SHARED_FACETS[idx], SHARED_FACETS[idx + 1], SHARED_FACETS[idx + 2]
+
+
+def getuv(idx):
+    """Get a uv from its index in the shared memory."""
+    idx *= 2
+    return SHARED_UVMAP[idx], SHARED_UVMAP[idx + 1]
+
+
+def getvector(array, idx):
+    """Get a 3-vector from its index in a shared array."""
+    idx *= 3
+    return array[idx], array[idx + 1], array[idx + 2]
+
+
+# *****************************************************************************
+
+
+def compute_directions(chunk):
+    """Compute facet directions (sdir, tdir) for a chunk of facets.
+
+    Directions of degenerated facets are null.
+    Results are directly set in shared memory.
+
+    Args:
+        chunk -- a pair of facet indices (start, stop)
+    """
+    if USE_NUMPY:
+        compute_directions_np(chunk)
+    else:
+        compute_directions_std(chunk)
+
+
+def compute_directions_std(chunk):
+    """Compute facet directions (standard version).
+
+    Items of shared arrays are read as Python floats: computation is made in
+    double precision.
+    """
+    start, stop = chunk
+    sdirs, tdirs = SHARED_SDIR, SHARED_TDIR
+    for ifacet in range(start, stop):
+        facet = getfacet(ifacet)
+        pv1, pv2, pv3 = (getpoint(i) for i in facet)
+        (s_1, t_1), (s_2, t_2), (s_3, t_3) = (getuv(i) for i in facet)
+
+        vec1, vec2 = sub(pv2, pv1), sub(pv3, pv1)
+        ds1, ds2 = s_2 - s_1, s_3 - s_1
+        dt1, dt2 = t_2 - t_1, t_3 - t_1
+
+        index = ifacet * 3
+        if not (det := ds1 * dt2 - ds2 * dt1):
+            # Degenerated
+            sdirs[index : index + 3] = [0.0, 0.0, 0.0]
+            tdirs[index : index + 3] = [0.0, 0.0, 0.0]
+            continue
+        ratio = 1.0 / det
+        sdirs[index : index + 3] = [
+            (dt2 * v1 - dt1 * v2) * ratio for v1, v2 in zip(vec1, vec2)
+        ]
+        tdirs[index : index + 3] = [
+            (ds1 * v2 - ds2 * v1) * ratio for v1, v2 in zip(vec1, vec2)
+        ]
+
+
+def compute_directions_np(chunk):
+    """Compute facet directions (numpy version).
+
+    Shared points and uv are single precision: differences must be computed
+    in double precision, like in the other versions.
+    """
+    start, stop = chunk
+    facets = SHARED_FACETS_NP[start:stop]
+    triangles = np.take(SHARED_POINTS_NP, facets, axis=0).astype(np.float64)
+    uvs = np.take(SHARED_UVMAP_NP, facets, axis=0).astype(np.float64)
+
+    vec1 = triangles[:, 1] - triangles[:, 0]
+    vec2 = triangles[:, 2] - triangles[:, 0]
+    ds1, dt1 = (uvs[:, 1] - uvs[:, 0]).T
+    ds2, dt2 = (uvs[:, 2] - uvs[:, 0]).T
+
+    det = ds1 * dt2 - ds2 * dt1
+    ratio = np.divide(1.0, det, out=np.zeros_like(det), where=det != 0.0)
+    ratio = ratio[:, np.newaxis]
+
+    sdir = (dt2[:, np.newaxis] * vec1 - dt1[:, np.newaxis] * vec2) * ratio
+    tdir = (ds1[:, np.newaxis] * vec2 - ds2[:, np.newaxis] * vec1) * ratio
+    np.copyto(SHARED_SDIR_NP[start:stop], sdir, casting="unsafe")
+    np.copyto(SHARED_TDIR_NP[start:stop], tdir, casting="unsafe")
+
+
+# *****************************************************************************
+
+
+def reduce_directions(component):
+    """Sum facet directions per vertex, for a vector component.
+
+    Args:
+        component -- the component to reduce: 0-2 for sdir (x, y, z), 3-5 for
+            tdir (x, y, z)
+    """
+    if USE_NUMPY:
+        reduce_directions_np(component)
+    else:
+        reduce_directions_std(component)
+
+
+def reduce_directions_std(component):
+    """Sum facet directions per vertex (standard version)."""
+    source = SHARED_SDIR if component < 3 else SHARED_TDIR
+    target = SHARED_TAN1 if component < 3 else SHARED_TAN2
+    coord = component % 3
+    facets = SHARED_FACETS
+    count_points = len(target) // 3
+    sums = [0.0] * count_points
+    for ifacet in range(len(facets) // 3):
+        value = source[ifacet * 3 + coord]
+        if value:
+            index = ifacet * 3
+            sums[facets[index]] += value
+            sums[facets[index + 1]] += value
+            sums[facets[index + 2]] += value
+    target[coord::3] = sums
+
+
+def reduce_directions_np(component):
+    """Sum facet directions per vertex (numpy version)."""
+    source = SHARED_SDIR_NP if component < 3 else SHARED_TDIR_NP
+    target = SHARED_TAN1_NP if component < 3 else SHARED_TAN2_NP
+    coord = component % 3
+    weights = np.repeat(source[:, coord], 3)
+    sums = np.bincount(
+        SHARED_FACETS_NP.ravel(), weights=weights, minlength=len(target)
+    )
+    np.copyto(target[:, coord], sums, casting="unsafe")
+
+
+# *****************************************************************************
+
+
+def orthogonalize(chunk):
+    """Compute tangents and tangent signs for a chunk of vertices.
+
+    Args:
+        chunk -- a pair of vertex indices (start, stop)
+    """
+    if USE_NUMPY:
+        orthogonalize_np(chunk)
+    else:
+        orthogonalize_std(chunk)
+
+
+def orthogonalize_std(chunk):
+    """Compute tangents and tangent signs (standard version)."""
+    start, stop = chunk
+    for ivertex in range(start, stop):
+        nor = getvector(SHARED_VNORMALS, ivertex)
+        tan = getvector(SHARED_TAN1, ivertex)
+        bitan = getvector(SHARED_TAN2, ivertex)
+
+        # Gram-Schmidt orthogonalize
+        ndot = dot(nor, tan)
+        tangent = safe_normalize(tuple(t - n * ndot for t, n in zip(tan, nor)))
+        SHARED_TANGENTS[ivertex * 3 : ivertex * 3 + 3] = list(tangent)
+
+        # Handedness
+        handedness = -1.0 if dot(bitan, cross(nor, tan)) < 0.0 else 1.0
+        SHARED_TANGENT_SIGNS[ivertex] = handedness
+
+
+def orthogonalize_np(chunk):
+    """Compute tangents and tangent signs (numpy version)."""
+    start, stop = chunk
+    normals = SHARED_VNORMALS_NP[start:stop]
+    tan1 = SHARED_TAN1_NP[start:stop]
+    tan2 = SHARED_TAN2_NP[start:stop]
+
+    # Gram-Schmidt orthogonalize
+    dots = (normals * tan1).sum(axis=1)[:, np.newaxis]
+    tangents = tan1 - normals * dots
+    magnitudes = np.linalg.norm(tangents, axis=1)[:, np.newaxis]
+    tangents = np.divide(
+        tangents, magnitudes, out=tangents, where=magnitudes != 0.0
+    )
+    np.copyto(SHARED_TANGENTS_NP[start:stop], tangents, casting="unsafe")
+
+    # Handedness
+    signs = np.where((tan2 * np.cross(normals, tan1)).sum(axis=1) < 0.0, -1, 1)
+    np.copyto(SHARED_TANGENT_SIGNS_NP[start:stop], signs, casting="unsafe")
+
+
+# *****************************************************************************
+
+
+def init(shared):
+    """Initialize pool of processes."""
+    names = (
+        "points",
+        "facets",
+        "uvmap",
+        "vnormals",
+        "sdir",
+        "tdir",
+        "tan1",
+        "tan2",
+        "tangents",
+        "tangent_signs",
+    )
+    widths = {"uvmap": 2, "tangent_signs": 1}
+    for name in names:
+        globals()[f"SHARED_{name.upper()}"] = shared[name]
+
+    # pylint: disable=global-statement
+    global USE_NUMPY
+
+    if USE_NUMPY := USE_NUMPY and shared["enable_numpy"]:
+        for name in names:
+            array = np.ctypeslib.as_array(shared[name])
+            if (width := widths.get(name, 3)) > 1:
+                array.shape = (-1, width)
+            globals()[f"SHARED_{name.upper()}_NP"] = array
+
+
+# *****************************************************************************
+
+
+def main(
+    tasks,
+    points,
+    facets,
+    uvmap,
+    vnormals,
+    showtime,
+    enable_numpy,
+    out_tangents,
+    out_tangent_signs,
+):
+    """Entry point for __main__.
+
+    This code executes in main process.
+    Keeping this code out of global scope makes all local objects to be freed
+    at the end of the function and thus avoid memory leaks.
+    """
+    # pylint: disable=import-outside-toplevel
+    import time
+
+    count_facets = len(facets) // 3
+    count_points = len(points) // 3
+
+    tm0 = time.time()
+    if showtime:
+        msg = (
+            f"start tangent spaces computation: {count_points} points, "
+            f"{count_facets} facets"
+        )
+        print(msg)
+
+    def tick(msg=""):
+        """Print the time (debug purpose)."""
+        if showtime:
+            print(msg, time.time() - tm0)
+
+    def make_chunks(chunk_size, length):
+        return (
+            (i, min(i + chunk_size, length))
+            for i in range(0, length, chunk_size)
+        )
+
+    def run_unordered(pool, function, iterable):
+        imap = pool.imap_unordered(function, iterable)
+        for _ in imap:
+            pass
+
+    # Set working directory
+    save_dir = os.getcwd()
+    os.chdir(os.path.dirname(__file__))
+
+    # Set stdin
+    save_stdin = sys.stdin
+    sys.stdin = sys.__stdin__
+
+    chunk_size = 20000
+
+    try:
+        shared = {
+            "points": points,
+            "facets": facets,
+            "uvmap": uvmap,
+            "vnormals": vnormals,
+            "sdir": tasks.raw_array("d", count_facets * 3),
+            "tdir": tasks.raw_array("d", count_facets * 3),
+            "tan1": tasks.raw_array("d", count_points * 3),
+            "tan2": tasks.raw_array("d", count_points * 3),
+            "tangents": out_tangents,
+            "tangent_signs": out_tangent_signs,
+            "enable_numpy": enable_numpy,
+        }
+        tick("prepare shared")
+        with tasks.session(init, shared) as pool:
+            tick("start session")
+
+            chunks = make_chunks(chunk_size, count_facets)
+            run_unordered(pool, compute_directions, chunks)
+            tick("directions")
+
+            run_unordered(pool, reduce_directions, range(6))
+            tick("reduction")
+
+            chunks = make_chunks(chunk_size, count_points)
+            run_unordered(pool, orthogonalize, chunks)
+            tick("orthogonalization")
+    except Exception as exc:
+        print(traceback.format_exc())
+        raise exc
+    finally:
+        os.chdir(save_dir)
+        sys.stdin = save_stdin
+
+
+# *****************************************************************************
+
+if __name__ == "__main__":
+    # pylint: disable=used-before-assignment
+    main(
+        TASKS,
+        POINTS,
+        FACETS,
+        UVMAP,
+        VNORMALS,
+        SHOWTIME,
+        ENABLE_NUMPY,
+        OUT_TANGENTS,
+        OUT_TANGENT_SIGNS,
+    )
+
+    # Clean
+    TASKS = None
+    POINTS = None
+    FACETS = None
+    UVMAP = None
+    VNORMALS = None
+    SHOWTIME = None
+    ENABLE_NUMPY = None
+    OUT_TANGENTS = None
+    OUT_TANGENT_SIGNS = None
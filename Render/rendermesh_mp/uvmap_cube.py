@@ -37,13 +37,7 @@ except ModuleNotFoundError:
 
 sys.path.insert(0, os.path.dirname(__file__))
 # pylint: disable=wrong-import-position
-from vector3d import (
-    sub,
-    add_n,
-    fmul,
-    fdiv,
-    barycenter,
-)
+from vector3d import sub
 
 
 # Vocabulary:
@@ -65,12 +59,6 @@ def getpoint(idx):
     return SHARED_POINTS[idx], SHARED_POINTS[idx + 1], SHARED_POINTS[idx + 2]
 
 
-def getfacet(idx):
-    """Get a facet from its index in the shared memory."""
-    idx *= 3
-    return SHARED_FACETS[idx], SHARED_FACETS[idx + 1], SHARED_FACETS[idx + 2]
-
-
 def getnormal(idx):
     """Get a normal from its index in the shared memory."""
     idx *= 3
@@ -81,11 +69,6 @@ def getnormal(idx):
     )
 
 
-def getarea(idx):
-    """Get a normal from its index in the shared memory."""
-    return SHARED_AREAS[idx]
-
-
 # *****************************************************************************
 
 
@@ -105,7 +88,8 @@ def _intersect_unitcube_face(direction):
         (abs(diry), 2, diry < 0),
         (abs(dirz), 4, dirz < 0),
     )
-    _, idx1, idx2 = max(vec)
+    # On ties, the first axis wins (like in single process version)
+    _, idx1, idx2 = max(vec, key=lambda v: v[0])
     return idx1 + int(idx2)
 
 
@@ -123,41 +107,17 @@ def colorize_std(chunk):
     Color is an integer in [0,5].
     The color depends on the normal of the triangle, projected to unit cube
     faces.
-    This method also computes partial sums for center of gravity.
     The colors are directly set in shared memory.
 
 
     Args:
         chunk -- a pair of facet indices (start, stop)
-
-    Returns
-        Centroid of facets (point: 3-float tuple)
-        Area sum of facets (float)
     """
     start, stop = chunk
-    facets = (getfacet(i) for i in range(start, stop))
     normals = (getnormal(i) for i in range(start, stop))
-    areas = [getarea(i) for i in range(start, stop)]
-    triangles = (tuple(getpoint(i) for i in facet) for facet in facets)
-
-    data = (
-        (barycenter(t), n, a) for t, n, a in zip(triangles, normals, areas)
-    )
-    data = (
-        (_intersect_unitcube_face(normal), barycenter, area)
-        for barycenter, normal, area in data
-    )
-    data = (
-        (color, fmul(barycenter, area)) for color, barycenter, area in data
-    )
-    colors, barys = zip(*data)
-
-    centroid = add_n(*barys)
-    area = sum(areas)
+    colors = [_intersect_unitcube_face(normal) for normal in normals]
 
-    SHARED_FACET_COLORS[start:stop] = list(colors)
-
-    return centroid, area
+    SHARED_FACET_COLORS[start:stop] = colors
 
 
 def colorize_np(chunk):
@@ -167,12 +127,6 @@ def colorize_np(chunk):
 
     normals = SHARED_NORMALS_NP[start:stop,]
 
-    facets = SHARED_FACETS_NP[start:stop,]
-
-    areas = SHARED_AREAS_NP[start:stop]
-
-    triangles = np.take(SHARED_POINTS_NP, facets, axis=0)
-
     # Compute facet colors
     # Color is made of 2 terms:
     # First term: max of absolute coordinates of normals
@@ -190,15 +144,6 @@ def colorize_np(chunk):
         SHARED_FACET_COLORS_NP[start:stop], facet_colors, casting="unsafe"
     )
 
-    # Compute center of gravity (triangle cogs weighted by triangle areas)
-    weighted_triangle_cogs = (
-        np.add.reduce(triangles, 1) * areas[:, np.newaxis] / 3
-    )
-    centroid = np.sum(weighted_triangle_cogs, axis=0).tolist()
-    area = float(np.sum(areas))
-
-    return centroid, area
-
 
 # *****************************************************************************
 
@@ -391,9 +336,6 @@ def init(shared):
     global SHARED_NORMALS
     SHARED_NORMALS = shared["normals"]
 
-    global SHARED_AREAS
-    SHARED_AREAS = shared["areas"]
-
     global SHARED_COG
     SHARED_COG = shared["cog"]
 
@@ -424,9 +366,6 @@ def init(shared):
         SHARED_FACETS_NP = np.ctypeslib.as_array(SHARED_FACETS)
         SHARED_FACETS_NP.shape = (-1, 3)
 
-        global SHARED_AREAS_NP
-        SHARED_AREAS_NP = np.ctypeslib.as_array(SHARED_AREAS)
-
         global SHARED_POINTS_NP
         SHARED_POINTS_NP = np.ctypeslib.as_array(SHARED_POINTS)
         SHARED_POINTS_NP.shape = (len(SHARED_POINTS) // 3, 3)
@@ -451,11 +390,11 @@ def init(shared):
 
 # pylint: disable=too-many-arguments
 def main(
-    python,
+    tasks,
     points,
     facets,
     normals,
-    areas,
+    origin,
     showtime,
     enable_numpy,
     out_points,
@@ -471,7 +410,6 @@ def main(
     """
     # pylint: disable=import-outside-toplevel
     # pylint: disable=too-many-locals
-    import multiprocessing as mp
     import itertools
     import time
 
@@ -524,40 +462,31 @@ def main(
     save_stdin = sys.stdin
     sys.stdin = sys.__stdin__
 
-    # Set executable
-    ctx = mp.get_context("spawn")
-    ctx.set_executable(python)
-
     chunk_size = 20000
-    nproc = os.cpu_count()
 
     try:
-        # Compute facets colors and center of gravity
+        # Facets are updated in the output buffer (inputs are kept intact)
+        memoryview(out_facets).cast("B")[:] = memoryview(facets).cast("B")
         shared = {
             "points": points,
-            "facets": facets,
+            "facets": out_facets,
             "normals": normals,
-            "areas": areas,
-            "cog": ctx.RawArray("f", 3),
-            "facet_colors": ctx.RawArray("B", count_facets),
-            "colored_points": ctx.RawArray("L", count_points * 2 * 6),
-            "colored_points_len": ctx.RawValue("l"),
-            "uvmap": ctx.RawArray("f", count_points * 2 * 6),
+            "cog": tasks.raw_array("d", 3),
+            "facet_colors": tasks.raw_array("B", count_facets),
+            "colored_points": tasks.raw_array("L", count_points * 2 * 6),
+            "colored_points_len": tasks.raw_value("l"),
+            "uvmap": tasks.raw_array("f", count_points * 2 * 6),
             "enable_numpy": enable_numpy,
         }
+        # Origin (center of gravity of the original mesh, in double)
+        shared["cog"][:] = origin
         tick("prepare shared")
-        with ctx.Pool(nproc, init, (shared,)) as pool:
-            tick("start pool")
-            chunks = make_chunks(chunk_size, count_facets)
-            data = pool.imap_unordered(colorize, chunks)
-
-            centroids, area_sums = zip(*data)
-            centroid = add_n(*centroids)
-            area_sum = sum(area_sums)
+        with tasks.session(init, shared) as pool:
+            tick("start session")
 
-            # Compute center of gravity
-            cog = fdiv(centroid, area_sum)
-            shared["cog"][:] = cog
+            # Compute facets colors
+            chunks = make_chunks(chunk_size, count_facets)
+            run_unordered(pool, colorize, chunks)
             tick("colorize")
 
             # Update points
@@ -575,7 +504,6 @@ def main(
             # Update facets
             chunks = make_chunks(chunk_size, count_facets)
             run_unordered(pool, update_facets, chunks)
-            out_facets[::] = shared["facets"]
             tick("update facets")
 
             # Compute uvmap
@@ -608,11 +536,11 @@ def main(
 if __name__ == "__main__":
     # pylint: disable=used-before-assignment
     main(
-        PYTHON,
+        TASKS,
         POINTS,
         FACETS,
         NORMALS,
-        AREAS,
+        ORIGIN,
         SHOWTIME,
         ENABLE_NUMPY,
         OUT_POINTS,
@@ -622,11 +550,11 @@ if __name__ == "__main__":
     )
 
     # Clean
-    PYTHON = None
+    TASKS = None
     POINTS = None
     FACETS = None
     NORMALS = None
-    AREAS = None
+    ORIGIN = None
     SHOWTIME = None
     ENABLE_NUMPY = None
     OUT_POINTS = None
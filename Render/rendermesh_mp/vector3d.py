@@ -145,6 +145,17 @@ def dot(vec1, vec2):
     return vec1_x * vec2_x + vec1_y * vec2_y + vec1_z * vec2_z
 
 
+def cross(vec1, vec2):
+    """Cross product."""
+    vec1_x, vec1_y, vec1_z = vec1
+    vec2_x, vec2_y, vec2_z = vec2
+    return (
+        vec1_y * vec2_z - vec1_z * vec2_y,
+        vec1_z * vec2_x - vec1_x * vec2_z,
+        vec1_x * vec2_y - vec1_y * vec2_x,
+    )
+
+
 def dot4(vec1, vec2):
     """Dot product."""
     vec1_x, vec1_y, vec1_z, vec1_t = vec1
@@ -25,7 +25,6 @@
 It is a helper for Rendermesh._write_objfile_mp.
 """
 
-import multiprocessing as mp
 from multiprocessing.shared_memory import SharedMemory
 from multiprocessing.managers import SharedMemoryManager
 import functools
@@ -33,9 +32,9 @@ import operator
 
 
 # Init
-def init(*args):
+def init(shared):
     """Initialize pool."""
-    mask_f, shared, smm_address, *_ = args
+    mask_f, smm_address = shared["mask"], shared["smm_address"]
 
     # pylint: disable=global-variable-undefined
     global SHARED_POINTS
@@ -136,11 +135,11 @@ if __name__ == "__main__":
 
     # Get variables
     try:
-        PYTHON
+        TASKS
     except NameError:
-        PYTHON = None
+        TASKS = None
 
-    assert PYTHON, "No Python executable provided."
+    assert TASKS, "No task pool provided."
 
     # Set working directory
     save_dir = os.getcwd()
@@ -150,12 +149,7 @@ if __name__ == "__main__":
     save_stdin = sys.stdin
     sys.stdin = sys.__stdin__
 
-    # Set executable
-    mp.set_executable(PYTHON)
-    mp.set_start_method("spawn", force=True)
-
     CHUNK_SIZE = 20000
-    NPROC = os.cpu_count()
 
     def make_chunks(chunk_size, length):
         """Compute a tuple (start, stop) to define a chunk."""
@@ -189,9 +183,10 @@ if __name__ == "__main__":
 
         with SharedMemoryManager() as smm:
             tick("shared memory manager started")
-            pool_args = (MASK, SHARED, smm.address)
-            with mp.Pool(NPROC, init, pool_args) as pool:
-                tick("pool started")
+            SHARED["mask"] = MASK
+            SHARED["smm_address"] = smm.address
+            with TASKS.session(init, SHARED) as pool:
+                tick("session started")
                 with open(OBJFILE, "w+b") as f:
 
                     def write_array(name, format_function, item_number):
@@ -0,0 +1,384 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements a renderer-neutral intermediate representation.
+
+The scene IR is recorded by RendererHandler during export, and stored on
+disk:
+- unique meshes are stored once, as Numpy archives (points, facets, uv map,
+  vertex normals, in meters), and shared by all their instances
+- objects reference a mesh, a transformation, a material and a default color
+- lights and cameras are stored as renderer method calls, with their
+  arguments
+- renderer specifics are stored for all renderers
+
+Any renderer can then emit its scene from the IR, without re-meshing.
+
+Materials are stored as references to document materials and are resolved
+for the target renderer at emission time, as material resolution depends on
+the renderer (passthrough materials).
+"""
+
+import os
+import json
+import hashlib
+import itertools
+import threading
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    pass
+
+import FreeCAD as App
+
+from Render.constants import RENDERERS
+from Render.rendermesh import create_rendermesh_from_arrays
+from Render.tracing import span
+from Render.utils import RGB, debug, warn
+
+SCENE_IR_VERSION = 1
+MANIFEST = "scene.json"
+MESHDIR = "meshes"
+
+# Group of the default camera (the camera built from the viewport)
+DEFAULT_CAMERA_GROUP = "<DefaultCamera>"
+
+
+class SceneIR:
+    """A renderer-neutral intermediate representation of a scene.
+
+    Recording methods are thread-safe.
+    """
+
+    def __init__(self, directory):
+        """Initialize scene IR.
+
+        Args:
+            directory -- the directory where the IR is to be stored (str)
+        """
+        if "np" not in globals():
+            raise SceneIRError("Scene IR requires Numpy")
+        self.directory = os.path.normpath(str(directory))
+        os.makedirs(os.path.join(self.directory, MESHDIR), exist_ok=True)
+        self.groups = {}
+        self.meshes = set()
+        self._lock = threading.Lock()
+        self._arrays = {}
+
+    # Recording
+
+    def add_renderable(self, group, renderable, specifics):
+        """Record a renderable (mesh instance).
+
+        The mesh is expected to be already converted into meters.
+
+        Args:
+            group -- the group of the record (the view name) (str)
+            renderable -- the renderable to record (renderables.Renderable)
+            specifics -- the renderer specifics, for all renderers (dict)
+        """
+        mesh = renderable.mesh
+        transformation = mesh.transformation
+        record = {
+            "type": "mesh",
+            "name": renderable.name,
+            "label": mesh.name,
+            "mesh": self._add_mesh(mesh),
+            "placement": list(transformation.get_placement().Matrix.A),
+            "scale": transformation.scale,
+            "material": _material_reference(renderable.material),
+            "defcolor": list(renderable.defcolor.to_srgb()),
+            "specifics": _encode_specifics(specifics),
+        }
+        self._add_record(group, record)
+
+    def add_call(self, group, method, args, specifics):
+        """Record a renderer method call (lights, cameras...).
+
+        Args:
+            group -- the group of the record (the view name) (str)
+            method -- the renderer method (str)
+            args -- the positional arguments of the call (tuple)
+            specifics -- the renderer specifics, for all renderers (dict)
+        """
+        record = {
+            "type": "call",
+            "method": str(method),
+            "args": [_encode(a) for a in args],
+            "specifics": _encode_specifics(specifics),
+        }
+        self._add_record(group, record)
+
+    def _add_record(self, group, record):
+        """Add a record to a group (thread-safe)."""
+        with self._lock:
+            self.groups.setdefault(str(group), []).append(record)
+
+    def _add_mesh(self, mesh):
+        """Add a mesh to the IR, if not already present.
+
+        Returns:
+            The key of the mesh (str)
+        """
+        arrays = _get_arrays(mesh)
+        digest = hashlib.sha1()
+        for name in sorted(arrays):
+            digest.update(name.encode())
+            digest.update(arrays[name].tobytes())
+        key = digest.hexdigest()
+
+        with self._lock:
+            if key in self.meshes:
+                return key
+            self.meshes.add(key)
+
+        np.savez(self._mesh_path(key), **arrays)
+        return key
+
+    def _mesh_path(self, key):
+        """Get the path of a mesh archive."""
+        return os.path.join(self.directory, MESHDIR, f"{key}.npz")
+
+    # Storage
+
+    def save(self):
+        """Save the IR manifest on disk.
+
+        Returns:
+            The path of the manifest (str)
+        """
+        path = os.path.join(self.directory, MANIFEST)
+        manifest = {
+            "version": SCENE_IR_VERSION,
+            "meshes": sorted(self.meshes),
+            "groups": self.groups,
+        }
+        with open(path, "w", encoding="utf-8") as fobj:
+            json.dump(manifest, fobj)
+        return path
+
+    @classmethod
+    def load(cls, directory):
+        """Load an IR from disk.
+
+        Args:
+            directory -- the directory where the IR has been saved (str)
+        """
+        path = os.path.join(directory, MANIFEST)
+        with open(path, "r", encoding="utf-8") as fobj:
+            manifest = json.load(fobj)
+        if (version := manifest.get("version")) != SCENE_IR_VERSION:
+            raise SceneIRError(f"Unsupported scene IR version '{version}'")
+        scene_ir = cls(directory)
+        scene_ir.meshes = set(manifest["meshes"])
+        scene_ir.groups = manifest["groups"]
+        return scene_ir
+
+    # Emission
+
+    def emit(self, handler, shared_files=None):
+        """Emit rendering strings for a renderer.
+
+        Args:
+            handler -- the renderer handler (rdrhandler.RendererHandler)
+            shared_files -- a dictionary of mesh files to share among
+                successive emissions (optional, see RenderMesh.write_file)
+
+        Returns:
+            The rendering strings of the objects (list of str)
+            The rendering string of the default camera (str)
+        """
+        objstrings = []
+        defaultcam = ""
+        for group, records in self.groups.items():
+            with span(group, "view"):
+                string = "".join(
+                    self._emit_record(handler, r, shared_files)
+                    for r in records
+                )
+            if group == DEFAULT_CAMERA_GROUP:
+                defaultcam = string
+            else:
+                objstrings.append(string)
+        self._arrays.clear()
+        return objstrings, defaultcam
+
+    def _emit_record(self, handler, record, shared_files=None):
+        """Emit the rendering string of a record."""
+        specifics = _decode_specifics(record["specifics"])
+
+        if record["type"] == "call":
+            args = [_decode(a) for a in record["args"]]
+            return handler.emit_call(record["method"], args, specifics)
+
+        mesh = create_rendermesh_from_arrays(
+            *self._load_arrays(record["mesh"]),
+            placement=App.Placement(App.Matrix(*record["placement"])),
+            scale=record["scale"],
+            project_directory=handler.project_directory,
+            export_directory=handler.object_directory,
+            relative_path=True,
+            name=record["label"],
+        )
+        mesh.shared_files = shared_files
+        mesh.content_key = record["mesh"]
+        return handler.emit_renderable(
+            record["name"],
+            mesh,
+            _resolve_material(record["material"], record["label"]),
+            RGB(record["defcolor"]),
+            specifics,
+        )
+
+    def _load_arrays(self, key):
+        """Load the arrays of a mesh (cached).
+
+        Returns:
+            A tuple (points, facets, uvmap, vnormals)
+        """
+        try:
+            return self._arrays[key]
+        except KeyError:
+            pass
+        with np.load(self._mesh_path(key)) as archive:
+            points = archive["points"]
+            facets = archive["facets"]
+            uvmap = archive["uvmap"] if "uvmap" in archive else None
+            vnormals = archive["vnormals"] if "vnormals" in archive else None
+        if uvmap is not None:
+            uvmap = uvmap[..., 0] + 1j * uvmap[..., 1]
+        arrays = points, facets, uvmap, vnormals
+        self._arrays[key] = arrays
+        return arrays
+
+
+# ===========================================================================
+#                                  Helpers
+# ===========================================================================
+
+
+def get_neutral_prefixes():
+    """Get the property prefixes of renderer specifics, for all renderers."""
+    return tuple(RENDERERS)
+
+
+def _get_arrays(mesh):
+    """Get the arrays of a mesh, for storage."""
+    arrays = {
+        "points": _to_array(mesh.points, np.float64, 3),
+        "facets": _to_array(mesh.facets, np.int64, 3),
+    }
+    if mesh.has_uvmap():
+        uvmap = np.fromiter(mesh.uvmap, dtype=np.complex128)
+        arrays["uvmap"] = np.stack((uvmap.real, uvmap.imag), axis=-1)
+    if mesh.has_vnormals():
+        arrays["vnormals"] = _to_array(mesh.vnormals, np.float64, 3)
+    return arrays
+
+
+def _to_array(values, dtype, width):
+    """Convert a sequence of tuples into a 2D array."""
+    if isinstance(values, np.ndarray):
+        return values.astype(dtype, copy=False).reshape((-1, width))
+    values = itertools.chain.from_iterable(values)
+    return np.fromiter(values, dtype=dtype).reshape((-1, width))
+
+
+def _material_reference(material):
+    """Get a reference to a document material (or None)."""
+    try:
+        return {"document": material.Document.Name, "name": material.Name}
+    except AttributeError:
+        return None
+
+
+def _resolve_material(reference, label):
+    """Resolve a reference to a document material."""
+    if reference is None:
+        return None
+    try:
+        doc = App.getDocument(reference["document"])
+    except NameError:
+        doc = None
+    material = doc.getObject(reference["name"]) if doc else None
+    if material is None:
+        msg = f"Material '{reference['name']}' not found - Using default"
+        warn("SceneIR", label, msg)
+    return material
+
+
+def _encode_specifics(specifics):
+    """Encode renderer specifics, skipping unsupported values."""
+    res = {}
+    for key, value in specifics.items():
+        try:
+            res[key] = _encode(value)
+        except SceneIRError:
+            debug("SceneIR", key, "Unsupported specific value - Skipping")
+    return res
+
+
+def _decode_specifics(specifics):
+    """Decode renderer specifics."""
+    return {k: _decode(v) for k, v in specifics.items()}
+
+
+def _encode(value):
+    """Encode a value into a JSON-compatible object."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, App.Units.Quantity):
+        return float(value.Value)
+    if isinstance(value, App.Vector):
+        return {"$": "Vector", "v": list(value)}
+    if isinstance(value, App.Placement):
+        return {"$": "Placement", "v": list(value.Matrix.A)}
+    if isinstance(value, RGB):
+        return {"$": "RGB", "v": list(value.to_srgb())}
+    if isinstance(value, tuple):
+        return {"$": "tuple", "v": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    raise SceneIRError(f"Cannot encode value of type '{type(value)}'")
+
+
+def _decode(value):
+    """Decode a value encoded by `_encode`."""
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    tag, data = value["$"], value["v"]
+    if tag == "Vector":
+        return App.Vector(*data)
+    if tag == "Placement":
+        return App.Placement(App.Matrix(*data))
+    if tag == "RGB":
+        return RGB(data)
+    if tag == "tuple":
+        return tuple(_decode(v) for v in data)
+    raise SceneIRError(f"Unknown tag '{tag}'")
+
+
+class SceneIRError(Exception):
+    """Exception raised on scene IR errors."""
@@ -0,0 +1,402 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""This module implements a scene complexity report for rendering projects.
+
+The report is computed from the views that would be exported (see
+Project.scene_report), without meshing nor writing any file:
+- triangle counts are estimated by the triangle budget model (see budget)
+- geometry is counted as unique or instanced (App::Link and link arrays)
+- textures are listed with their pixel dimensions (read from file headers)
+  and an estimate of their decoded memory
+- materials and lights are listed
+
+The report is a JSON-compatible dictionary, which can be formatted as a
+table sorted by any column.
+"""
+
+import os
+import struct
+import collections
+
+from Render.budget import TriangleBudget
+from Render.rdrhandler import RenderingTypes
+from Render.rendermaterial import is_multimat, is_valid_material
+from Render.utils import getproxyattr
+
+# Decoded size of a pixel, in bytes (RGBA, 8 bits or 32 bits float)
+LDR_PIXEL_SIZE = 4
+HDR_PIXEL_SIZE = 16
+HDR_EXTENSIONS = (".hdr", ".exr", ".pfm", ".tif", ".tiff")
+
+# Sort keys for the objects table
+SORT_KEYS = ("triangles", "unique_triangles", "instances", "label", "type")
+
+LIGHT_TYPES = {
+    RenderingTypes.POINTLIGHT: "PointLight",
+    RenderingTypes.AREALIGHT: "AreaLight",
+    RenderingTypes.SUNSKYLIGHT: "SunskyLight",
+    RenderingTypes.IMAGELIGHT: "ImageLight",
+    RenderingTypes.DISTANTLIGHT: "DistantLight",
+}
+
+
+def build_scene_report(views, linear_deflection, angular_deflection):
+    """Build a scene complexity report.
+
+    Args:
+        views -- the views to export (list)
+        linear_deflection -- the nominal linear deflection (float)
+        angular_deflection -- the nominal angular deflection (float)
+
+    Returns:
+        The report (dict)
+    """
+    estimator = TriangleBudget(0, linear_deflection, angular_deflection)
+    objects = []
+    lights = []
+    cameras = []
+    materials = {}
+    geometries = collections.Counter()
+    geometry_triangles = {}
+
+    for view in views:
+        source = view.Source
+        name = str(getattr(source, "FullName", getattr(source, "Name", "")))
+        label = str(getattr(source, "Label", name))
+
+        # Render objects: lights and cameras
+        rendering_type = getproxyattr(source, "RENDERING_TYPE", None)
+        if rendering_type == RenderingTypes.CAMERA:
+            cameras.append({"name": name, "label": label})
+            continue
+        if rendering_type in LIGHT_TYPES:
+            light = {
+                "name": name,
+                "label": label,
+                "type": LIGHT_TYPES[rendering_type],
+            }
+            if image := getattr(source, "ImageFile", None):
+                light["image"] = _image_info(image)
+            lights.append(light)
+            continue
+        if getproxyattr(source, "type", None) == "PointLight":
+            lights.append({"name": name, "label": label, "type": "ArchLight"})
+            continue
+
+        # Geometry
+        geometry, instances = _get_geometry(source)
+        estimate = estimator.estimate_view(_GeometryView(geometry, view))
+        unique_triangles = (
+            int(estimate.fixed + estimate.scalable) if estimate else 0
+        )
+        geometry_key = str(getattr(geometry, "FullName", name))
+        geometries[geometry_key] += instances
+        geometry_triangles[geometry_key] = unique_triangles
+
+        # Material
+        material = getattr(view, "Material", None)
+        material_name = _add_material(materials, material)
+
+        objects.append(
+            {
+                "name": name,
+                "label": label,
+                "type": str(getattr(source, "TypeId", "")),
+                "geometry": str(getattr(geometry, "Label", label)),
+                "instances": instances,
+                "unique_triangles": unique_triangles,
+                "triangles": unique_triangles * instances,
+                "material": material_name,
+            }
+        )
+
+    # Textures
+    textures = [
+        dict(texture, material=m["label"])
+        for m in materials.values()
+        for texture in m.pop("_textures")
+    ]
+
+    summary = {
+        "objects": len(objects),
+        "triangles": sum(o["triangles"] for o in objects),
+        "unique_geometries": len(geometries),
+        "unique_triangles": sum(geometry_triangles.values()),
+        "instances": sum(geometries.values()),
+        "instanced_geometries": sum(1 for c in geometries.values() if c > 1),
+        "materials": len(materials),
+        "textures": len(textures),
+        "texture_memory": sum(t["memory"] or 0 for t in textures),
+        "lights": len(lights),
+        "cameras": len(cameras),
+    }
+
+    return {
+        "summary": summary,
+        "objects": objects,
+        "materials": list(materials.values()),
+        "textures": textures,
+        "lights": lights,
+        "cameras": cameras,
+    }
+
+
+def sort_objects(report, key="triangles"):
+    """Sort the objects of a report (in place).
+
+    Numeric columns are sorted in descending order, text columns in
+    ascending order.
+
+    Args:
+        report -- the report (dict, see `build_scene_report`)
+        key -- the column to sort by (str, see SORT_KEYS)
+    """
+    if key not in SORT_KEYS:
+        raise ValueError(f"Invalid sort key '{key}' (expected {SORT_KEYS})")
+    numeric = key not in ("label", "type")
+    report["objects"].sort(key=lambda o: o[key], reverse=numeric)
+
+
+def format_scene_report(report, key="triangles", top=None):
+    """Format a scene report as tables (str).
+
+    Args:
+        report -- the report (dict, see `build_scene_report`)
+        key -- the column to sort objects by (str, see SORT_KEYS)
+        top -- the maximum number of objects to list (int, default: all)
+    """
+    sort_objects(report, key)
+    lines = ["[Render][Report] Summary"]
+    for name, value in report["summary"].items():
+        if name == "texture_memory":
+            value = _format_bytes(value)
+        lines.append(f"  {name:<24} {value}")
+
+    lines.append(f"[Render][Report] Objects (by {key})")
+    lines.append(
+        f"  {'label':<32} {'triangles':>12} {'unique':>12} {'inst.':>6}  "
+        "material"
+    )
+    for obj in report["objects"][:top]:
+        lines.append(
+            f"  {obj['label'][:32]:<32} {obj['triangles']:>12} "
+            f"{obj['unique_triangles']:>12} {obj['instances']:>6}  "
+            f"{obj['material'] or '-'}"
+        )
+
+    lines.append("[Render][Report] Textures (by decoded memory)")
+    lines.append(f"  {'image':<40} {'size':>11} {'memory':>10}  material")
+    textures = sorted(
+        report["textures"], key=lambda t: t["memory"] or 0, reverse=True
+    )
+    for tex in textures:
+        size = f"{tex['width']}x{tex['height']}" if tex["width"] else "unknown"
+        lines.append(
+            f"  {os.path.basename(tex['path'])[:40]:<40} {size:>11} "
+            f"{_format_bytes(tex['memory']):>10}  {tex['material']}"
+        )
+
+    lines.append("[Render][Report] Materials")
+    for mat in report["materials"]:
+        lines.append(
+            f"  {mat['label'][:32]:<32} {mat['type']:<14} "
+            f"{mat['objects']:>4} object(s)"
+        )
+
+    lines.append("[Render][Report] Lights")
+    for light in report["lights"]:
+        lines.append(f"  {light['label'][:32]:<32} {light['type']}")
+    return "\n".join(lines) + "\n"
+
+
+# ===========================================================================
+#                                  Helpers
+# ===========================================================================
+
+
+class _GeometryView:
+    """A ducktyping view, on the geometry of a view (for estimation)."""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, geometry, view):
+        """Initialize view."""
+        self.Source = geometry  # pylint: disable=invalid-name
+        self.Decimate = getattr(view, "Decimate", False)
+        self.DecimationTarget = getattr(view, "DecimationTarget", 0)
+
+
+def _get_geometry(source):
+    """Get the geometry of a view source, and its number of instances.
+
+    Links are resolved to their (recursively) linked object. Link arrays
+    count one instance per visible element.
+
+    Returns:
+        A tuple (geometry object, number of instances)
+    """
+    if not source.isDerivedFrom("App::Link"):
+        return source, 1
+    geometry = source.getLinkedObject(True)
+    count = getattr(source, "ElementCount", 0)
+    if count:
+        visibility = getattr(source, "VisibilityList", None)
+        instances = sum(visibility) if visibility else count
+    else:
+        instances = 1
+    return geometry, instances
+
+
+def _add_material(materials, material):
+    """Add a material (and its submaterials) to the report materials.
+
+    Returns:
+        The label of the material (str), or None
+    """
+    if material is None:
+        return None
+    key = str(getattr(material, "FullName", material.Name))
+    if key in materials:
+        materials[key]["objects"] += 1
+        return materials[key]["label"]
+
+    if is_multimat(material):
+        mat_type = "MultiMaterial"
+        textures = []
+        for submaterial in material.Materials:
+            _add_material(materials, submaterial)
+    elif is_valid_material(material):
+        mat_type = "Material"
+        textures = _get_textures(material)
+    else:
+        mat_type = "Unknown"
+        textures = []
+
+    materials[key] = {
+        "name": key,
+        "label": str(material.Label),
+        "type": mat_type,
+        "objects": 1,
+        "textures": len(textures),
+        "_textures": textures,
+    }
+    return materials[key]["label"]
+
+
+def _get_textures(material):
+    """Get the texture images of a material, with their dimensions."""
+    try:
+        if not material.Proxy.has_textures():
+            return []
+        images = [
+            (texture, image)
+            for texture in material.Proxy.get_textures()
+            for image in texture.Proxy.get_images()
+        ]
+    except AttributeError:
+        return []
+    res = []
+    for texture, image in images:
+        info = _image_info(texture.getPropertyByName(image.image))
+        info["texture"] = str(texture.Label)
+        info["image"] = str(image.image)
+        res.append(info)
+    return res
+
+
+def _image_info(path):
+    """Get the dimensions and the decoded memory of an image file."""
+    path = str(path)
+    width, height = get_image_size(path) or (0, 0)
+    _, ext = os.path.splitext(path)
+    pixel_size = (
+        HDR_PIXEL_SIZE if ext.lower() in HDR_EXTENSIONS else LDR_PIXEL_SIZE
+    )
+    return {
+        "path": path,
+        "width": width,
+        "height": height,
+        "memory": width * height * pixel_size if width else None,
+    }
+
+
+def get_image_size(path):
+    """Get the pixel dimensions of an image, without decoding it.
+
+    PNG, JPEG and Radiance HDR headers are parsed directly. Other formats
+    are read with Qt image reader, if available.
+
+    Returns:
+        A tuple (width, height), or None if dimensions cannot be read
+    """
+    try:
+        with open(path, "rb") as fobj:
+            header = fobj.read(64 * 1024)
+    except OSError:
+        return None
+
+    # PNG
+    if header.startswith(b"\x89PNG\r\n\x1a\n") and len(header) >= 24:
+        return struct.unpack(">II", header[16:24])
+
+    # JPEG (start of frame marker)
+    if header.startswith(b"\xff\xd8"):
+        pos = 2
+        while pos + 9 < len(header):
+            if header[pos] != 0xFF:
+                break
+            marker = header[pos + 1]
+            (length,) = struct.unpack(">H", header[pos + 2 : pos + 4])
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", header[pos + 5 : pos + 9])
+                return width, height
+            pos += 2 + length
+
+    # Radiance HDR (resolution line: '-Y <height> +X <width>')
+    if header.startswith((b"#?RADIANCE", b"#?RGBE")):
+        for line in header.split(b"\n")[1:]:
+            fields = line.split()
+            if len(fields) == 4 and fields[0] in (b"-Y", b"+Y"):
+                return int(fields[3]), int(fields[1])
+
+    # Other formats
+    try:
+        # pylint: disable=import-outside-toplevel
+        from PySide.QtGui import QImageReader
+    except ImportError:
+        return None
+    size = QImageReader(path).size()
+    if not size.isValid():
+        return None
+    return size.width(), size.height()
+
+
+def _format_bytes(value):
+    """Format a number of bytes (str)."""
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value} B"
+        value /= 1024
+    return str(value)
@@ -0,0 +1,152 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements cost-aware scheduling of object exports.
+
+Objects are exported in parallel, so that the export wall time is bounded
+below by the export time of the heaviest object: if a giant object is
+submitted last, it sets the total time. To avoid that, the export cost of
+each view is estimated before dispatch, and views are submitted heaviest
+first (longest processing time first). Workers pull views one at a time
+from the shared submission queue, so that lighter views fill the gaps.
+
+Cost estimation, by order of preference:
+- the export time of the view at a previous export in the session
+- the number of triangles estimated by the triangle budget, if any
+- a heuristic, based on facet count (meshes) or face count (shapes)
+
+Heuristic costs are converted into seconds with a rate fitted on the views
+that have a previous timing.
+"""
+
+import collections
+import statistics
+import threading
+import time
+
+from Render.tracing import span
+
+# Default conversion rate from heuristic cost to seconds
+DEFAULT_RATE = 1e-5
+
+# Heuristic weights (in triangles)
+FACE_WEIGHT = 50
+TERRAIN_WEIGHT = 1e6
+
+# Session cache of export timings, by view source name
+_TIMINGS = {}
+_TIMINGS_LOCK = threading.Lock()
+
+Job = collections.namedtuple("Job", "view name cost")
+
+
+class ExportScheduler:
+    """A longest-job-first scheduler for view exports."""
+
+    def __init__(self, views, triangle_budget=None):
+        """Initialize scheduler.
+
+        Args:
+            views -- the views to export (iterable)
+            triangle_budget -- a triangle budget holding triangle estimates
+                (budget.TriangleBudget, optional)
+        """
+        self.triangle_budget = triangle_budget
+        jobs = [(v, _get_name(v), self._heuristic(v)) for v in views]
+
+        # Fit conversion rate on views with a timing
+        with _TIMINGS_LOCK:
+            timings = dict(_TIMINGS)
+        ratios = [
+            timings[name] / heuristic
+            for _, name, heuristic in jobs
+            if name in timings and heuristic > 0
+        ]
+        self.rate = statistics.median(ratios) if ratios else DEFAULT_RATE
+
+        self.jobs = [
+            Job(view, name, timings.get(name, heuristic * self.rate))
+            for view, name, heuristic in jobs
+        ]
+        self.jobs.sort(key=lambda j: j.cost, reverse=True)
+
+    def __iter__(self):
+        """Iterate over jobs, heaviest first."""
+        return iter(self.jobs)
+
+    def __len__(self):
+        """Get the number of jobs."""
+        return len(self.jobs)
+
+    @property
+    def estimated_cost(self):
+        """Get the total estimated cost, in seconds (float)."""
+        return sum(j.cost for j in self.jobs)
+
+    @staticmethod
+    def timed(job, func):
+        """Run an export function on a job, and record its timing.
+
+        Args:
+            job -- the job to run (Job)
+            func -- the export function, taking a view as argument
+
+        Returns:
+            The result of the export function
+        """
+        tm0 = time.perf_counter()
+        with span(job.name, "view", estimated_cost=job.cost):
+            result = func(job.view)
+        duration = time.perf_counter() - tm0
+        with _TIMINGS_LOCK:
+            _TIMINGS[job.name] = duration
+        return result
+
+    def _heuristic(self, view):
+        """Compute the heuristic cost of a view (in triangles)."""
+        source = view.Source
+        budget = self.triangle_budget
+        if budget is not None:
+            estimate = budget.estimates.get(_get_name(view))
+            if estimate is not None:
+                return estimate.fixed + estimate.scalable / budget.factor
+
+        if hasattr(source, "Terrain"):
+            return TERRAIN_WEIGHT
+        try:
+            if source.isDerivedFrom("Mesh::Feature"):
+                return source.Mesh.CountFacets
+        except AttributeError:
+            pass
+        try:
+            return len(source.Shape.Faces) * FACE_WEIGHT
+        except AttributeError:
+            # Lights, cameras...
+            return 0
+
+
+def _get_name(view):
+    """Get the name of a view for timing purpose."""
+    try:
+        return str(view.Source.FullName)
+    except AttributeError:
+        return str(id(view))
@@ -0,0 +1,190 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements process-parallel tessellation of shapes.
+
+Tessellation (MeshPart.meshFromShape) mostly holds the GIL, so that exporting
+objects in threads hardly uses more than one core. Parallel tessellation
+splits export in two phases:
+- a recording pass, in main thread, runs the renderables machinery without
+  meshing: shapes to be meshed are snapshotted as BREP strings, with their
+  deflections
+- snapshotted shapes are tessellated in worker processes, which write the
+  meshes to files and send back their metadata only
+
+Then, during the regular export, the mesher loads the pre-tessellated meshes
+instead of tessellating the shapes. Uv mapping, autosmooth and renderer
+formatting are left to the regular export. Shapes that could not be
+tessellated by the workers are meshed in the regular way.
+"""
+
+import os
+import uuid
+import time
+import threading
+import concurrent.futures
+
+import FreeCAD as App
+import Mesh
+
+from Render.constants import PKGDIR
+from Render.utils import debug
+from Render.workerpool import get_worker_pool
+
+TESSELLATE_SCRIPT = os.path.join(PKGDIR, "rendermesh_mp", "tessellate.py")
+POOL_NAME = "tessellation"
+# Tessellation is made in one go, with no progress to report: the timeout is
+# for the whole job (in seconds)
+TIMEOUT = 600.0
+SUBDIR = "tessellation"
+
+
+class ParallelTessellation:
+    """A set of shapes to tessellate in worker processes.
+
+    Shapes are identified by the name that renderables pass to the mesher.
+    """
+
+    def __init__(self, python, directory):
+        """Initialize tessellation.
+
+        Args:
+            python -- the Python executable to run workers with (str)
+            directory -- the directory where the meshes are to be written
+                (str)
+        """
+        self.python = python
+        self.directory = os.path.join(directory, SUBDIR)
+        self.recording = True
+        self._jobs = {}
+        self._meshes = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, shape, linear_deflection, angular_deflection):
+        """Record a shape to tessellate.
+
+        The shape placement is not recorded: it is up to the mesher to place
+        the mesh, like for a mesh tessellated in the regular way.
+
+        Args:
+            name -- the name of the shape (str)
+            shape -- the shape to tessellate (Part.Shape)
+            linear_deflection -- the linear deflection (float)
+            angular_deflection -- the angular deflection (float)
+        """
+        shape = shape.copy()
+        shape.Placement = App.Base.Placement()
+        self._jobs[name] = (
+            shape.exportBrepToString(),
+            float(linear_deflection),
+            float(angular_deflection),
+        )
+
+    def run(self):
+        """Tessellate the recorded shapes in worker processes.
+
+        This method blocks until all the shapes have been tessellated, and
+        ends recording.
+        """
+        self.recording = False
+        jobs, self._jobs = self._jobs, {}
+        if not jobs:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        pool = get_worker_pool(
+            self.python, POOL_NAME, os.cpu_count() or 1, TIMEOUT
+        )
+
+        def tessellate(item):
+            name, (brep, linear_deflection, angular_deflection) = item
+            outfile = os.path.join(self.directory, f"{uuid.uuid1()}.bms")
+            results = []
+            init_globals = {
+                "BREP": brep,
+                "LINEAR_DEFLECTION": linear_deflection,
+                "ANGULAR_DEFLECTION": angular_deflection,
+                "OUTFILE": outfile,
+            }
+            success = pool.run(
+                TESSELLATE_SCRIPT, init_globals, name, results.append
+            )
+            if success and results:
+                points, facets, duration = results[0]
+                msg = (
+                    f"Tessellated in worker ({points} points, {facets} "
+                    f"facets, {duration:.3f}s)"
+                )
+                debug("Object", name, msg)
+                with self._lock:
+                    self._meshes[name] = outfile
+            return success
+
+        tm0 = time.time()
+        with concurrent.futures.ThreadPoolExecutor(pool.size) as executor:
+            succeeded = sum(executor.map(tessellate, jobs.items()))
+        msg = (
+            f"[Render][Tessellation] {succeeded}/{len(jobs)} shape(s) "
+            f"tessellated in {pool.size} process(es) - "
+            f"Time: {time.time() - tm0:.3f}s\n"
+        )
+        App.Console.PrintMessage(msg)
+
+    def get(self, name):
+        """Get the pre-tessellated mesh of a shape (thread-safe).
+
+        A mesh can be got only once: the mesh file is removed afterwards.
+
+        Args:
+            name -- the name of the shape (str)
+
+        Returns:
+            The mesh (Mesh.Mesh, without placement), or None if the shape has
+            not been tessellated
+        """
+        with self._lock:
+            path = self._meshes.pop(name, None)
+        if path is None:
+            return None
+        try:
+            mesh = Mesh.Mesh(path)
+        except Exception:  # pylint: disable=broad-exception-caught
+            debug("Object", name, "Cannot read pre-tessellated mesh")
+            return None
+        finally:
+            _remove(path)
+        return mesh
+
+    def clear(self):
+        """Remove unused mesh files."""
+        with self._lock:
+            paths = list(self._meshes.values())
+            self._meshes.clear()
+        for path in paths:
+            _remove(path)
+
+
+def _remove(path):
+    """Remove a file, ignoring errors."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,237 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""This module implements a lightweight tracer for exports.
+
+Spans (project, view, renderable, stage...) are recorded as complete events
+and saved in Chrome trace format, to be viewed in chrome://tracing or
+https://ui.perfetto.dev. Events from worker processes (see workerpool) are
+merged into the trace.
+
+Tracing is enabled by 'Trace' parameter (see utils.set_trace). Spans are
+also fed to other recorders, like the memory profiler (see memcheck). When
+no recorder is active, spans cost almost nothing.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+# The active recorders (see `add_recorder`)
+_RECORDERS = ()
+
+
+class Tracer:
+    """A collector of trace events (thread-safe)."""
+
+    def __init__(self):
+        """Initialize tracer."""
+        self.events = []
+        self._lock = threading.Lock()
+        self._pids = set()
+        self._tids = set()
+        self._add_process(os.getpid(), "FreeCAD")
+
+    def add(self, name, cat, start, end, args=None):
+        """Add a complete event for current thread.
+
+        Args:
+            name -- the name of the event (str)
+            cat -- the category of the event (str)
+            start -- the start time of the event (float, time.time())
+            end -- the end time of the event (float, time.time())
+            args -- additional data for the event (dict, optional)
+        """
+        pid, tid = os.getpid(), threading.get_ident()
+        event = complete_event(name, cat, start, end, pid, tid, args)
+        with self._lock:
+            if tid not in self._tids:
+                self._tids.add(tid)
+                thread_name = threading.current_thread().name
+                self.events.append(
+                    _metadata("thread_name", pid, tid, thread_name)
+                )
+            self.events.append(event)
+
+    def add_events(self, events, process_name="Render worker"):
+        """Add events recorded by another process.
+
+        Args:
+            events -- the events (list of dict, see `complete_event`)
+            process_name -- the name to display for unknown processes
+        """
+        for event in events:
+            self._add_process(event["pid"], f"{process_name} {event['pid']}")
+        with self._lock:
+            self.events.extend(events)
+
+    @contextlib.contextmanager
+    def span(self, name, cat="stage", **args):
+        """Record the execution of a block as an event."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, cat, start, time.time(), args)
+
+    def save(self, path):
+        """Save trace in Chrome trace format.
+
+        Args:
+            path -- the path of the trace file (str)
+
+        Returns:
+            The path of the trace file (str)
+        """
+        with self._lock:
+            trace = {
+                "traceEvents": list(self.events),
+                "displayTimeUnit": "ms",
+            }
+        with open(path, "w", encoding="utf-8") as fobj:
+            json.dump(trace, fobj)
+        return path
+
+    def _add_process(self, pid, name):
+        """Name a process, if not already named."""
+        with self._lock:
+            if pid in self._pids:
+                return
+            self._pids.add(pid)
+            self.events.append(_metadata("process_name", pid, 0, name))
+
+
+def complete_event(name, cat, start, end, pid, tid, args=None):
+    """Build a complete event ('X'), in Chrome trace format.
+
+    Times are given in seconds since epoch (time.time()), so that events
+    from several processes can be merged.
+    """
+    event = {
+        "name": str(name),
+        "cat": str(cat),
+        "ph": "X",
+        "ts": start * 1e6,
+        "dur": max(end - start, 0.0) * 1e6,
+        "pid": pid,
+        "tid": tid,
+    }
+    if args:
+        event["args"] = {k: _jsonable(v) for k, v in args.items()}
+    return event
+
+
+def _metadata(kind, pid, tid, name):
+    """Build a metadata event ('M'), in Chrome trace format."""
+    return {
+        "name": kind,
+        "ph": "M",
+        "pid": pid,
+        "tid": tid,
+        "args": {"name": str(name)},
+    }
+
+
+def _jsonable(value):
+    """Convert an event argument into a JSON-compatible value."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+# ===========================================================================
+#                             Active recorders
+# ===========================================================================
+
+# Recorders are objects with `span` and `add_events` methods, like Tracer or
+# memcheck.MemoryProfiler. Spans are recorded by all active recorders.
+
+
+def add_recorder(recorder):
+    """Activate a recorder."""
+    global _RECORDERS  # pylint: disable=global-statement
+    _RECORDERS += (recorder,)
+
+
+def remove_recorder(recorder):
+    """Deactivate a recorder (if active)."""
+    global _RECORDERS  # pylint: disable=global-statement
+    _RECORDERS = tuple(r for r in _RECORDERS if r is not recorder)
+
+
+def start_tracing():
+    """Start tracing, with a new tracer.
+
+    Returns:
+        The active tracer (Tracer)
+    """
+    stop_tracing()
+    tracer = Tracer()
+    add_recorder(tracer)
+    return tracer
+
+
+def stop_tracing():
+    """Stop tracing.
+
+    Returns:
+        The tracer that was active (Tracer), or None
+    """
+    tracer = next((r for r in _RECORDERS if isinstance(r, Tracer)), None)
+    remove_recorder(tracer)
+    return tracer
+
+
+def is_tracing():
+    """Check whether tracing is on."""
+    return any(isinstance(r, Tracer) for r in _RECORDERS)
+
+
+def span(name, cat="stage", **args):
+    """Get a context manager recording a span, if any recorder is active.
+
+    Args:
+        name -- the name of the span (str)
+        cat -- the category of the span (str): 'project', 'view',
+            'renderable', 'stage'...
+        args -- additional data for the span
+    """
+    recorders = _RECORDERS
+    if not recorders:
+        return contextlib.nullcontext()
+    if len(recorders) == 1:
+        return recorders[0].span(name, cat, **args)
+    stack = contextlib.ExitStack()
+    for recorder in recorders:
+        stack.enter_context(recorder.span(name, cat, **args))
+    return stack
+
+
+def add_events(events):
+    """Add events from a worker process to the active recorders, if any."""
+    if not events:
+        return
+    for recorder in _RECORDERS:
+        recorder.add_events(events)
@@ -286,6 +286,14 @@ def reload(module_name=None):
             "Render.subcontainer",
             "Render.prefpage",
             "Render.groundplane",
+            "Render.budget",
+            "Render.pruning",
+            "Render.sceneir",
+            "Render.scenereport",
+            "Render.tessellation",
+            "Render.scheduling",
+            "Render.filewriter",
+            "Render.calibration",
             "Render.virtualenv",
             "Render.renderers.Appleseed",
             "Render.renderers.Cycles",
@@ -376,6 +384,9 @@ set_debug_off = functools.partial(set_debug, state=False)
 def set_memcheck(state):
     """Set memory checking parameter on/off.
 
+    When on, memory peaks are reported by export stage and by object, at
+    each rendering (see memcheck module).
+
     Warning: debug purpose only. /!\\
 
     Args:
@@ -396,6 +407,32 @@ set_memcheck_on = functools.partial(set_memcheck, state=True)
 set_memcheck_off = functools.partial(set_memcheck, state=False)
 
 
+def set_trace(state):
+    """Set export tracing parameter on/off.
+
+    When on, a trace of the export (Chrome trace format) is written next to
+    the scene file, at each rendering.
+
+    Warning: debug purpose only. /!\\
+
+    Args:
+        state -- state to set tracing (boolean)
+    """
+    params = App.ParamGet("User parameter:BaseApp/Preferences/Mod/Render")
+    state = bool(state)
+    params.SetBool("Trace", state)
+    msg = (
+        "[Render][Debug] Trace is on\n"
+        if state
+        else "[Render][Debug] Trace is off\n"
+    )
+    App.Console.PrintMessage(msg)
+
+
+set_trace_on = functools.partial(set_trace, state=True)
+set_trace_off = functools.partial(set_trace, state=False)
+
+
 def last_cmd():
     """Return last executed renderer command (debug purpose)."""
     params = App.ParamGet("User parameter:BaseApp/Preferences/Mod/Render")
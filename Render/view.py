@@ -150,6 +150,54 @@ class View(FeatureBase):
             False,
             0,
         ),
+        "Decimate": Prop(
+            "App::PropertyBool",
+            "Decimation",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Enable mesh decimation (quadric-error edge collapse), to "
+                "reduce heavy meshes (scans, imported meshes...). Boundaries "
+                "are preserved, and creases if a crease angle is set. "
+                "Requires Numpy.",
+            ),
+            False,
+            0,
+        ),
+        "DecimationTarget": Prop(
+            "App::PropertyInteger",
+            "Decimation",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Target number of triangles per mesh for decimation "
+                "(0 = no target: decimate up to maximum error)",
+            ),
+            100000,
+            0,
+        ),
+        "DecimationMaxError": Prop(
+            "App::PropertyLength",
+            "Decimation",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Maximum geometric error allowed by decimation, as a root "
+                "mean square distance to the original surface "
+                "(0 = unbounded)",
+            ),
+            0,
+            0,
+        ),
+        "DecimationCreaseAngle": Prop(
+            "App::PropertyAngle",
+            "Decimation",
+            QT_TRANSLATE_NOOP(
+                "App::Property",
+                "Edges where the angle between the faces is larger than "
+                "this angle are creases, that decimation tries to preserve "
+                "(0 = no crease detection, for noisy meshes like scans)",
+            ),
+            0,
+            0,
+        ),
         "ForceMeshing": Prop(
             "App::PropertyBool",
             "Advanced",
@@ -0,0 +1,320 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""This module implements a pool of long-lived worker processes.
+
+Workers run RenderMesh multiprocessing scripts (see rendermesh_mp) on
+request. They are started once per session, on demand, and stopped at
+shutdown.
+
+Arrays in script globals are handed to workers by the names of their shared
+memory blocks (see rendermesh_mp/sharedmem.py), so that workers read and
+write them in place; other arrays are copied into temporary blocks, and
+copied back when the job is over.
+
+While a job is running, the worker sends heartbeats, with the progress of
+the job (the number of chunks done). A worker is deemed hung if it does not
+give any news for HEARTBEAT_TIMEOUT seconds, or if its job does not progress
+for 'progress_timeout' seconds (for instance, if a script is deadlocked).
+"""
+
+import atexit
+import collections
+import ctypes
+import os
+import queue
+import runpy
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import connection
+
+from Render.constants import PKGDIR
+from Render.rendermesh_mp import sharedmem
+from Render.tracing import add_events
+from Render.utils import debug, warn
+
+# Maximum number of workers (each worker runs its own pool of processes)
+POOL_SIZE = 4
+
+# Heartbeat (in seconds)
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 30.0
+HEARTBEAT_LOG_INTERVAL = 10.0
+
+# Maximum duration without progress for a job (in seconds)
+PROGRESS_TIMEOUT = 60.0
+
+HOST_SCRIPT = os.path.join(PKGDIR, "rendermesh_mp", "host.py")
+
+Worker = collections.namedtuple("Worker", "process connection")
+
+
+class WorkerPool:
+    """A pool of long-lived worker processes (thread-safe)."""
+
+    def __init__(self, python, size=POOL_SIZE, progress_timeout=None):
+        """Initialize pool.
+
+        Workers are started on demand.
+
+        Args:
+            python -- the Python executable to run workers with (str)
+            size -- the maximum number of workers (int)
+            progress_timeout -- the maximum duration without progress for a
+                job, in seconds (float, default: PROGRESS_TIMEOUT)
+        """
+        self.python = python
+        self.size = int(size)
+        self.progress_timeout = progress_timeout or PROGRESS_TIMEOUT
+        self._workers = []
+        self._idle = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+    def run(self, path, init_globals, name="", on_result=None):
+        """Run a script in a worker.
+
+        This method blocks until the job is over.
+
+        Args:
+            path -- the path of the script to run (str)
+            init_globals -- the globals of the script (dict). Arrays and
+                RawValues are updated with job outputs.
+            name -- the name of the object being processed, for logging
+            on_result -- a callback for objects sent by the script on its
+                connection (optional). The script is sent 'terminate' after
+                the callback returns.
+
+        Returns:
+            True if the job succeeded, False otherwise
+        """
+        staged = []
+        try:
+            job_globals = {
+                k: _stage(v, staged)
+                for k, v in init_globals.items()
+                if k != "CONNECTION"
+            }
+            worker = self._acquire()
+            try:
+                worker.connection.send((path, job_globals))
+                outcome = self._wait(worker, name, on_result)
+            except (OSError, EOFError):
+                outcome = None
+            except BaseException:
+                self._discard(worker)
+                raise
+            if outcome is None:
+                # Worker lost (dead or hung)
+                self._discard(worker)
+                return False
+            self._idle.put(worker)
+
+            error, values, events = outcome
+            add_events(events)
+            if error:
+                warn("Object", name, f"Worker error:\n{error}")
+                return False
+
+            # Copy outputs back
+            for array, copy in staged:
+                ctypes.memmove(array, copy, ctypes.sizeof(array))
+            for key, value in values.items():
+                init_globals[key].value = value
+            return True
+        finally:
+            staged.clear()  # Release temporary blocks
+
+    def shutdown(self):
+        """Stop all workers."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.connection.close()
+
+    def _acquire(self):
+        """Get an idle worker, starting one if possible."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = self._start_worker()
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+    def _start_worker(self):
+        """Start a worker process."""
+        main_conn, sub_conn = connection.Pipe()
+        init_globals = {
+            "CONNECTION": sub_conn,
+            "HEARTBEAT_INTERVAL": HEARTBEAT_INTERVAL,
+        }
+        kwargs = {"init_globals": init_globals, "run_name": "__main__"}
+        mp.set_executable(self.python)
+        process = mp.Process(
+            target=runpy.run_path,
+            args=(HOST_SCRIPT,),
+            kwargs=kwargs,
+            name="render-worker",
+        )
+        process.start()
+        sub_conn.close()
+        return Worker(process, main_conn)
+
+    def _discard(self, worker):
+        """Stop and forget a worker."""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.process.terminate()
+        worker.process.join()
+        worker.connection.close()
+        # A new worker can be started: wake up a waiting thread, if any
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = self._start_worker()
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def _wait(self, worker, name, on_result):
+        """Wait for a job to be over, processing worker messages.
+
+        Returns:
+            A tuple (error, values, events), or None if the worker has been
+            lost
+        """
+        conn, sentinel = worker.connection, worker.process.sentinel
+        tm0 = last_log = last_progress = time.time()
+        progress = 0
+        while True:
+            ready = connection.wait([conn, sentinel], HEARTBEAT_TIMEOUT)
+            if not ready:
+                msg = f"Worker hung (no heartbeat for {HEARTBEAT_TIMEOUT}s)"
+                warn("Object", name, msg)
+                return None
+            if conn not in ready:
+                warn("Object", name, "Worker died")
+                return None
+
+            kind, *payload = conn.recv()
+            if kind == "heartbeat":
+                elapsed, new_progress = payload
+                if new_progress != progress:
+                    progress, last_progress = new_progress, time.time()
+                elif time.time() - last_progress > self.progress_timeout:
+                    timeout = self.progress_timeout
+                    msg = f"Worker hung (no progress for {timeout}s)"
+                    warn("Object", name, msg)
+                    return None
+                if time.time() - last_log >= HEARTBEAT_LOG_INTERVAL:
+                    last_log = time.time()
+                    msg = f"Working ({elapsed:.0f}s, {progress} chunks)"
+                    debug("Object", name, msg)
+            elif kind == "result":
+                if on_result is not None:
+                    on_result(payload[0])
+                conn.send("terminate")
+            elif kind == "done":
+                duration = time.time() - tm0
+                debug("Object", name, f"Worker job done ({duration:.3f}s)")
+                return tuple(payload)
+
+
+def _stage(value, staged):
+    """Stage a global value for transfer to a worker.
+
+    Arrays in shared memory are passed by the name of their block. Other
+    arrays are copied into temporary blocks (appended to 'staged', as
+    (array, copy)). RawValues are passed by value.
+    """
+    if isinstance(value, ctypes.Array):
+        # pylint: disable=protected-access
+        typecode = value._type_._type_
+        if sharedmem.block_name(value) is None:
+            copy = sharedmem.create_array(typecode, len(value))
+            ctypes.memmove(copy, value, ctypes.sizeof(value))
+            staged.append((value, copy))
+            value = copy
+        return {
+            "__shm__": sharedmem.block_name(value),
+            "typecode": typecode,
+            "length": len(value),
+        }
+    # pylint: disable=protected-access
+    if isinstance(value, ctypes._SimpleCData):
+        return {"__value__": type(value)._type_, "value": value.value}
+    return value
+
+
+# ===========================================================================
+#                              Session pool
+# ===========================================================================
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_worker_pool(
+    python, name="default", size=POOL_SIZE, progress_timeout=None
+):
+    """Get a session worker pool (created on first call).
+
+    Args:
+        python -- the Python executable to run workers with (str)
+        name -- the name of the pool (str). Pools are independent from each
+            other, which allows to size them according to their use.
+        size -- the maximum number of workers, at pool creation (int)
+        progress_timeout -- the maximum duration without progress for a
+            job, at pool creation (float, see WorkerPool)
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is not None and pool.python != python:
+            pool.shutdown()
+            pool = None
+        if pool is None:
+            pool = _POOLS[name] = WorkerPool(python, size, progress_timeout)
+        return pool
+
+
+def shutdown_worker_pool():
+    """Stop all session worker pools, if any."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown_worker_pool)
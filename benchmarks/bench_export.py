@@ -0,0 +1,625 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Benchmark the whole export path of a project, in FreeCAD.
+
+This benchmark builds synthetic documents (boxes, cylinders, Link arrays,
+multicolor parts and textured parts, with standard materials), and exports
+them with each renderer, in dry run mode (see utils.set_dryrun): the scene
+is exported, but renderers are not run and do not need to be installed.
+
+Time is recorded per export phase, from the spans of the export (see
+Render.tracing):
+- export -- the whole export of objects, for a renderer
+- tessellation -- shape tessellation
+- renderables -- renderables processing (including meshing, materials and
+  mesh writing)
+- meshing -- RenderMesh stages (setup, uv map, autosmooth...)
+- materials -- material computation
+- writing -- mesh file writing
+- template -- template instantiation and writing
+For each phase, 'wall' is the wall time (overlapping spans, from several
+threads, are counted once) and 'cumulated' the sum of span durations.
+The size of output files (template and mesh files) is recorded too.
+
+Unlike other benchmarks, it requires FreeCAD, and must be run in FreeCADCmd
+(arguments follow '--pass'):
+    FreeCADCmd benchmarks/bench_export.py --pass --scenes small medium \\
+        --renderers Cycles Povray --output results.json
+
+In console mode, objects colors are not available, so multicolor parts are
+exported as monocolor parts. Run the benchmark in FreeCAD GUI (Macro >
+Macros... or 'freecad benchmarks/bench_export.py --pass ...') to export them
+face by face.
+
+Render parameters are restored after the benchmark.
+"""
+
+import argparse
+import itertools
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+BENCHDIR = os.path.dirname(os.path.abspath(__file__))
+REPODIR = os.path.dirname(BENCHDIR)
+for path in (REPODIR, BENCHDIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# pylint: disable=wrong-import-position
+import common
+from common import log
+
+# Scenes: name -> object counts
+SCENES = {
+    "small": {
+        "boxes": 10,
+        "cylinders": 10,
+        "arrays": 2,
+        "array_size": 10,
+        "multicolor": 2,
+        "textured": 2,
+    },
+    "medium": {
+        "boxes": 100,
+        "cylinders": 100,
+        "arrays": 10,
+        "array_size": 50,
+        "multicolor": 10,
+        "textured": 10,
+    },
+    "large": {
+        "boxes": 1000,
+        "cylinders": 1000,
+        "arrays": 20,
+        "array_size": 200,
+        "multicolor": 50,
+        "textured": 50,
+    },
+}
+
+# Export phases: name -> predicate on trace events
+MESHING_STAGES = {"setup", "decimate", "uvmap", "autosmooth", "tspaces"}
+PHASES = {
+    "export": lambda e: e["cat"] == "export",
+    "tessellation": lambda e: e["name"]
+    in ("tessellate", "parallel tessellation"),
+    "renderables": lambda e: e["cat"] == "renderable",
+    "meshing": lambda e: e["cat"] == "stage" and e["name"] in MESHING_STAGES,
+    "materials": lambda e: e["name"] == "material",
+    "writing": lambda e: e["name"] == "write",
+    "template": lambda e: e["name"] == "template",
+}
+
+# Renderer executable parameters, set to a placeholder if empty, as the
+# rendering command cannot be built without executable
+EXECUTABLE_PARAMS = (
+    "AppleseedCliPath",
+    "AppleseedStudioPath",
+    "CyclesPath",
+    "LuxCorePath",
+    "LuxCoreConsolePath",
+    "OspPath",
+    "PbrtPath",
+    "PovRayPath",
+)
+
+PARAMS_PATH = "User parameter:BaseApp/Preferences/Mod/Render"
+TEXTURE_SIZE = 256
+SPACING = 30.0
+
+
+# ===========================================================================
+#                             Synthetic documents
+# ===========================================================================
+
+
+def build_document(name, counts, texture_path):
+    """Build a synthetic document.
+
+    Args:
+        name -- the name of the document (str)
+        counts -- the object counts (dict, see SCENES)
+        texture_path -- the path of the texture image (str)
+
+    Returns:
+        The document, and the objects to render, with their materials (list
+        of (object, material))
+    """
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    doc = App.newDocument(name)
+    App.setActiveDocument(doc.Name)
+    positions = _grid_positions()
+
+    def place(obj):
+        obj.Placement = App.Placement(next(positions), App.Rotation())
+        return obj
+
+    materials = {
+        shadertype: _make_material(doc, shadertype, shadertype, values)
+        for shadertype, values in (
+            ("Disney", {"BaseColor": "(0.8, 0.3, 0.1)"}),
+            ("Glass", {"Color": "(0.9, 0.9, 1.0)"}),
+            ("Diffuse", {"Color": "(0.2, 0.6, 0.2)"}),
+        )
+    }
+    textured = _make_material(doc, "Textured", "Diffuse", {})
+    texture = textured.Proxy.add_texture(texture_path)[1]
+    image = str((texture.Name, "Image"))
+    textured.Material = dict(
+        textured.Material,
+        **{"Render.Diffuse.Color": f"Texture;{image};(0.8, 0.8, 0.8)"},
+    )
+
+    objects = []
+
+    # Boxes and cylinders
+    for _ in range(counts["boxes"]):
+        box = place(doc.addObject("Part::Box", "Box"))
+        box.Length, box.Width, box.Height = 20.0, 15.0, 10.0
+        objects.append((box, materials["Disney"]))
+    for _ in range(counts["cylinders"]):
+        cylinder = place(doc.addObject("Part::Cylinder", "Cylinder"))
+        cylinder.Radius, cylinder.Height = 8.0, 20.0
+        objects.append((cylinder, materials["Glass"]))
+
+    # Link arrays (of a hidden sphere)
+    if counts["arrays"]:
+        base = doc.addObject("Part::Sphere", "ArrayBase")
+        base.Radius = 2.0
+        base.Visibility = False
+    for _ in range(counts["arrays"]):
+        array = place(doc.addObject("App::Link", "Array"))
+        array.LinkedObject = base
+        array.ElementCount = counts["array_size"]
+        array.PlacementList = [
+            App.Placement(App.Vector(5.0 * i, 0.0, 0.0), App.Rotation())
+            for i in range(counts["array_size"])
+        ]
+        objects.append((array, materials["Diffuse"]))
+
+    # Multicolor parts (colors need GUI)
+    for _ in range(counts["multicolor"]):
+        part = place(doc.addObject("Part::Box", "Multicolor"))
+        part.Length = part.Width = part.Height = 15.0
+        if part.ViewObject is not None:
+            part.ViewObject.DiffuseColor = [
+                (1.0, 0.0, 0.0, 0.0),
+                (0.0, 1.0, 0.0, 0.0),
+                (0.0, 0.0, 1.0, 0.0),
+                (1.0, 1.0, 0.0, 0.0),
+                (0.0, 1.0, 1.0, 0.0),
+                (1.0, 0.0, 1.0, 0.0),
+            ]
+        objects.append((part, None))
+
+    # Textured parts
+    for _ in range(counts["textured"]):
+        torus = place(doc.addObject("Part::Torus", "Textured"))
+        torus.Radius1, torus.Radius2 = 10.0, 3.0
+        objects.append((torus, textured))
+
+    doc.recompute()
+    return doc, objects
+
+
+def _make_material(doc, label, shadertype, values):
+    """Make a standard material."""
+    import Render  # pylint: disable=import-outside-toplevel
+
+    material = Render.make_material(name=label, doc=doc)
+    card = {"Name": material.Label, "Render.Type": shadertype}
+    card.update({f"Render.{shadertype}.{k}": v for k, v in values.items()})
+    material.Material = card
+    return material
+
+
+def _grid_positions():
+    """Generate object positions, on a grid (32 objects per row)."""
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    for index in itertools.count():
+        row, column = divmod(index, 32)
+        yield App.Vector(column * SPACING, row * SPACING, 0.0)
+
+
+def write_texture(path, size=TEXTURE_SIZE):
+    """Write a checkerboard texture, as a PNG file (no dependency)."""
+    rows = b"".join(
+        b"\x00"
+        + bytes(
+            255 if (i // 32 + j // 32) % 2 else 64
+            for j in range(size)
+            for _ in range(3)
+        )
+        for i in range(size)
+    )
+
+    def chunk(kind, data):
+        crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+        return (
+            struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+        )
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    with open(path, "wb") as fobj:
+        fobj.write(b"\x89PNG\r\n\x1a\n")
+        fobj.write(chunk(b"IHDR", header))
+        fobj.write(chunk(b"IDAT", zlib.compress(rows)))
+        fobj.write(chunk(b"IEND", b""))
+    return path
+
+
+# ===========================================================================
+#                                  Export
+# ===========================================================================
+
+
+def make_project(doc, renderer, objects):
+    """Make a project for a renderer, with views on objects.
+
+    Returns:
+        The project (Project)
+    """
+    # pylint: disable=import-outside-toplevel
+    import Render
+    from Render.constants import TEMPLATEDIR
+
+    pattern = re.compile(rf"{renderer.lower()}_standard\..*")
+    template = next(f for f in os.listdir(TEMPLATEDIR) if pattern.match(f))
+    project, fpo, _ = Render.Project.create(
+        doc, renderer=renderer, template=template
+    )
+    fpo.DelayedBuild = True
+    fpo.BatchMode = True
+    project.add_views(o for o, _ in objects)
+
+    materials = {o.Name: m for o, m in objects}
+    for view in project.all_views():
+        if (material := materials.get(view.Source.Name)) is not None:
+            view.Material = material
+    doc.recompute()
+    return project
+
+
+def export(project, renderer):
+    """Export a project, in dry run mode, and measure it.
+
+    Returns:
+        The measure (dict): total time, phases, output files
+    """
+    # pylint: disable=import-outside-toplevel
+    from Render import tracing
+
+    fpo = project.fpo
+    directory = os.path.normpath(fpo.Document.TransientDir)
+    object_directory = os.path.join(directory, fpo.Name)
+    _clear_directory(object_directory)
+
+    tracer = tracing.Tracer()
+    tracing.add_recorder(tracer)
+    try:
+        tm0 = time.perf_counter()
+        project.render(wait_for_completion=True, renderers=[renderer])
+        total = time.perf_counter() - tm0
+    finally:
+        tracing.remove_recorder(tracer)
+
+    template = os.path.splitext(fpo.Template)[1]
+    return {
+        "total": total,
+        "phases": get_phases(tracer.events),
+        "files": {
+            "template_bytes": _file_size(
+                os.path.join(directory, fpo.Name + template)
+            ),
+            **_directory_size(object_directory),
+        },
+    }
+
+
+def get_phases(events):
+    """Get phase durations from trace events (see PHASES).
+
+    Returns:
+        A dictionary phase -> {'count', 'wall', 'cumulated'} (seconds)
+    """
+    events = [e for e in events if e.get("ph") == "X"]
+    res = {}
+    for phase, predicate in PHASES.items():
+        intervals = sorted(
+            (e["ts"], e["ts"] + e["dur"]) for e in events if predicate(e)
+        )
+        res[phase] = {
+            "count": len(intervals),
+            "wall": _union_length(intervals) * 1e-6,
+            "cumulated": sum(e - s for s, e in intervals) * 1e-6,
+        }
+    return res
+
+
+def _union_length(intervals):
+    """Get the length of a union of sorted intervals."""
+    length, current_start, current_end = 0.0, None, None
+    for start, end in intervals:
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                length += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        length += current_end - current_start
+    return length
+
+
+def _file_size(path):
+    """Get the size of a file, or 0 if it does not exist."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _directory_size(directory):
+    """Get the number and size of the files of a directory."""
+    sizes = [
+        _file_size(os.path.join(root, f))
+        for root, _, files in os.walk(directory)
+        for f in files
+    ]
+    return {"mesh_files": len(sizes), "mesh_bytes": sum(sizes)}
+
+
+def _clear_directory(directory):
+    """Remove the files of a directory (previous export)."""
+    for root, _, files in os.walk(directory):
+        for name in files:
+            os.remove(os.path.join(root, name))
+
+
+# ===========================================================================
+#                                 Parameters
+# ===========================================================================
+
+
+def set_params(values):
+    """Set Render parameters.
+
+    Args:
+        values -- the parameters (list of (name, value))
+
+    Returns:
+        The previous state of the parameters, for `restore_params`
+    """
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    params = App.ParamGet(PARAMS_PATH)
+    previous = {name: (kind, value) for kind, name, value in _contents()}
+    saved = {name: previous.get(name) for name, _ in values}
+    for name, value in values:
+        setter = {
+            bool: params.SetBool,
+            int: params.SetInt,
+            float: params.SetFloat,
+            str: params.SetString,
+        }[type(value)]
+        setter(name, value)
+    return saved
+
+
+def restore_params(saved):
+    """Restore Render parameters (see `set_params`)."""
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    params = App.ParamGet(PARAMS_PATH)
+    current = {name: kind for kind, name, _ in _contents()}
+    for name, state in saved.items():
+        if state is None:
+            if (kind := current.get(name)) is not None:
+                getattr(params, f"Rem{_kind_name(kind)}")(name)
+            continue
+        kind, value = state
+        getattr(params, f"Set{_kind_name(kind)}")(name, value)
+
+
+def _contents():
+    """Get the contents of Render parameters."""
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    return App.ParamGet(PARAMS_PATH).GetContents() or []
+
+
+def _kind_name(kind):
+    """Get the name of a parameter kind, for Set/Rem methods."""
+    return {
+        "Boolean": "Bool",
+        "Integer": "Int",
+        "Unsigned Long": "Unsigned",
+    }.get(kind, kind)
+
+
+def export_params(args):
+    """Get the parameters to set for the benchmark."""
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    params = App.ParamGet(PARAMS_PATH)
+    values = [("DryRun", True), ("Trace", False), ("Memcheck", False)]
+    values += [
+        (name, "renderer")
+        for name in EXECUTABLE_PARAMS
+        if not params.GetString(name, "")
+    ]
+    return values + list(args.param)
+
+
+# ===========================================================================
+#                                   Main
+# ===========================================================================
+
+
+def benchmark(scenes, renderers, repeat, parallel):
+    """Run benchmark.
+
+    Returns:
+        The results (list of dict)
+    """
+    # pylint: disable=import-outside-toplevel
+    import FreeCAD as App
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        texture = write_texture(os.path.join(directory, "checker.png"))
+        for scene in scenes:
+            counts = SCENES[scene]
+            tm0 = time.perf_counter()
+            doc, objects = build_document(f"Bench_{scene}", counts, texture)
+            build_time = time.perf_counter() - tm0
+            try:
+                for renderer in renderers:
+                    project = make_project(doc, renderer, objects)
+                    project.fpo.ParallelTessellation = parallel
+                    runs = []
+                    for _ in range(repeat):
+                        runs.append(export(project, renderer))
+                    fastest = min(runs, key=lambda r: r["total"])
+                    result = {
+                        "scene": scene,
+                        "counts": counts,
+                        "renderer": renderer,
+                        "views": len(project.all_views()),
+                        "multicolor_faces": App.GuiUp,
+                        "build_time": build_time,
+                        "total": common.summarize([r["total"] for r in runs]),
+                        "phases": fastest["phases"],
+                        "files": fastest["files"],
+                    }
+                    results.append(result)
+                    log(format_result(result))
+            finally:
+                App.closeDocument(doc.Name)
+    return results
+
+
+def format_result(result):
+    """Format a result, for console output."""
+    phases = ", ".join(
+        f"{k} {v['wall']:.3f}s"
+        for k, v in result["phases"].items()
+        if v["count"]
+    )
+    files = result["files"]
+    return (
+        f"{result['scene']} {result['renderer']}: "
+        f"{result['total']['min']:.3f}s ({phases}); "
+        f"template {files['template_bytes']} B, "
+        f"{files['mesh_files']} mesh files {files['mesh_bytes']} B\n"
+    )
+
+
+def get_argv():
+    """Get command line arguments (after '--pass', in FreeCAD)."""
+    if "--pass" in sys.argv:
+        return sys.argv[sys.argv.index("--pass") + 1 :]
+    return sys.argv[1:]
+
+
+def get_versions():
+    """Get FreeCAD and Render workbench versions."""
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    with open(os.path.join(REPODIR, "package.xml"), encoding="utf-8") as fobj:
+        match = re.search(r"<version>(.*)</version>", fobj.read())
+    return {
+        "freecad": ".".join(App.Version()[:3]),
+        "render": match.group(1) if match else None,
+    }
+
+
+def main(argv=None):
+    """Run benchmark from command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenes",
+        nargs="+",
+        choices=tuple(SCENES),
+        default=("small", "medium"),
+        help="synthetic documents (default: small medium)",
+    )
+    parser.add_argument(
+        "--renderers", nargs="+", help="renderers (default: all)"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--parallel-tessellation",
+        action="store_true",
+        help="tessellate shapes in parallel, before export",
+    )
+    parser.add_argument(
+        "--param",
+        nargs="*",
+        type=common.parse_param,
+        default=[],
+        help="Render parameters (e.g. CompactMeshes=true)",
+    )
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args(get_argv() if argv is None else argv)
+
+    try:
+        import Render  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        parser.exit(1, "This benchmark must be run in FreeCAD (FreeCADCmd)\n")
+    renderers = args.renderers or Render.VALID_RENDERERS
+    if unknown := set(renderers) - set(Render.VALID_RENDERERS):
+        parser.error(f"unknown renderers: {', '.join(sorted(unknown))}")
+
+    params = export_params(args)
+    saved = set_params(params)
+    try:
+        results = benchmark(
+            args.scenes,
+            renderers,
+            max(args.repeat, 1),
+            args.parallel_tessellation,
+        )
+    finally:
+        restore_params(saved)
+
+    common.write_report(
+        {
+            "versions": get_versions(),
+            "export_params": dict(params),
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Benchmark RenderMesh computations, in plain CPython.
+
+RenderMesh stages (setup, uv maps, adjacency, connected components, vertex
+normals, autosmooth, tangent spaces) are timed for each backend (plain,
+numpy, multiprocessing), on synthetic meshes (see meshes.py). FreeCAD is
+stubbed (see fcstub.py) if not available.
+
+Only the stage itself is timed: the RenderMesh is prepared beforehand (for
+instance, tangent spaces are timed on a mesh which already has a uv map and
+vertex normals).
+
+Results are written in JSON, for regression tracking.
+
+Usage:
+    python bench_rendermesh.py --sizes 1k 10k 100k --output results.json
+    python bench_rendermesh.py --backends numpy multiprocessing \\
+        --shapes scan --sizes 1M 10M --repeat 1
+"""
+
+import gc
+import math
+import time
+
+import fcstub
+
+fcstub.install()
+
+# pylint: disable=wrong-import-position
+from Render.rendermesh import create_rendermesh
+
+import common
+import meshes
+from common import BACKENDS, log
+
+PROJECTIONS = ("Cubic", "Spherical", "Cylindric")
+SPLIT_ANGLE = math.radians(30)
+
+
+# ===========================================================================
+#                                  Stages
+# ===========================================================================
+
+
+def _create(mesh, backend, **kwargs):
+    """Create a RenderMesh for benchmark."""
+    kwargs.setdefault("autosmooth", False)
+    return create_rendermesh(mesh, name="Benchmark", backend=backend, **kwargs)
+
+
+def _prepare(backend, points, facets, **kwargs):
+    """Prepare a RenderMesh for a stage."""
+    return _create(fcstub.make_mesh(points, facets), backend, **kwargs)
+
+
+def _prepare_mesh(_, points, facets):
+    """Prepare a Mesh.Mesh for setup stage."""
+    return fcstub.make_mesh(points, facets)
+
+
+def _prepare_tspaces(backend, points, facets):
+    """Prepare a RenderMesh with uv map and vertex normals."""
+    return _prepare(
+        backend,
+        points,
+        facets,
+        compute_uvmap=True,
+        uvmap_projection="Cubic",
+        autosmooth=True,
+    )
+
+
+def _uvmap_stage(projection):
+    """Make a uv map stage."""
+    return (
+        BACKENDS,
+        _prepare,
+        lambda rmesh, backend: rmesh.compute_uvmap(projection),
+    )
+
+
+def _adjacent_facets(rmesh, backend):
+    """Compute adjacent facets (the plain version takes no split angle)."""
+    if backend == "plain":
+        return rmesh._adjacent_facets()  # pylint: disable=protected-access
+    # pylint: disable=protected-access
+    return rmesh._adjacent_facets(SPLIT_ANGLE)
+
+
+# Stages: name -> (backends, prepare, run)
+# 'prepare(backend, points, facets)' is not timed, 'run(prepared, backend)'
+# is. Multiprocessing backend has no standalone adjacency, connected
+# components and vertex normals: it is benchmarked on autosmooth as a whole.
+STAGES = {
+    "setup": (
+        BACKENDS,
+        _prepare_mesh,
+        lambda mesh, backend: _create(mesh, backend),
+    ),
+    **{f"uvmap_{p.lower()}": _uvmap_stage(p) for p in PROJECTIONS},
+    "adjacency": (("plain", "numpy"), _prepare, _adjacent_facets),
+    "components": (
+        ("plain", "numpy"),
+        _prepare,
+        # pylint: disable=protected-access
+        lambda rmesh, backend: rmesh._connected_components(SPLIT_ANGLE),
+    ),
+    "vnormals": (
+        ("plain", "numpy"),
+        _prepare,
+        lambda rmesh, backend: rmesh.compute_vnormals(),
+    ),
+    "autosmooth": (
+        BACKENDS,
+        _prepare,
+        lambda rmesh, backend: rmesh.autosmooth(SPLIT_ANGLE),
+    ),
+    "tspaces": (
+        BACKENDS,
+        _prepare_tspaces,
+        lambda rmesh, backend: rmesh.compute_tspaces(),
+    ),
+}
+
+
+def run_stage(stage, backend, points, facets, repeat):
+    """Time a stage.
+
+    Returns:
+        The durations of the runs, in seconds (list of float)
+    """
+    _, prepare, run = STAGES[stage]
+    durations = []
+    for _ in range(repeat):
+        prepared = prepare(backend, points, facets)
+        gc.collect()
+        tm0 = time.perf_counter()
+        result = run(prepared, backend)
+        durations.append(time.perf_counter() - tm0)
+        del prepared, result
+    gc.collect()
+    return durations
+
+
+# ===========================================================================
+#                                Benchmark
+# ===========================================================================
+
+
+def benchmark(backends, shapes, sizes, stages, repeat, max_time):
+    """Run benchmark.
+
+    Args:
+        backends -- the backends to benchmark (list of str)
+        shapes -- the synthetic shapes (list of str, see meshes.SHAPES)
+        sizes -- the numbers of facets (list of int)
+        stages -- the stages to benchmark (list of str, see STAGES)
+        repeat -- the number of runs per measure (int)
+        max_time -- a stage which takes longer than this time (in seconds)
+            is skipped for larger sizes of the same shape and backend
+
+    Returns:
+        The results (list of dict), the skipped measures (list of dict)
+    """
+    results, skipped = [], []
+    for shape in shapes:
+        too_slow = set()
+        for size in sorted(sizes):
+            points, facets = meshes.make_shape(shape, size)
+            for backend in backends:
+                for stage in stages:
+                    measure = {
+                        "backend": backend,
+                        "shape": shape,
+                        "size": size,
+                        "stage": stage,
+                    }
+                    if backend not in STAGES[stage][0]:
+                        continue
+                    if (backend, stage) in too_slow:
+                        skipped.append({**measure, "reason": "too slow"})
+                        continue
+                    log(f"{shape} {size} {backend} {stage}... ")
+                    durations = run_stage(
+                        stage, backend, points, facets, repeat
+                    )
+                    log(f"{min(durations):.4f}s\n")
+                    results.append(
+                        {
+                            **measure,
+                            "facets": len(facets),
+                            "points": len(points),
+                            **common.summarize(durations),
+                        }
+                    )
+                    if max_time and min(durations) > max_time:
+                        too_slow.add((backend, stage))
+            del points, facets
+            gc.collect()
+    return results, skipped
+
+
+def main(argv=None):
+    """Run benchmark from command line."""
+    parser = common.make_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        "--stages", nargs="+", choices=tuple(STAGES), default=tuple(STAGES)
+    )
+    parser.add_argument(
+        "--max-time",
+        type=float,
+        default=30.0,
+        help="skip larger sizes once a stage exceeds this time (seconds)",
+    )
+    args = parser.parse_args(argv)
+    backends = common.apply_arguments(args)
+
+    results, skipped = benchmark(
+        backends,
+        args.shapes,
+        args.sizes,
+        args.stages,
+        args.repeat,
+        args.max_time,
+    )
+    report = {"backends": backends, "results": results, "skipped": skipped}
+    common.write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Benchmark mesh writers and renderer exporters, in plain CPython.
+
+Writers are timed on synthetic meshes (see meshes.py), with uv map and
+vertex normals:
+- mesh file writers of RenderMesh (RenderMeshBase._write_* methods): OBJ,
+  PLY, Cycles XML and Povray
+- 'write_mesh' of renderer plugins (Appleseed, Cycles, Luxcore, Ospray,
+  Pbrt, Povray), with synthetic standard materials. Renderers are not
+  needed: only export is run.
+
+For each measure, throughput (MB/s, triangles/s), output size (files and
+returned string) and peak memory (traced Python and Numpy allocations, in a
+separate run) are reported. Files are written into a temporary directory,
+which is cleared before each run.
+
+Results are written in JSON, for regression tracking.
+
+Usage:
+    python bench_writers.py --sizes 10k 100k --output results.json
+    python bench_writers.py --renderers Cycles Povray --writers \\
+        --materials Diffuse Disney Glass --backends numpy
+"""
+
+import gc
+import importlib
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import fcstub
+
+fcstub.install()
+
+# pylint: disable=wrong-import-position
+from Render.filewriter import AsyncFileWriter
+from Render.rendermaterial import RenderMaterial, STD_MATERIALS_PARAMETERS
+from Render.rendermesh import create_rendermesh
+from Render.utils import RGB
+
+import common
+import meshes
+from common import log
+
+# pylint: disable=protected-access
+WRITERS = {
+    "obj": lambda rmesh, path: rmesh._write_objfile("bench", path + ".obj"),
+    "ply": lambda rmesh, path: rmesh._write_plyfile("bench", path + ".ply"),
+    "cycles": lambda rmesh, path: rmesh._write_cyclesfile(
+        "bench", path + ".xml"
+    ),
+    "povray": lambda rmesh, path: rmesh._write_povfile("bench", path + ".inc"),
+}
+
+RENDERERS = ("Appleseed", "Cycles", "Luxcore", "Ospray", "Pbrt", "Povray")
+
+DEFAULT_COLOR = RGB((0.8, 0.5, 0.2, 1.0))
+
+
+def make_material(shadertype, color=DEFAULT_COLOR):
+    """Make a standard material, with default values.
+
+    Args:
+        shadertype -- the type of the material (str, in
+            STD_MATERIALS_PARAMETERS)
+        color -- the object color (RGB)
+
+    Returns:
+        The material (RenderMaterial)
+    """
+    values = tuple(
+        (p.name, p.default, p.default, p.type, color)
+        for p in STD_MATERIALS_PARAMETERS[shadertype]
+    )
+    return RenderMaterial.build_standard(shadertype, values, None, shadertype)
+
+
+def prepare(backend, points, facets, directory):
+    """Prepare a RenderMesh for export, with uv map and vertex normals."""
+    return create_rendermesh(
+        fcstub.make_mesh(points, facets),
+        autosmooth=True,
+        compute_uvmap=True,
+        uvmap_projection="Cubic",
+        project_directory=directory,
+        export_directory=directory,
+        name="Benchmark",
+        backend=backend,
+    )
+
+
+def measure(func, directory, repeat, file_writer=None, memory=True):
+    """Measure an export function.
+
+    Args:
+        func -- the function to measure, without arguments. It may return a
+            string (rendering string), which is counted in output size.
+        directory -- the export directory (str)
+        repeat -- the number of runs (int)
+        file_writer -- an asynchronous file writer (AsyncFileWriter), to
+            be flushed at the end of each run (optional)
+        memory -- if True, measure peak memory (in an additional run)
+
+    Returns:
+        The measure (dict)
+    """
+
+    def run():
+        _clear(directory)
+        gc.collect()
+        tm0 = time.perf_counter()
+        string = func()
+        if file_writer is not None:
+            file_writer.flush()
+        return time.perf_counter() - tm0, string
+
+    durations = []
+    for _ in range(repeat):
+        duration, string = run()
+        durations.append(duration)
+    file_bytes = _directory_size(directory)
+    string_bytes = len(string.encode("utf-8")) if string else 0
+
+    # Peak memory, in a separate run (tracing slows down execution)
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    res = common.summarize(durations)
+    size = file_bytes + string_bytes
+    res.update(
+        {
+            "bytes": size,
+            "file_bytes": file_bytes,
+            "string_bytes": string_bytes,
+            "mb_per_s": size / res["min"] / 1e6 if res["min"] else None,
+            "peak_memory": peak_memory,
+        }
+    )
+    return res
+
+
+def benchmark(args, backends):
+    """Run benchmark.
+
+    Returns:
+        The results (list of dict)
+    """
+    # Measured functions are called immediately, in the loops
+    # pylint: disable=cell-var-from-loop
+    renderer_modules = {
+        r: importlib.import_module(f"Render.renderers.{r}")
+        for r in args.renderers
+    }
+    materials = {m: make_material(m) for m in args.materials}
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes:
+            for size in sorted(args.sizes):
+                points, facets = meshes.make_shape(shape, size)
+                for backend in backends:
+                    rmesh = prepare(backend, points, facets, directory)
+                    if args.async_writer:
+                        rmesh.file_writer = AsyncFileWriter()
+                    context = {
+                        "backend": backend,
+                        "shape": shape,
+                        "size": size,
+                        "facets": rmesh.count_facets,
+                        "points": rmesh.count_points,
+                    }
+
+                    def add(kind, target, func, material=None):
+                        log(f"{shape} {size} {backend} {target}... ")
+                        res = measure(
+                            func,
+                            directory,
+                            args.repeat,
+                            rmesh.file_writer,
+                            args.memory,
+                        )
+                        res["tris_per_s"] = (
+                            context["facets"] / res["min"]
+                            if res["min"]
+                            else None
+                        )
+                        log(f"{res['min']:.4f}s {res['mb_per_s']:.1f}MB/s\n")
+                        results.append(
+                            {
+                                "kind": kind,
+                                "target": target,
+                                "material": material,
+                                **context,
+                                **res,
+                            }
+                        )
+
+                    path = os.path.join(directory, "bench")
+                    for writer in args.writers:
+                        func = WRITERS[writer]
+                        add("writer", writer, lambda: func(rmesh, path))
+
+                    for renderer, module in renderer_modules.items():
+                        for matname, material in materials.items():
+                            add(
+                                "renderer",
+                                renderer,
+                                lambda: module.write_mesh(
+                                    f"bench_{matname}",
+                                    rmesh,
+                                    material,
+                                    project_directory=directory,
+                                    object_directory=directory,
+                                ),
+                                matname,
+                            )
+
+                    if rmesh.file_writer is not None:
+                        rmesh.file_writer.close()
+                    del rmesh
+                    gc.collect()
+    return results
+
+
+def _clear(directory):
+    """Remove directory content."""
+    for entry in os.scandir(directory):
+        if entry.is_dir():
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+
+
+def _directory_size(directory):
+    """Get the size of the files in a directory (recursively)."""
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(directory)
+        for f in files
+    )
+
+
+def _select(values, all_values, default_all):
+    """Select targets from a command line option."""
+    if values is None:
+        return all_values if default_all else ()
+    return values or all_values
+
+
+def main(argv=None):
+    """Run benchmark from command line."""
+    parser = common.make_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        "--writers",
+        nargs="*",
+        choices=tuple(WRITERS),
+        default=None,
+        help="mesh file writers (default: all, or none if --renderers)",
+    )
+    parser.add_argument(
+        "--renderers",
+        nargs="*",
+        choices=RENDERERS,
+        default=None,
+        help="renderer exporters (default: all, or none if --writers)",
+    )
+    parser.add_argument(
+        "--materials",
+        nargs="+",
+        choices=tuple(STD_MATERIALS_PARAMETERS),
+        default=("Diffuse",),
+        help="materials for renderer exporters (default: Diffuse)",
+    )
+    parser.add_argument(
+        "--async-writer",
+        action="store_true",
+        help="write files with an asynchronous file writer (flushed)",
+    )
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="do not measure peak memory (which takes an additional run)",
+    )
+    args = parser.parse_args(argv)
+    backends = common.apply_arguments(args)
+
+    # Targets: an option without values selects all targets of its kind;
+    # without any option, all targets are selected
+    writers, renderers = args.writers, args.renderers
+    args.writers = _select(writers, tuple(WRITERS), renderers is None)
+    args.renderers = _select(renderers, RENDERERS, writers is None)
+
+    results = benchmark(args, backends)
+    common.write_report(
+        {"backends": backends, "results": results}, args.output
+    )
+
+
+if __name__ == "__main__":
+    main()
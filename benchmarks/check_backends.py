@@ -0,0 +1,656 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Check that RenderMesh backends give equivalent results.
+
+The plain, numpy and multiprocessing backends implement the same
+algorithms. This tool runs all of them on the same synthetic meshes (see
+meshes.py) and compares their results with a reference backend:
+- in memory: points, facets, uv map, vertex normals and tangents, after
+  each stage (setup, uv maps, autosmooth, all stages with tangents)
+- in written files (OBJ, PLY, Cycles, Povray), parsed back
+
+Backends are free to order points and facets differently, so facets are
+matched by the positions of their corners (exactly, then within
+tolerance), and data are compared per facet corner:
+- position -- corner positions (within relative tolerance)
+- uv -- uv coordinates (within relative tolerance)
+- vnormal, tangent -- vertex normals and tangents (within angle tolerance)
+- tangent_sign -- tangent signs (bitangent orientation)
+- topology -- point sharing between facets (seams and sharp edges): corners
+  sharing a point in one backend must share a point in the other one
+Mismatches are reported with the indices of the facets involved, in the
+reference backend and in the compared one.
+
+Usage:
+    python check_backends.py --sizes 1k 10k
+    python check_backends.py --reference numpy --backends multiprocessing \\
+        --shapes cad --output report.json
+
+Exit status is 1 if mismatches are found. All backends are expected to
+match at default tolerances (with and without DisableNumpy and
+CompactMeshes): a mismatch is a regression.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as et
+
+import fcstub
+
+fcstub.install()
+
+# pylint: disable=wrong-import-position
+import numpy as np
+
+from Render.rendermesh import create_rendermesh
+
+import common
+import meshes
+from common import log
+
+# Cases: name -> (create_rendermesh arguments, compute tangent spaces)
+CASES = {
+    "setup": ({}, False),
+    "uvmap_cubic": (
+        {"compute_uvmap": True, "uvmap_projection": "Cubic"},
+        False,
+    ),
+    "uvmap_spherical": (
+        {"compute_uvmap": True, "uvmap_projection": "Spherical"},
+        False,
+    ),
+    "uvmap_cylindric": (
+        {"compute_uvmap": True, "uvmap_projection": "Cylindric"},
+        False,
+    ),
+    "autosmooth": ({"autosmooth": True}, False),
+    "all": (
+        {
+            "compute_uvmap": True,
+            "uvmap_projection": "Cubic",
+            "autosmooth": True,
+        },
+        True,
+    ),
+}
+
+# Maximum number of facet indices reported per mismatch
+MAX_REPORTED_FACETS = 20
+
+
+# ===========================================================================
+#                              Corner data
+# ===========================================================================
+
+# Corner data are dictionaries of arrays, with a row per facet and a column
+# per corner:
+# index -- point indices (m, 3)
+# position -- positions (m, 3, 3)
+# uv -- uv coordinates (m, 3, 2), optional
+# vnormal -- vertex normals (m, 3, 3), optional
+# tangent -- tangents (m, 3, 3), optional
+# tangent_sign -- tangent signs (m, 3, 1), optional
+
+
+def _array(values, width, dtype=np.float64):
+    """Convert RenderMesh data (list, array, shared array...) to an array."""
+    if not isinstance(values, np.ndarray):
+        values = np.asarray(list(values))
+    if np.iscomplexobj(values):
+        values = np.column_stack((values.real, values.imag))
+    return np.asarray(values, dtype=dtype).reshape(-1, width)
+
+
+def indexed_corners(points, facets, **data):
+    """Get corner data from indexed data (per point data).
+
+    Args:
+        points -- the points (array (n, 3))
+        facets -- the facets (array (m, 3))
+        data -- other per point data (uv, vnormal...), as arrays (n, k), or
+            None
+    """
+    res = {"index": facets, "position": points[facets]}
+    res.update({k: v[facets] for k, v in data.items() if v is not None})
+    return res
+
+
+def rendermesh_corners(rmesh):
+    """Get corner data from a RenderMesh."""
+    points = _array(rmesh.points, 3)
+    facets = _array(rmesh.facets, 3, np.int64)
+    data = {}
+    if rmesh.has_uvmap():
+        data["uv"] = _array(rmesh.uvmap, 2)
+    if rmesh.has_vnormals():
+        data["vnormal"] = _array(rmesh.vnormals, 3)
+    if rmesh.tangents is not None and len(rmesh.tangents):
+        data["tangent"] = _array(rmesh.tangents, 3)
+        data["tangent_sign"] = _array(rmesh.tangent_signs, 1)
+    return indexed_corners(points, facets, **data)
+
+
+# ===========================================================================
+#                              File parsers
+# ===========================================================================
+
+
+def parse_obj(path):
+    """Parse an OBJ file into corner data."""
+    values = {"v": [], "vt": [], "vn": []}
+    faces = []
+    with open(path, encoding="utf-8") as fobj:
+        for line in fobj:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] in values:
+                values[words[0]].append([float(w) for w in words[1:]])
+            elif words[0] == "f":
+                faces.append(
+                    [
+                        [int(i or 0) - 1 for i in w.split("/")]
+                        for w in words[1:]
+                    ]
+                )
+    faces = np.asarray(faces, dtype=np.int64)  # (m, 3, k)
+    points = np.asarray(values["v"], dtype=np.float64)
+    res = {"index": faces[..., 0], "position": points[faces[..., 0]]}
+    for key, name, column in (("vt", "uv", 1), ("vn", "vnormal", 2)):
+        if values[key] and faces.shape[2] > column:
+            data = np.asarray(values[key], dtype=np.float64)
+            res[name] = data[faces[..., column]]
+    return res
+
+
+def parse_ply(path):
+    """Parse an ASCII PLY file into corner data."""
+    with open(path, encoding="utf-8") as fobj:
+        lines = fobj.read().splitlines()
+    end = lines.index("end_header")
+    properties = []
+    count_points = 0
+    for line in lines[:end]:
+        words = line.split()
+        if words[:2] == ["element", "vertex"]:
+            count_points = int(words[2])
+        elif words[0] == "property" and words[1] != "list":
+            properties.append(words[-1])
+    body = lines[end + 1 :]
+    vertices = np.asarray(
+        " ".join(body[:count_points]).split(), dtype=np.float64
+    ).reshape(count_points, -1)
+    faces = np.asarray(
+        " ".join(body[count_points:]).split(), dtype=np.int64
+    ).reshape(-1, 4)[:, 1:]
+
+    def columns(*names):
+        if not all(n in properties for n in names):
+            return None
+        return vertices[:, [properties.index(n) for n in names]]
+
+    return indexed_corners(
+        columns("x", "y", "z"),
+        faces,
+        uv=columns("s", "t"),
+        vnormal=columns("nx", "ny", "nz"),
+    )
+
+
+def parse_cycles(path):
+    """Parse a Cycles XML mesh file into corner data."""
+    mesh = et.parse(path).getroot().find("mesh")
+
+    def attribute(name, width, dtype=np.float64):
+        if (value := mesh.get(name)) is None:
+            return None
+        return np.asarray(value.split(), dtype=dtype).reshape(-1, width)
+
+    facets = attribute("verts", 3, np.int64)
+    res = indexed_corners(attribute("P", 3), facets, vnormal=attribute("N", 3))
+    # Per corner data
+    for name, key, width in (
+        ("UV", "uv", 2),
+        ("tangent", "tangent", 3),
+        ("tangent_sign", "tangent_sign", 1),
+    ):
+        if (data := attribute(name, width)) is not None:
+            res[key] = data.reshape(-1, 3, width)
+    return res
+
+
+def parse_povray(path):
+    """Parse a Povray mesh2 file into corner data."""
+    with open(path, encoding="utf-8") as fobj:
+        text = fobj.read()
+
+    def block(name, dtype=np.float64):
+        match = re.search(name + r"\s*\{\s*(\d+)\s*,([^}]*)\}", text)
+        if match is None:
+            return None
+        vectors = re.findall(r"<([^>]*)>", match.group(2))
+        return np.asarray(
+            [v.split(",") for v in vectors], dtype=dtype
+        ).reshape(int(match.group(1)), -1)
+
+    return indexed_corners(
+        block("vertex_vectors"),
+        block("face_indices", np.int64),
+        uv=block("uv_vectors"),
+        vnormal=block("normal_vectors"),
+    )
+
+
+# pylint: disable=protected-access
+FORMATS = {
+    "obj": (".obj", lambda m, p: m._write_objfile("check", p), parse_obj),
+    "ply": (".ply", lambda m, p: m._write_plyfile("check", p), parse_ply),
+    "cycles": (
+        ".xml",
+        lambda m, p: m._write_cyclesfile("check", p),
+        parse_cycles,
+    ),
+    "povray": (
+        ".inc",
+        lambda m, p: m._write_povfile("check", p),
+        parse_povray,
+    ),
+}
+
+
+# ===========================================================================
+#                              Comparison
+# ===========================================================================
+
+
+def _rotations(positions):
+    """Get a canonical rotation of facet corners.
+
+    The first corner is the lowest one (in lexicographic order). Equal
+    facets thus get the same corner order, whatever their initial order.
+
+    Returns:
+        The corner indices of each facet, rotated (array (m, 3))
+    """
+    flat = positions.reshape(-1, 3)
+    order = np.lexsort((flat[:, 2], flat[:, 1], flat[:, 0]))
+    ranks = np.empty(len(flat), dtype=np.int64)
+    ranks[order] = np.arange(len(flat))
+    start = np.argmin(ranks.reshape(-1, 3), axis=1)
+    return (start[:, np.newaxis] + np.arange(3)) % 3
+
+
+def _rotate(corners, rotations):
+    """Rotate facet corners."""
+    return {
+        k: np.take_along_axis(
+            v, rotations.reshape(rotations.shape + (1,) * (v.ndim - 2)), 1
+        )
+        for k, v in corners.items()
+    }
+
+
+def match_facets(reference, other, tolerance):
+    """Match facets of two meshes by their corner positions.
+
+    Facets are first matched exactly, then within tolerance (for instance,
+    if positions have been rounded in a file).
+
+    Args:
+        reference, other -- the corner data of the meshes (dict)
+        tolerance -- the maximum distance between matched corners (float)
+
+    Returns:
+        ref_indices -- the matched facets in reference (array)
+        other_indices -- the matched facets in other (array)
+        other_rotations -- the corner indices of matched facets in other,
+            in the order of reference corners (array (k, 3))
+    """
+    ref_rot = _rotations(reference["position"])
+    other_rot = _rotations(other["position"])
+    ref_pos = _rotate({"p": reference["position"]}, ref_rot)["p"]
+    other_pos = _rotate({"p": other["position"]}, other_rot)["p"]
+
+    # Exact match
+    keys = {}
+    for index, row in enumerate(other_pos.reshape(-1, 9)):
+        keys.setdefault(row.tobytes(), []).append(index)
+    pairs = {}
+    unmatched = []
+    for index, row in enumerate(ref_pos.reshape(-1, 9)):
+        if candidates := keys.get(row.tobytes()):
+            pairs[index] = candidates.pop()
+        else:
+            unmatched.append(index)
+
+    # Match within tolerance (grid of facet centers)
+    if unmatched and tolerance > 0:
+        remaining = {i for c in keys.values() for i in c}
+        cell = 4.0 * tolerance
+        grid = {}
+        centers = other_pos.mean(axis=1)
+        for index in remaining:
+            key = tuple(np.floor(centers[index] / cell).astype(int))
+            grid.setdefault(key, []).append(index)
+        neighbours = [
+            (i, j, k)
+            for i in (-1, 0, 1)
+            for j in (-1, 0, 1)
+            for k in (-1, 0, 1)
+        ]
+        for index in unmatched:
+            center = ref_pos[index].mean(axis=0)
+            base = np.floor(center / cell).astype(int)
+            found = _find_close(
+                ref_pos[index], other_pos, grid, base, neighbours, tolerance
+            )
+            if found is not None:
+                pairs[index] = found
+
+    ref_indices = np.fromiter(pairs.keys(), dtype=np.int64, count=len(pairs))
+    other_indices = np.fromiter(
+        pairs.values(), dtype=np.int64, count=len(pairs)
+    )
+    # Corner correspondence: ref corner k (in reference order) matches
+    # other corner other_rotations[k]
+    inverse = np.argsort(ref_rot[ref_indices], axis=1)
+    other_rotations = np.take_along_axis(other_rot[other_indices], inverse, 1)
+    return ref_indices, other_indices, other_rotations
+
+
+def _find_close(positions, other_positions, grid, base, neighbours, tol):
+    """Find (and remove from grid) a facet close to positions."""
+    for offset in neighbours:
+        key = tuple(base + offset)
+        for candidate in grid.get(key, ()):
+            diff = np.abs(other_positions[candidate] - positions).max()
+            if diff <= tol:
+                grid[key].remove(candidate)
+                return candidate
+    return None
+
+
+def compare(reference, other, tolerances):
+    """Compare the corner data of two meshes.
+
+    Args:
+        reference, other -- the corner data (dict)
+        tolerances -- the tolerances (dict): 'rtol' (relative, for
+            positions and uv) and 'angle' (in degrees, for normals and
+            tangents)
+
+    Returns:
+        A list of mismatches (list of dict)
+    """
+    mismatches = []
+    count_ref, count_other = len(reference["index"]), len(other["index"])
+    scale = max(np.abs(reference["position"]).max(initial=0.0), 1e-12)
+    ptol = tolerances["rtol"] * scale
+
+    ref_idx, other_idx, rotations = match_facets(reference, other, ptol)
+
+    # Unmatched facets
+    for name, count, matched in (
+        ("unmatched_reference", count_ref, ref_idx),
+        ("unmatched_other", count_other, other_idx),
+    ):
+        if len(matched) < count:
+            missing = np.setdiff1d(np.arange(count), matched)
+            mismatches.append(
+                _mismatch(name, missing, missing if "other" in name else None)
+            )
+
+    # Matched data, in reference corner order
+    ref = {k: v[ref_idx] for k, v in reference.items()}
+    oth = _rotate({k: v[other_idx] for k, v in other.items()}, rotations)
+
+    def add(check, bad, error=None):
+        if np.any(bad):
+            mismatches.append(
+                _mismatch(check, ref_idx[bad], other_idx[bad], error)
+            )
+
+    # Positions
+    error = np.abs(ref["position"] - oth["position"]).max(axis=(1, 2))
+    add("position", error > ptol, error.max(initial=0.0))
+
+    # Other data
+    for key in ("uv", "vnormal", "tangent", "tangent_sign"):
+        if (key in ref) != (key in oth):
+            which = "reference" if key in ref else "other"
+            mismatches.append({"check": key, "error": f"only in {which}"})
+            continue
+        if key not in ref:
+            continue
+        if key == "uv":
+            uv_scale = max(np.abs(ref[key]).max(initial=0.0), 1.0)
+            error = np.abs(ref[key] - oth[key]).max(axis=(1, 2))
+            add(key, error > tolerances["rtol"] * uv_scale, error.max())
+        elif key == "tangent_sign":
+            error = np.abs(ref[key] - oth[key]).max(axis=(1, 2))
+            add(key, error > 0.5, error.max(initial=0.0))
+        else:
+            error = _angles(ref[key], oth[key]).max(axis=1)
+            add(key, error > tolerances["angle"], error.max(initial=0.0))
+
+    # Topology: corner sharing must be consistent (point bijection)
+    bad = _topology_mismatches(ref["index"], oth["index"])
+    add("topology", bad)
+
+    return mismatches
+
+
+def _angles(vectors1, vectors2):
+    """Get angles between vectors, in degrees (along last axis)."""
+    norms = np.linalg.norm(vectors1, axis=-1) * np.linalg.norm(
+        vectors2, axis=-1
+    )
+    dots = np.einsum("...i,...i", vectors1, vectors2)
+    cosines = np.divide(dots, norms, out=np.ones_like(dots), where=norms > 0)
+    return np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)))
+
+
+def _topology_mismatches(indices1, indices2):
+    """Find facets where point sharing differs between two meshes.
+
+    Args:
+        indices1, indices2 -- point indices of matched corners (m, 3)
+
+    Returns:
+        A boolean array, True for facets with inconsistent corners
+    """
+    pairs = np.column_stack((indices1.ravel(), indices2.ravel()))
+    pairs = np.unique(pairs, axis=0)
+    bad = np.zeros(indices1.size, dtype=bool)
+    for column, indices in ((0, indices1), (1, indices2)):
+        points, counts = np.unique(pairs[:, column], return_counts=True)
+        ambiguous = points[counts > 1]
+        bad |= np.isin(indices.ravel(), ambiguous)
+    return bad.reshape(-1, 3).any(axis=1)
+
+
+def _mismatch(check, ref_facets, other_facets=None, error=None):
+    """Make a mismatch record."""
+    res = {
+        "check": check,
+        "count": int(len(ref_facets)),
+        "facets": [int(i) for i in ref_facets[:MAX_REPORTED_FACETS]],
+    }
+    if other_facets is not None:
+        res["other_facets"] = [
+            int(i) for i in other_facets[:MAX_REPORTED_FACETS]
+        ]
+    if error is not None:
+        res["max_error"] = float(error)
+    return res
+
+
+# ===========================================================================
+#                                 Runner
+# ===========================================================================
+
+
+def run_case(backend, points, facets, case, directory, formats):
+    """Run a case with a backend.
+
+    Returns:
+        The corner data in memory, and in written files (dict format ->
+        corner data)
+    """
+    kwargs, tspaces = CASES[case]
+    kwargs = {"autosmooth": False, **kwargs}
+    rmesh = create_rendermesh(
+        fcstub.make_mesh(points, facets),
+        name="Check",
+        backend=backend,
+        **kwargs,
+    )
+    if tspaces:
+        rmesh.compute_tspaces()
+    memory = rendermesh_corners(rmesh)
+    files = {}
+    for fmt in formats:
+        extension, write, parse = FORMATS[fmt]
+        path = os.path.join(directory, f"{backend}_{case}{extension}")
+        write(rmesh, path)
+        files[fmt] = parse(path)
+    return memory, files
+
+
+def check(args, backends):
+    """Run checks.
+
+    Returns:
+        The results (list of dict)
+    """
+    tolerances = {"rtol": args.rtol, "angle": args.angle_tol}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes:
+            for size in sorted(args.sizes):
+                points, facets = meshes.make_shape(shape, size)
+                for case in args.cases:
+                    formats = args.formats if CASES[case][1] else ()
+                    outputs = {
+                        b: run_case(
+                            b, points, facets, case, directory, formats
+                        )
+                        for b in [args.reference] + backends
+                    }
+                    ref_memory, ref_files = outputs[args.reference]
+                    for backend in backends:
+                        memory, files = outputs[backend]
+                        targets = [("memory", ref_memory, memory)] + [
+                            (f"file:{f}", ref_files[f], files[f])
+                            for f in formats
+                        ]
+                        for target, ref, other in targets:
+                            mismatches = compare(ref, other, tolerances)
+                            result = {
+                                "shape": shape,
+                                "size": size,
+                                "case": case,
+                                "reference": args.reference,
+                                "backend": backend,
+                                "target": target,
+                                "facets": [
+                                    len(ref["index"]),
+                                    len(other["index"]),
+                                ],
+                                "mismatches": mismatches,
+                            }
+                            results.append(result)
+                            log(format_result(result))
+    return results
+
+
+def format_result(result):
+    """Format a result, for console output."""
+    head = (
+        f"{result['shape']} {result['size']} {result['case']} "
+        f"{result['reference']} vs {result['backend']} "
+        f"({result['target']}): "
+    )
+    if not result["mismatches"]:
+        return head + "OK\n"
+    lines = [head + f"{len(result['mismatches'])} mismatch(es)"]
+    for mismatch in result["mismatches"]:
+        details = ", ".join(
+            f"{k}={v}" for k, v in mismatch.items() if k != "check"
+        )
+        lines.append(f"    {mismatch['check']}: {details}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    """Run checks from command line."""
+    parser = common.make_parser(__doc__.splitlines()[0])
+    parser.set_defaults(sizes=[common.parse_size("1k")], repeat=1)
+    parser.add_argument(
+        "--reference",
+        choices=common.BACKENDS,
+        default="plain",
+        help="reference backend (default: plain)",
+    )
+    parser.add_argument(
+        "--cases", nargs="+", choices=tuple(CASES), default=tuple(CASES)
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="*",
+        choices=tuple(FORMATS),
+        default=tuple(FORMATS),
+        help="written files to compare (for cases with all stages)",
+    )
+    parser.add_argument(
+        "--rtol",
+        type=float,
+        default=1e-5,
+        help="relative tolerance for positions and uv (default: 1e-5)",
+    )
+    parser.add_argument(
+        "--angle-tol",
+        type=float,
+        default=0.1,
+        help="tolerance for normals and tangents, in degrees (default: 0.1)",
+    )
+    args = parser.parse_args(argv)
+    backends = [b for b in common.apply_arguments(args) if b != args.reference]
+
+    results = check(args, backends)
+    common.write_report(
+        {
+            "reference": args.reference,
+            "backends": backends,
+            "results": results,
+        },
+        args.output,
+    )
+    return 1 if any(r["mismatches"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Common helpers for benchmark scripts.
+
+fcstub must be installed before this module is imported.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+
+import numpy as np
+
+import fcstub
+import meshes
+
+BACKENDS = ("plain", "numpy", "multiprocessing")
+DEFAULT_SIZES = ("1k", "10k", "100k")
+
+
+def make_parser(description, default_backends=BACKENDS):
+    """Make a command line parser, with common arguments.
+
+    Common arguments are backends, shapes, sizes, repeat, param and output.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=BACKENDS,
+        default=default_backends,
+        help="RenderMesh backends (unavailable ones are skipped)",
+    )
+    parser.add_argument(
+        "--shapes",
+        nargs="+",
+        choices=tuple(meshes.SHAPES),
+        default=tuple(meshes.SHAPES),
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=[parse_size(s) for s in DEFAULT_SIZES],
+        help="numbers of facets, from 1k to 10M (default: 1k 10k 100k)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--param",
+        nargs="*",
+        type=parse_param,
+        default=[],
+        help="Render parameters (e.g. CompactMeshes=true)",
+    )
+    parser.add_argument("--output", help="output file (default: stdout)")
+    return parser
+
+
+def apply_arguments(args):
+    """Apply common arguments: set parameters, filter backends.
+
+    Returns:
+        The available backends among requested ones (list of str)
+    """
+    # pylint: disable=import-outside-toplevel
+    from Render.rendermesh import get_available_backends
+
+    # Requested backends are enabled, unless parameters say otherwise
+    if "multiprocessing" in args.backends:
+        fcstub.set_param("EnableMultiprocessing", True)
+    for name, value in args.param:
+        fcstub.set_param(name, value)
+    available = get_available_backends()
+    args.repeat = max(args.repeat, 1)
+    return [b for b in args.backends if b in available]
+
+
+def summarize(durations):
+    """Summarize run durations, in seconds."""
+    return {
+        "times": durations,
+        "min": min(durations),
+        "median": statistics.median(durations),
+    }
+
+
+def write_report(report, output=None):
+    """Write a report in JSON, with benchmark context (metadata)."""
+    report = {"meta": get_metadata(), **report}
+    if output:
+        with open(output, "w", encoding="utf-8") as fobj:
+            json.dump(report, fobj, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+
+
+def get_metadata():
+    """Get benchmark context."""
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "freecad_stub": getattr(sys.modules["FreeCAD"], "__stub__", False),
+        "params": dict(fcstub.get_params()),
+    }
+
+
+def parse_size(text):
+    """Parse a size, with optional k/M suffix (1k, 10M...)."""
+    text = text.strip()
+    factor = {"k": 10**3, "K": 10**3, "m": 10**6, "M": 10**6}.get(text[-1])
+    if factor:
+        return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def parse_param(text):
+    """Parse a Render parameter (name=value)."""
+    name, _, value = text.partition("=")
+    if value.lower() in ("true", "false"):
+        return name, value.lower() == "true"
+    for kind in (int, float):
+        try:
+            return name, kind(value)
+        except ValueError:
+            pass
+    return name, value
+
+
+def log(msg):
+    """Write a progress message on stderr."""
+    sys.stderr.write(msg)
+    sys.stderr.flush()
@@ -0,0 +1,699 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""A minimal stub of FreeCAD modules, to run Render code in plain CPython.
+
+This stub provides just enough of FreeCAD, FreeCADGui, Mesh and PySide for
+RenderMesh (Render.rendermesh and Render.rendermesh_mixins) to be imported
+and run outside FreeCAD, for benchmarking purpose:
+- Base types (Vector, Matrix, Placement, Rotation) with the semantics used
+  by Render (Vector * Vector is a dot product, normalize raises on null
+  vectors...)
+- Mesh.Mesh, with topology, facets, points, submeshes and binary PLY
+  serialization
+- parameters (in memory) and console (stderr)
+
+Usage:
+    import fcstub
+    fcstub.install()  # Before any import from Render
+    from Render.rendermesh import create_rendermesh
+
+Modules which are actually available (when run in FreeCAD) are not stubbed.
+Render package is imported without its __init__ (which loads the whole
+workbench, including GUI): only the modules actually used are loaded.
+"""
+
+import importlib.util
+import io
+import math
+import os
+import struct
+import sys
+import tempfile
+import types
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+WBDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RENDERDIR = os.path.join(WBDIR, "Render")
+
+
+# ===========================================================================
+#                                Base types
+# ===========================================================================
+
+
+class FreeCADError(Exception):
+    """Base FreeCAD exception."""
+
+
+class Vector:
+    """A 3D vector, mimicking FreeCAD.Vector."""
+
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, *args):
+        if len(args) == 1:
+            args = tuple(args[0])
+        x, y, z = (tuple(args) + (0.0, 0.0, 0.0))[:3]
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        return f"Vector ({self.x}, {self.y}, {self.z})"
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __add__(self, other):
+        return Vector(self.x + other[0], self.y + other[1], self.z + other[2])
+
+    def __sub__(self, other):
+        return Vector(self.x - other[0], self.y - other[1], self.z - other[2])
+
+    def __neg__(self):
+        return Vector(-self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        if isinstance(other, Vector):
+            return self.dot(other)
+        return Vector(self.x * other, self.y * other, self.z * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vector(self.x / other, self.y / other, self.z / other)
+
+    @property
+    def Length(self):  # pylint: disable=invalid-name
+        """Get vector length."""
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def dot(self, other):
+        """Get dot product."""
+        return self.x * other[0] + self.y * other[1] + self.z * other[2]
+
+    def cross(self, other):
+        """Get cross product."""
+        x, y, z = other
+        return Vector(
+            self.y * z - self.z * y,
+            self.z * x - self.x * z,
+            self.x * y - self.y * x,
+        )
+
+    def multiply(self, factor):
+        """Multiply vector by a scalar (in place)."""
+        self.x, self.y, self.z = (
+            self.x * factor,
+            self.y * factor,
+            self.z * factor,
+        )
+        return self
+
+    def normalize(self):
+        """Normalize vector (in place)."""
+        length = self.Length
+        if not length:
+            raise FreeCADError("Cannot normalize null vector")
+        return self.multiply(1.0 / length)
+
+
+class Matrix:
+    """A 4x4 matrix, mimicking FreeCAD.Matrix."""
+
+    def __init__(self, *args):
+        if len(args) == 1 and isinstance(args[0], Matrix):
+            values = args[0].A
+        elif len(args) == 16:
+            values = args
+        else:
+            values = (1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1)
+        object.__setattr__(self, "_m", [float(v) for v in values])
+
+    def __getattr__(self, name):
+        if len(name) == 3 and name[0] == "A" and name[1:].isdigit():
+            row, col = int(name[1]) - 1, int(name[2]) - 1
+            return self._m[row * 4 + col]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if len(name) == 3 and name[0] == "A" and name[1:].isdigit():
+            row, col = int(name[1]) - 1, int(name[2]) - 1
+            self._m[row * 4 + col] = float(value)
+        else:
+            object.__setattr__(self, name, value)
+
+    @property
+    def A(self):  # pylint: disable=invalid-name
+        """Get matrix values (row-major)."""
+        return tuple(self._m)
+
+    def __mul__(self, other):
+        if isinstance(other, Vector):
+            return self.multVec(other)
+        m, n = self._m, other._m
+        return Matrix(
+            *(
+                sum(m[r * 4 + k] * n[k * 4 + c] for k in range(4))
+                for r in range(4)
+                for c in range(4)
+            )
+        )
+
+    def multVec(self, vec):  # pylint: disable=invalid-name
+        """Transform a point."""
+        m = self._m
+        x, y, z = vec
+        return Vector(
+            m[0] * x + m[1] * y + m[2] * z + m[3],
+            m[4] * x + m[5] * y + m[6] * z + m[7],
+            m[8] * x + m[9] * y + m[10] * z + m[11],
+        )
+
+    def setCol(self, index, vec):  # pylint: disable=invalid-name
+        """Set a column (first 3 rows)."""
+        for row, value in enumerate(vec):
+            self._m[row * 4 + index] = float(value)
+
+    def inverse(self):
+        """Get inverse of a rigid transformation matrix."""
+        m = self._m
+        rot = [[m[r * 4 + c] for c in range(3)] for r in range(3)]
+        trans = [m[3], m[7], m[11]]
+        inv = [[rot[c][r] for c in range(3)] for r in range(3)]
+        t_inv = [
+            -sum(inv[r][k] * trans[k] for k in range(3)) for r in range(3)
+        ]
+        return Matrix(
+            *inv[0], t_inv[0], *inv[1], t_inv[1], *inv[2], t_inv[2], 0, 0, 0, 1
+        )
+
+
+class Rotation:
+    """A rotation (identity or from a matrix), mimicking FreeCAD.Rotation."""
+
+    def __init__(self, matrix=None):
+        self._matrix = Matrix(matrix) if matrix is not None else Matrix()
+
+    @property
+    def Q(self):  # pylint: disable=invalid-name
+        """Get rotation quaternion (x, y, z, w)."""
+        m = self._matrix
+        trace = m.A11 + m.A22 + m.A33
+        w = math.sqrt(max(0.0, 1.0 + trace)) / 2.0
+        x = math.copysign(
+            math.sqrt(max(0.0, 1 + m.A11 - m.A22 - m.A33)) / 2, m.A32 - m.A23
+        )
+        y = math.copysign(
+            math.sqrt(max(0.0, 1 - m.A11 + m.A22 - m.A33)) / 2, m.A13 - m.A31
+        )
+        z = math.copysign(
+            math.sqrt(max(0.0, 1 - m.A11 - m.A22 + m.A33)) / 2, m.A21 - m.A12
+        )
+        return (x, y, z, w)
+
+    def getYawPitchRoll(self):  # pylint: disable=invalid-name
+        """Get yaw, pitch, roll (degrees)."""
+        m = self._matrix
+        yaw = math.degrees(math.atan2(m.A21, m.A11))
+        pitch = math.degrees(math.asin(max(-1.0, min(1.0, -m.A31))))
+        roll = math.degrees(math.atan2(m.A32, m.A33))
+        return yaw, pitch, roll
+
+    toEuler = getYawPitchRoll
+
+    def multVec(self, vec):  # pylint: disable=invalid-name
+        """Rotate a vector."""
+        m = Matrix(self._matrix)
+        m.A14 = m.A24 = m.A34 = 0.0
+        return m.multVec(vec)
+
+
+class Placement:
+    """A placement, mimicking FreeCAD.Placement."""
+
+    def __init__(self, *args):
+        if len(args) == 1 and isinstance(args[0], Placement):
+            self._matrix = Matrix(args[0].Matrix)
+        elif len(args) == 1 and isinstance(args[0], Matrix):
+            self._matrix = Matrix(args[0])
+        else:
+            self._matrix = Matrix()
+            if args:
+                base = Vector(args[0])
+                self._matrix.A14, self._matrix.A24, self._matrix.A34 = base
+
+    @property
+    def Matrix(self):  # pylint: disable=invalid-name
+        """Get placement matrix."""
+        return Matrix(self._matrix)
+
+    @property
+    def Base(self):  # pylint: disable=invalid-name
+        """Get placement translation."""
+        m = self._matrix
+        return Vector(m.A14, m.A24, m.A34)
+
+    @property
+    def Rotation(self):  # pylint: disable=invalid-name
+        """Get placement rotation."""
+        return Rotation(self._matrix)
+
+    def toMatrix(self):  # pylint: disable=invalid-name
+        """Get placement matrix."""
+        return Matrix(self._matrix)
+
+    def copy(self):
+        """Copy placement."""
+        return Placement(self)
+
+    def inverse(self):
+        """Get inverse placement."""
+        return Placement(self._matrix.inverse())
+
+    def multVec(self, vec):  # pylint: disable=invalid-name
+        """Transform a point."""
+        return self._matrix.multVec(vec)
+
+    def __mul__(self, other):
+        return Placement(self._matrix * other.toMatrix())
+
+    def isIdentity(self):  # pylint: disable=invalid-name
+        """Check whether placement is identity."""
+        return self._matrix.A == Matrix().A
+
+
+# ===========================================================================
+#                                   Mesh
+# ===========================================================================
+
+
+class MeshPoint:
+    """A mesh point, mimicking Mesh.MeshPoint."""
+
+    __slots__ = ("x", "y", "z", "Index")
+
+    def __init__(self, point, index):
+        self.x, self.y, self.z = point
+        self.Index = index  # pylint: disable=invalid-name
+
+    @property
+    def Vector(self):  # pylint: disable=invalid-name
+        """Get point as a vector."""
+        return Vector(self.x, self.y, self.z)
+
+
+class Facet:
+    """A mesh facet, mimicking Mesh.Facet."""
+
+    __slots__ = ("Points", "PointIndices", "Index")
+
+    # pylint: disable=invalid-name
+    def __init__(self, points, indices=(), index=-1):
+        self.Points = [tuple(p) for p in points]
+        self.PointIndices = tuple(indices)
+        self.Index = index
+
+    @property
+    def Normal(self):  # pylint: disable=invalid-name
+        """Get facet normal (normalized, or null)."""
+        pt1, pt2, pt3 = (Vector(p) for p in self.Points)
+        normal = (pt2 - pt1).cross(pt3 - pt1)
+        length = normal.Length
+        return normal / length if length else normal
+
+    @property
+    def Area(self):  # pylint: disable=invalid-name
+        """Get facet area."""
+        pt1, pt2, pt3 = (Vector(p) for p in self.Points)
+        return (pt2 - pt1).cross(pt3 - pt1).Length / 2.0
+
+
+class Mesh:
+    """A triangle mesh, mimicking Mesh.Mesh.
+
+    Points and facets are stored as lists of tuples, or as Numpy arrays
+    (see `from_arrays`). Points are stored in single precision, as in
+    FreeCAD mesh kernel.
+    """
+
+    def __init__(self, data=None):
+        self.Placement = Placement()  # pylint: disable=invalid-name
+        self._points = []
+        self._facets = []
+        if data:
+            self._build(list(data))
+
+    @classmethod
+    def from_arrays(cls, points, facets):
+        """Create a mesh from points (n, 3) and facets (m, 3) arrays."""
+        mesh = cls()
+        mesh._points = np.asarray(points, dtype=np.float32)
+        mesh._facets = np.asarray(facets)
+        return mesh
+
+    def _build(self, data):
+        """Build mesh from facets, triangles or points (merging points)."""
+        if isinstance(data[0], Facet):
+            triangles = [f.Points for f in data]
+        elif len(data[0]) == 3 and not isinstance(data[0][0], (int, float)):
+            triangles = data
+        else:
+            triangles = [data[i : i + 3] for i in range(0, len(data) - 2, 3)]
+        index = {}
+        for triangle in triangles:
+            facet = []
+            for point in triangle:
+                point = struct.unpack("3f", struct.pack("3f", *point))
+                if (i := index.get(point)) is None:
+                    i = index[point] = len(self._points)
+                    self._points.append(point)
+                facet.append(i)
+            self._facets.append(tuple(facet))
+
+    def _point_tuples(self):
+        if np is not None and isinstance(self._points, np.ndarray):
+            return [tuple(p) for p in self._points.tolist()]
+        return self._points
+
+    def _facet_tuples(self):
+        if np is not None and isinstance(self._facets, np.ndarray):
+            return [tuple(f) for f in self._facets.tolist()]
+        return self._facets
+
+    # pylint: disable=invalid-name
+    @property
+    def CountPoints(self):
+        """Get number of points."""
+        return len(self._points)
+
+    @property
+    def CountFacets(self):
+        """Get number of facets."""
+        return len(self._facets)
+
+    @property
+    def Topology(self):
+        """Get topology (points, facets)."""
+        return [Vector(p) for p in self._point_tuples()], self._facet_tuples()
+
+    @property
+    def Points(self):
+        """Get points."""
+        return [MeshPoint(p, i) for i, p in enumerate(self._point_tuples())]
+
+    @property
+    def Facets(self):
+        """Get facets."""
+        points = self._point_tuples()
+        return [
+            Facet((points[i] for i in f), f, n)
+            for n, f in enumerate(self._facet_tuples())
+        ]
+
+    def addMesh(self, other):
+        """Append another mesh (points are not merged)."""
+        offset = len(self._points)
+        self._points = self._point_tuples() + other._point_tuples()
+        self._facets = self._facet_tuples() + [
+            tuple(i + offset for i in f) for f in other._facet_tuples()
+        ]
+
+    def copy(self):
+        """Copy mesh."""
+        mesh = Mesh()
+        mesh._points = self._points.copy()
+        mesh._facets = self._facets.copy()
+        mesh.Placement = Placement(self.Placement)
+        return mesh
+
+    def clear(self):
+        """Clear mesh."""
+        self._points = []
+        self._facets = []
+
+    def write(self, Filename=None, Format=None, Stream=None, **_):
+        """Write mesh (binary little endian PLY only)."""
+        if (Format or "").upper() != "PLY":
+            raise ValueError(f"Unsupported format '{Format}'")
+        header = (
+            "ply\nformat binary_little_endian 1.0\n"
+            f"element vertex {self.CountPoints}\n"
+            "property float x\nproperty float y\nproperty float z\n"
+            f"element face {self.CountFacets}\n"
+            "property list uchar int vertex_index\nend_header\n"
+        ).encode("ascii")
+        stream = Stream if Stream is not None else io.BytesIO()
+        stream.write(header)
+        if np is not None:
+            points = np.asarray(self._points, dtype="<f4").reshape(-1, 3)
+            stream.write(points.tobytes())
+            faces = np.zeros(
+                self.CountFacets, dtype=[("n", "u1"), ("v", "<i4", 3)]
+            )
+            faces["n"] = 3
+            faces["v"] = np.asarray(self._facets).reshape(-1, 3)
+            stream.write(faces.tobytes())
+        else:
+            for point in self._point_tuples():
+                stream.write(struct.pack("<3f", *point))
+            for facet in self._facet_tuples():
+                stream.write(struct.pack("<B3i", 3, *facet))
+        if Filename is not None:
+            with open(Filename, "wb") as fobj:
+                fobj.write(stream.getvalue())
+
+
+# ===========================================================================
+#                            Parameters & console
+# ===========================================================================
+
+
+class ParamGroup:
+    """A parameter group (in memory), mimicking FreeCAD ParameterGrp."""
+
+    def __init__(self):
+        self._values = {}
+
+    def _get(self, name, default):
+        return self._values.get(name, default)
+
+    def _set(self, name, value):
+        self._values[name] = value
+
+    # pylint: disable=invalid-name
+    def GetBool(self, name, default=False):
+        """Get a boolean parameter."""
+        return bool(self._get(name, default))
+
+    def GetInt(self, name, default=0):
+        """Get an integer parameter."""
+        return int(self._get(name, default))
+
+    def GetUnsigned(self, name, default=0):
+        """Get an unsigned integer parameter."""
+        return int(self._get(name, default))
+
+    def GetFloat(self, name, default=0.0):
+        """Get a float parameter."""
+        return float(self._get(name, default))
+
+    def GetString(self, name, default=""):
+        """Get a string parameter."""
+        return str(self._get(name, default))
+
+    def GetContents(self):
+        """Get parameters, as (type, name, value) tuples."""
+        return [(type(v).__name__, k, v) for k, v in self._values.items()]
+
+    SetBool = SetInt = SetUnsigned = SetFloat = SetString = _set
+
+
+_PARAMS = {}
+
+
+def param_get(path):
+    """Get a parameter group."""
+    return _PARAMS.setdefault(path, ParamGroup())
+
+
+def _print(prefix=""):
+    def printer(msg):
+        sys.stderr.write(f"{prefix}{msg}")
+
+    return printer
+
+
+def _make_freecad():
+    """Make FreeCAD stub module."""
+    app = types.ModuleType("FreeCAD")
+    app.__stub__ = True
+    base = types.SimpleNamespace(
+        Vector=Vector,
+        Matrix=Matrix,
+        Placement=Placement,
+        Rotation=Rotation,
+        FreeCADError=FreeCADError,
+    )
+    tmpdir = tempfile.gettempdir()
+    app.Base = base
+    app.Vector = Vector
+    app.Matrix = Matrix
+    app.Placement = Placement
+    app.Rotation = Rotation
+    app.GuiUp = False
+    app.Console = types.SimpleNamespace(
+        PrintMessage=_print(),
+        PrintWarning=_print("Warning: "),
+        PrintError=_print("Error: "),
+        PrintLog=lambda msg: None,
+    )
+    app.Qt = types.SimpleNamespace(translate=lambda context, text: text)
+    app.ParamGet = param_get
+    app.Version = lambda: ["1", "0", "0"]
+    app.getUserAppDataDir = lambda: tmpdir
+    app.getResourceDir = lambda: tmpdir
+    app.ConfigGet = lambda key: tmpdir
+    app.ActiveDocument = types.SimpleNamespace(TransientDir=tmpdir)
+    return app
+
+
+def _make_mesh_module():
+    """Make Mesh stub module."""
+    module = types.ModuleType("Mesh")
+    module.__stub__ = True
+    module.Mesh = Mesh
+    module.Facet = Facet
+    module.MeshPoint = MeshPoint
+    return module
+
+
+class _DummyModule(types.ModuleType):
+    """A stub module for GUI libraries: any name is a dummy class."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = type(name, (), {"__init__": lambda self, *a, **k: None})
+        setattr(self, name, value)
+        return value
+
+
+def _make_pyside():
+    """Make PySide stub modules."""
+    pyside = types.ModuleType("PySide")
+    pyside.__version__ = "0.0.0"
+    modules = {"PySide": pyside}
+    for name in ("QtCore", "QtGui", "QtWidgets", "QtSvg"):
+        module = modules[f"PySide.{name}"] = _DummyModule(f"PySide.{name}")
+        setattr(pyside, name, module)
+    pyside.QtCore.QT_TRANSLATE_NOOP = lambda context, text: text
+    return modules
+
+
+def _available(name):
+    """Check whether a module is actually available."""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def install():
+    """Install stubs for unavailable FreeCAD modules, and Render package.
+
+    Returns:
+        True if FreeCAD has been stubbed, False if actual FreeCAD is used
+    """
+    stubbed = not _available("FreeCAD")
+    if stubbed:
+        sys.modules["FreeCAD"] = _make_freecad()
+        sys.modules["FreeCADGui"] = types.ModuleType("FreeCADGui")
+        sys.modules["FreeCADGui"].getMainWindow = lambda: None
+    if not _available("Mesh"):
+        sys.modules["Mesh"] = _make_mesh_module()
+    if not _available("PySide"):
+        sys.modules.update(_make_pyside())
+    if not _available("pivy"):
+        sys.modules["pivy"] = types.ModuleType("pivy")
+        sys.modules["pivy.coin"] = sys.modules["pivy"].coin = _DummyModule(
+            "pivy.coin"
+        )
+
+    # Render package, without __init__
+    if "Render" not in sys.modules:
+        package = types.ModuleType("Render")
+        package.__path__ = [RENDERDIR]
+        package.__file__ = os.path.join(RENDERDIR, "__init__.py")
+        sys.modules["Render"] = package
+    return stubbed
+
+
+def set_param(name, value):
+    """Set a Render workbench parameter (stubbed FreeCAD only)."""
+    import FreeCAD as App  # pylint: disable=import-outside-toplevel
+
+    params = App.ParamGet("User parameter:BaseApp/Preferences/Mod/Render")
+    setter = {
+        bool: params.SetBool,
+        int: params.SetInt,
+        float: params.SetFloat,
+        str: params.SetString,
+    }[type(value)]
+    setter(name, value)
+
+
+def make_mesh(points, facets):
+    """Make a Mesh.Mesh from point and facet arrays (stubbed or actual)."""
+    import Mesh as MeshModule  # pylint: disable=import-outside-toplevel
+
+    if getattr(MeshModule, "__stub__", False):
+        return Mesh.from_arrays(points, facets)
+    points = np.asarray(points, dtype=np.float64)
+    facets = np.asarray(facets, dtype=np.int64)
+    return MeshModule.Mesh(points[facets].tolist())
+
+
+def get_params():
+    """Get the Render workbench parameters set (stubbed FreeCAD only)."""
+    if "User parameter:BaseApp/Preferences/Mod/Render" not in _PARAMS:
+        return []
+    group = _PARAMS.get("User parameter:BaseApp/Preferences/Mod/Render")
+    return [(name, value) for _, name, value in group.GetContents()]
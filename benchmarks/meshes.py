@@ -0,0 +1,177 @@
+# ***************************************************************************
+# *                                                                         *
+# *   Copyright (c) 2024 Howetuft <howetuft@gmail.com>                      *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2.1 of   *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""Synthetic meshes for benchmarks.
+
+Each generator returns the points (float64 array (n, 3)) and facets (int64
+array (m, 3)) of a mesh with approximately the requested number of facets.
+Points are shared between adjacent facets, as in meshes computed by
+FreeCAD from shapes: hard edges are given by facet normals only.
+"""
+
+import math
+
+import numpy as np
+
+
+def make_sphere(count_facets, radius=50.0):
+    """Make a UV sphere (smooth, poles)."""
+    rings = max(int(math.sqrt(count_facets / 4)), 3)
+    segments = 2 * rings
+    theta = np.linspace(0.0, math.pi, rings + 1)[1:-1]
+    phi = np.linspace(0.0, 2.0 * math.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing="ij")
+    body = np.column_stack(
+        (
+            (np.sin(theta) * np.cos(phi)).ravel(),
+            (np.sin(theta) * np.sin(phi)).ravel(),
+            np.cos(theta).ravel(),
+        )
+    )
+    points = np.vstack(([0.0, 0.0, 1.0], body, [0.0, 0.0, -1.0])) * radius
+
+    grid = 1 + np.arange((rings - 1) * segments).reshape(rings - 1, segments)
+    facets = [
+        _fan(0, grid[0], reverse=False),
+        _grid_facets(grid, closed=True),
+        _fan(len(points) - 1, grid[-1], reverse=True),
+    ]
+    return points, np.vstack(facets)
+
+
+def make_cylinder(count_facets, radius=20.0, height=80.0):
+    """Make a capped cylinder (smooth side, hard edges at caps)."""
+    segments = max(int(math.sqrt(count_facets)), 4)
+    rows = max(count_facets // (2 * segments) - 1, 1)
+    phi = np.linspace(0.0, 2.0 * math.pi, segments, endpoint=False)
+    heights = np.linspace(0.0, height, rows + 1)
+    phi, heights = np.meshgrid(phi, heights)
+    side = np.column_stack(
+        (
+            radius * np.cos(phi).ravel(),
+            radius * np.sin(phi).ravel(),
+            heights.ravel(),
+        )
+    )
+    bottom, top = len(side), len(side) + 1
+    points = np.vstack((side, [0.0, 0.0, 0.0], [0.0, 0.0, height]))
+
+    grid = np.arange(len(side)).reshape(rows + 1, segments)
+    facets = [
+        _grid_facets(grid, closed=True)[:, ::-1],
+        _fan(bottom, grid[0], reverse=True),
+        _fan(top, grid[-1], reverse=False),
+    ]
+    return points, np.vstack(facets)
+
+
+def make_cad_part(count_facets, size=(100.0, 60.0, 20.0)):
+    """Make a CAD-like part: a box with subdivided faces (hard edges)."""
+    steps = max(int(math.sqrt(count_facets / 12)), 1)
+    ticks = np.linspace(0.0, 1.0, steps + 1)
+    u_coords, v_coords = np.meshgrid(ticks, ticks, indexing="ij")
+    u_coords, v_coords = u_coords.ravel(), v_coords.ravel()
+    zeros, ones = np.zeros_like(u_coords), np.ones_like(u_coords)
+    faces = (
+        (u_coords, v_coords, zeros),
+        (v_coords, u_coords, ones),
+        (v_coords, zeros, u_coords),
+        (u_coords, ones, v_coords),
+        (zeros, u_coords, v_coords),
+        (ones, v_coords, u_coords),
+    )
+    points, facets = [], []
+    grid = np.arange((steps + 1) ** 2).reshape(steps + 1, steps + 1)
+    for index, coords in enumerate(faces):
+        points.append(np.column_stack(coords))
+        facets.append(_grid_facets(grid) + index * grid.size)
+    points = np.vstack(points) * np.asarray(size)
+    facets = np.vstack(facets)
+
+    # Merge points along box edges
+    points, inverse = np.unique(points.round(9), axis=0, return_inverse=True)
+    return points, inverse.reshape(-1)[facets[:, ::-1]]
+
+
+def make_scan(count_facets, size=100.0, noise=0.2, seed=0):
+    """Make a scan-like mesh: a noisy heightfield."""
+    steps = max(int(math.sqrt(count_facets / 2)), 1)
+    rng = np.random.default_rng(seed)
+    ticks = np.linspace(0.0, size, steps + 1)
+    x_coords, y_coords = np.meshgrid(ticks, ticks, indexing="ij")
+    z_coords = 5.0 * np.sin(x_coords / 7.0) * np.cos(y_coords / 11.0)
+    jitter = rng.normal(0.0, noise, (3,) + x_coords.shape)
+    points = np.column_stack(
+        (
+            (x_coords + jitter[0]).ravel(),
+            (y_coords + jitter[1]).ravel(),
+            (z_coords + jitter[2]).ravel(),
+        )
+    )
+    grid = np.arange(len(points)).reshape(steps + 1, steps + 1)
+    return points, _grid_facets(grid)
+
+
+SHAPES = {
+    "sphere": make_sphere,
+    "cylinder": make_cylinder,
+    "cad": make_cad_part,
+    "scan": make_scan,
+}
+
+
+def make_shape(shape, count_facets):
+    """Make a synthetic mesh.
+
+    Args:
+        shape -- the shape of the mesh, in SHAPES (str)
+        count_facets -- the approximate number of facets (int)
+
+    Returns:
+        points -- the points (numpy array (n, 3), float64)
+        facets -- the facets (numpy array (m, 3), int64)
+    """
+    points, facets = SHAPES[shape](int(count_facets))
+    return points.astype(np.float64), facets.astype(np.int64)
+
+
+def _grid_facets(grid, closed=False):
+    """Triangulate a grid of point indices (2 facets per cell)."""
+    if closed:
+        grid = np.hstack((grid, grid[:, :1]))
+    p00 = grid[:-1, :-1].ravel()
+    p01 = grid[:-1, 1:].ravel()
+    p10 = grid[1:, :-1].ravel()
+    p11 = grid[1:, 1:].ravel()
+    return np.vstack(
+        (np.column_stack((p00, p10, p11)), np.column_stack((p00, p11, p01)))
+    )
+
+
+def _fan(center, ring, reverse):
+    """Triangulate a closed ring of point indices around a center point."""
+    following = np.roll(ring, -1)
+    centers = np.full_like(ring, center)
+    if reverse:
+        return np.column_stack((centers, following, ring))
+    return np.column_stack((centers, ring, following))